@@ -0,0 +1,152 @@
+import asyncio
+import concurrent.futures
+import os
+import time
+
+from imageinfo import parse_header, read_image_info
+from scanner import ScanProgress, iter_image_files, start_counting
+
+# Сколько байт читаем одним запросом: хватает почти всем заголовкам, включая JPEG с EXIF
+HEADER_BYTES = 64 * 1024
+# Сколько файлов одновременно открывается и читается
+DEFAULT_LIMIT = 256
+# Сколько записей каталога забирается из обхода за одно обращение к потоку
+WALK_BATCH = 256
+
+
+class HeaderBuffer:
+    """Начало файла в памяти с интерфейсом read/seek/tell для parse_header.
+
+    Знает настоящий размер файла (для seek от конца), а при попытке прочитать
+    за пределами загруженного куска бросает EOFError — тогда файл читается обычным путем.
+    """
+
+    def __init__(self, data, file_size):
+        self.data = data
+        self.file_size = file_size
+        self.position = 0
+
+    def read(self, size=-1):
+        if size < 0:
+            size = self.file_size - self.position
+        end = min(self.position + size, self.file_size)
+        if end > len(self.data):
+            raise EOFError("header is larger than the prefetched block")
+        chunk = self.data[self.position:end]
+        self.position = end
+        return chunk
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.file_size
+        self.position = max(0, offset)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+
+def read_prefix(path, size=HEADER_BYTES):
+    """Одно открытие: первые size байт файла и его полный размер"""
+    fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+    try:
+        file_size = os.fstat(fd).st_size
+        return os.read(fd, size), file_size
+    finally:
+        os.close(fd)
+
+
+def info_from_prefix(path, data, file_size):
+    """Разбирает заголовок из уже прочитанных байт; None — если байт не хватило или формат незнаком"""
+    header = parse_header(HeaderBuffer(data, file_size))
+    if header is None:
+        return None
+    image_format, width, height, mode, compression = header
+    return {
+        'filename': os.path.basename(path),
+        'size': f"{width} x {height} px",
+        'color_depth': mode,
+        'compression': compression,
+        'width': width,
+        'height': height,
+        'format': image_format,
+    }
+
+
+def _next_batch(files, size):
+    batch = []
+    for entry in files:
+        batch.append(entry.path)
+        if len(batch) == size:
+            break
+    return batch
+
+
+async def _probe(loop, executor, path, reader):
+    start = time.perf_counter()
+    try:
+        data, file_size = await loop.run_in_executor(executor, reader, path)
+        opened = time.perf_counter()
+        info = info_from_prefix(path, data, file_size)
+        if info is None:
+            # Заголовок не уместился в прочитанный блок или формат незнаком — обычный путь
+            info = await loop.run_in_executor(executor, read_image_info, path)
+    except Exception as e:
+        return {'filename': os.path.basename(path), 'error': str(e), 'error_type': type(e).__name__}
+    # open включает ожидание в очереди пула: именно эту задержку и видит сканер
+    finished = time.perf_counter()
+    info['timings'] = {'open': opened - start, 'parse': finished - opened, 'total': finished - start}
+    return info
+
+
+async def scan_directory_async(folder, limit=DEFAULT_LIMIT, reader=read_prefix, progress=None, cancel_event=None,
+                               count_ahead=False):
+    """Асинхронный генератор (path, result) для медленных сетевых папок.
+
+    До limit файлов одновременно находятся в чтении: open/read выполняются
+    в пуле потоков, а разбор байт заголовка — в цикле событий.
+    reader(path) -> (bytes, file_size) можно подменить, например для имитации задержек.
+    count_ahead — как в scanner.scan_directory.
+    """
+    if progress is None:
+        progress = ScanProgress()
+    progress.backend = 'async'
+    loop = asyncio.get_running_loop()
+    files = iter_image_files(folder)
+    pending = {}
+    stop_counting = start_counting(folder, progress) if count_ahead else None
+
+    # Пул без with: его __exit__ ждал бы в цикле событий все начатые чтения, а на медленном
+    # сетевом диске это секунды после отмены или aclose()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=limit)
+    try:
+        while True:
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            while not progress.walk_finished and not cancelled and len(pending) < limit:
+                # Обход каталога тоже может ждать сеть, поэтому он идет в потоке
+                batch = await loop.run_in_executor(executor, _next_batch, files, min(WALK_BATCH, limit - len(pending)))
+                if not batch:
+                    progress.walk_finished = True
+                for path in batch:
+                    progress.found += 1
+                    pending[asyncio.ensure_future(_probe(loop, executor, path, reader))] = path
+
+            if not pending or cancelled:
+                return
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                path = pending.pop(task)
+                result = task.result()
+                progress.done += 1
+                if 'error' in result:
+                    progress.errors += 1
+                yield path, result
+    finally:
+        if stop_counting is not None:
+            stop_counting.set()
+        for task in pending:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,89 @@
+import concurrent.futures
+import logging
+import os
+import sys
+import time
+
+from scan_stats import init_worker_logging, worker_log_queue
+
+BACKENDS = ('thread', 'process', 'serial', 'auto')
+
+# Сколько файлов обрабатывается при калибровке режима auto
+CALIBRATION_FILES = 64
+# Доля процессорного времени, начиная с которой работа считается упирающейся в GIL
+CPU_BOUND_SHARE = 0.6
+
+
+class SerialExecutor(concurrent.futures.Executor):
+    """Выполняет задачи сразу в вызывающем потоке — без накладных расходов пула"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def default_workers(backend):
+    cpus = os.cpu_count() or 1
+    if backend == 'thread':
+        # Потоки в основном ждут open/read, поэтому их больше, чем ядер
+        return min(32, cpus + 4)
+    return cpus
+
+
+def default_chunk_size(backend):
+    # Процессам выгодно отдавать файлы пачками: меньше pickle и переключений
+    return 64 if backend == 'process' else 1
+
+
+def gil_enabled():
+    # На free-threaded сборках CPython (3.13t и новее) GIL можно отключить
+    check = getattr(sys, '_is_gil_enabled', None)
+    return True if check is None else check()
+
+
+def make_executor(backend, workers=None):
+    if workers is None:
+        workers = default_workers(backend)
+    if backend == 'thread':
+        return concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    if backend == 'process':
+        log_queue = worker_log_queue()
+        if log_queue is None:
+            return concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        # Без этого записи журнала из процессов уходят в их ненастроенный корневой логгер и теряются
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker_logging,
+                                                      initargs=(log_queue, logging.getLogger().level))
+    if backend == 'serial':
+        return SerialExecutor()
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def process_chunk(process, paths):
+    """Задача для пула: обрабатывает пачку файлов за один вызов"""
+    return [process(path) for path in paths]
+
+
+def choose_backend(sample_paths, process):
+    """Калибровка для режима auto: обрабатывает выборку последовательно и смотрит, куда уходит время.
+
+    Возвращает (режим, результаты выборки) — результаты не выбрасываются, а отдаются сканером.
+    """
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    results = [process(path) for path in sample_paths]
+    wall = time.perf_counter() - wall_start
+    cpu = time.thread_time() - cpu_start
+
+    if len(sample_paths) < CALIBRATION_FILES:
+        # Маленькая папка (или почти все файлы в индексе): пул дороже самой работы
+        return 'serial', results
+    cpu_share = cpu / wall if wall > 0 else 1.0
+    if cpu_share >= CPU_BOUND_SHARE and (os.cpu_count() or 1) > 2 and gil_enabled():
+        # Разбор заголовков держит GIL — масштабируются только процессы
+        return 'process', results
+    # Время уходит на ожидание диска или сети (или GIL отключен) — хватает потоков
+    return 'thread', results
@@ -0,0 +1,74 @@
+"""Бенчмарк асинхронного сканера на имитации сетевой папки.
+
+Каждое открытие файла задерживается на --latency миллисекунд (как на NFS/SMB),
+поэтому выигрыш от большого числа одновременных запросов виден без реальной сети.
+
+Запуск: python bench_async.py [--count 2000] [--latency 5] [--limit 16 64 256]
+"""
+import argparse
+import asyncio
+import functools
+import shutil
+import tempfile
+import time
+
+from async_scanner import read_prefix, scan_directory_async
+from bench_imageinfo import make_directory
+from scanner import _safe_info, scan_directory
+
+
+def slow_read_prefix(path, latency):
+    time.sleep(latency)
+    return read_prefix(path)
+
+
+def slow_info(path, latency):
+    time.sleep(latency)
+    return _safe_info(path)
+
+
+async def run_async(folder, limit, latency):
+    reader = functools.partial(slow_read_prefix, latency=latency)
+    count = 0
+    async for _ in scan_directory_async(folder, limit=limit, reader=reader):
+        count += 1
+    return count
+
+
+def report(name, count, elapsed):
+    print(f"{name:<22} {count / elapsed:>10.0f} файлов/с   {elapsed:>7.2f} с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--dir', help="готовая папка с изображениями (иначе создается временная)")
+    parser.add_argument('--latency', type=float, default=5.0, help="задержка на открытие, мс")
+    parser.add_argument('--limit', type=int, nargs='+', default=[16, 64, 256])
+    args = parser.parse_args()
+    latency = args.latency / 1000
+
+    folder = args.dir
+    if folder is None:
+        folder = tempfile.mkdtemp(prefix='bench_async_')
+        print(f"Создание {args.count} файлов в {folder}...")
+        make_directory(folder, args.count)
+
+    try:
+        process = functools.partial(slow_info, latency=latency)
+        for backend in ('serial', 'thread'):
+            start = time.perf_counter()
+            count = sum(1 for _ in scan_directory(folder, process=process, backend=backend))
+            report(f"sync {backend}", count, time.perf_counter() - start)
+
+        for limit in args.limit:
+            start = time.perf_counter()
+            count = asyncio.run(run_async(folder, limit, latency))
+            report(f"async limit={limit}", count, time.perf_counter() - start)
+    finally:
+        if args.dir is None:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
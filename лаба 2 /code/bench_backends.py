@@ -0,0 +1,76 @@
+"""Бенчмарк исполнителей сканера: ускорение относительно serial в зависимости от числа ядер.
+
+Каждая конфигурация запускается на холодном кэше (страницы файлов сброшены
+через posix_fadvise) и на теплом (сразу после холодного прогона).
+
+Запуск: python bench_backends.py [--count 20000] [--dir путь] [--workers 1 2 4 8]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from bench_imageinfo import make_directory
+from scanner import iter_image_files, scan_directory
+
+
+def drop_page_cache(paths):
+    # Без прав root сбросить весь кэш нельзя, но чистые страницы своих файлов — можно
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def timed_scan(folder, backend, workers, chunk_size):
+    start = time.perf_counter()
+    count = sum(1 for _ in scan_directory(folder, backend=backend, workers=workers, chunk_size=chunk_size))
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=20000)
+    parser.add_argument('--dir', help="готовая папка с изображениями (иначе создается временная)")
+    parser.add_argument('--workers', type=int, nargs='+')
+    parser.add_argument('--chunk-size', type=int)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    workers_list = args.workers or sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+
+    folder = args.dir
+    if folder is None:
+        folder = tempfile.mkdtemp(prefix='bench_backends_')
+        print(f"Создание {args.count} файлов в {folder}...")
+        make_directory(folder, args.count)
+
+    try:
+        paths = [entry.path for entry in iter_image_files(folder)]
+        configs = [('serial', 1)] + [(backend, workers) for backend in ('thread', 'process')
+                                     for workers in workers_list]
+        configs.append(('auto', None))
+
+        baseline = {}
+        print(f"{'backend':<8} {'workers':>7} {'кэш':>6} {'файлов/с':>10} {'ускорение':>10}")
+        for backend, workers in configs:
+            for cache in ('cold', 'warm'):
+                if cache == 'cold' and not drop_page_cache(paths):
+                    continue
+                count, elapsed = timed_scan(folder, backend, workers, args.chunk_size)
+                rate = count / elapsed
+                baseline.setdefault(cache, rate)
+                print(f"{backend:<8} {workers or '-':>7} {cache:>6} {rate:>10.0f} {rate / baseline[cache]:>9.2f}x")
+    finally:
+        if args.dir is None:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Бенчмарк чтения метаданных: файлов в секунду и пиковое число открытых дескрипторов.
+
+Запуск: python bench_imageinfo.py [--count 50000] [--dir путь]
+"""
+import argparse
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from PIL import Image
+
+from imageinfo import read_image_info
+
+
+def count_open_fds():
+    # На Linux дескрипторы процесса видны в /proc/self/fd
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return -1
+
+
+class FdSampler(threading.Thread):
+    """Фоновый поток, который запоминает максимум открытых дескрипторов"""
+
+    def __init__(self, interval=0.001):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = count_open_fds()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, count_open_fds())
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, count_open_fds())
+
+
+def make_samples():
+    """Небольшие изображения всех поддерживаемых форматов в виде байтов"""
+    samples = []
+    for fmt, ext, mode in [('JPEG', 'jpg', 'RGB'), ('PNG', 'png', 'RGBA'), ('GIF', 'gif', 'P'),
+                           ('BMP', 'bmp', 'RGB'), ('TIFF', 'tif', 'RGB'), ('PCX', 'pcx', 'L')]:
+        buffer = io.BytesIO()
+        Image.new(mode, (640, 480)).save(buffer, fmt)
+        samples.append((ext, buffer.getvalue()))
+    return samples
+
+
+def make_directory(folder, count):
+    samples = make_samples()
+    for i in range(count):
+        ext, data = samples[i % len(samples)]
+        with open(os.path.join(folder, f"img_{i:06d}.{ext}"), 'wb') as f:
+            f.write(data)
+
+
+def legacy_image_info(image_path):
+    """Прежняя реализация get_image_info: два Image.open, первый дескриптор не закрывается"""
+    data = Image.open(image_path)  # noqa: F841
+    with Image.open(image_path) as img:
+        return {'size': f"{img.width} x {img.height} px", 'color_depth': img.mode}
+
+
+def run(name, func, paths):
+    sampler = FdSampler()
+    baseline = count_open_fds()
+    sampler.start()
+    start = time.perf_counter()
+    for path in paths:
+        func(path)
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+    print(f"{name:<12} {len(paths) / elapsed:>10.0f} файлов/с   "
+          f"пик открытых FD: {sampler.peak} (до запуска {baseline})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=50000)
+    parser.add_argument('--dir', help="готовая папка с изображениями (иначе создается временная)")
+    args = parser.parse_args()
+
+    folder = args.dir
+    if folder is None:
+        folder = tempfile.mkdtemp(prefix='bench_imageinfo_')
+        print(f"Создание {args.count} файлов в {folder}...")
+        make_directory(folder, args.count)
+
+    try:
+        paths = [entry.path for entry in os.scandir(folder) if entry.is_file()]
+        run("PIL x2", legacy_image_info, paths)
+        run("header", read_image_info, paths)
+    finally:
+        if args.dir is None:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import hashlib
+from collections import defaultdict
+
+# Размер блока при потоковом хешировании содержимого
+HASH_CHUNK = 1 << 20
+# Размер уменьшенного изображения для перцептивного хеша (dHash 8x8 = 64 бита)
+HASH_SIZE = 8
+# Максимальное расстояние Хэмминга между dHash, при котором изображения считаются похожими
+NEAR_DISTANCE = 4
+
+
+def content_hash(path, chunk_size=HASH_CHUNK):
+    """BLAKE2b содержимого файла; файл читается блоками и не декодируется"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def perceptual_hash(path):
+    """dHash: знаки разностей соседних пикселей уменьшенного серого изображения (64 бита)"""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        # Для JPEG draft() декодирует сразу в 1/2..1/8 масштаба — полное декодирование не нужно
+        img.draft('L', (HASH_SIZE * 8, HASH_SIZE * 8))
+        small = img.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR, reducing_gap=2.0)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def add_hashes(process, path):
+    """Дополнительная стадия сканера: к результату process(path) добавляются хеши"""
+    result = process(path)
+    if 'error' in result:
+        return result
+    try:
+        result['content_hash'] = content_hash(path)
+        result['phash'] = perceptual_hash(path)
+    except Exception as e:
+        # Метаданные уже есть — ошибку хеширования отмечаем, но строку не теряем
+        result['hash_error'] = str(e)
+    return result
+
+
+def find_duplicates(records):
+    """Группы путей с одинаковым content_hash; records — пары (path, content_hash)"""
+    groups = defaultdict(list)
+    for path, digest in records:
+        groups[digest].append(path)
+    return [sorted(paths) for paths in groups.values() if len(paths) > 1]
+
+
+class MultiIndexHash:
+    """Поиск 64-битных хешей на расстоянии Хэмминга не больше max_distance.
+
+    Хеш делится на max_distance // 2 + 1 блоков. По принципу Дирихле у близких
+    хешей хотя бы один блок отличается не больше чем на 1 бит, поэтому
+    кандидаты ищутся в словарях по блоку и его однобитным соседям, а полное
+    расстояние считается только для них.
+    """
+
+    def __init__(self, max_distance=NEAR_DISTANCE, bits=HASH_SIZE * HASH_SIZE):
+        self.max_distance = max_distance
+        blocks = max_distance // 2 + 1
+        edges = [bits * i // blocks for i in range(blocks + 1)]
+        # (сдвиг, маска, маски однобитных соседей вместе с нулевой)
+        self.blocks = [(start, (1 << (end - start)) - 1, [0] + [1 << bit for bit in range(end - start)])
+                       for start, end in zip(edges, edges[1:])]
+        self.tables = [{} for _ in self.blocks]
+        self.hashes = []
+
+    def add(self, value):
+        """Добавляет хеш и возвращает его номер"""
+        number = len(self.hashes)
+        self.hashes.append(value)
+        for table, (shift, mask, _flips) in zip(self.tables, self.blocks):
+            table.setdefault((value >> shift) & mask, []).append(number)
+        return number
+
+    def query(self, value):
+        """Номера добавленных хешей, близких к value"""
+        candidates = set()
+        for table, (shift, mask, flips) in zip(self.tables, self.blocks):
+            key = (value >> shift) & mask
+            get = table.get
+            for flip in flips:
+                bucket = get(key ^ flip)
+                if bucket:
+                    candidates.update(bucket)
+        hashes = self.hashes
+        return {number for number in candidates if (hashes[number] ^ value).bit_count() <= self.max_distance}
+
+
+def find_near_duplicates(records, max_distance=NEAR_DISTANCE):
+    """Группы похожих изображений; records — пары (path, phash). Связность транзитивная"""
+    paths = []
+    index = MultiIndexHash(max_distance)
+    parent = []
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for path, value in records:
+        # Сначала ищем среди уже добавленных — так каждая пара проверяется один раз
+        neighbours = index.query(value)
+        number = index.add(value)
+        paths.append(path)
+        parent.append(number)
+        for other in neighbours:
+            parent[find(other)] = find(number)
+
+    groups = defaultdict(list)
+    for number, path in enumerate(paths):
+        groups[find(number)].append(path)
+    return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+class DuplicateFinder:
+    """Копит хеши по ходу сканирования и в конце строит группы дубликатов"""
+
+    def __init__(self, max_distance=NEAR_DISTANCE):
+        self.max_distance = max_distance
+        self.exact = []
+        self.near = []
+
+    def add(self, path, result):
+        if 'content_hash' in result:
+            self.exact.append((path, result['content_hash']))
+        if 'phash' in result:
+            self.near.append((path, result['phash']))
+
+    def report(self):
+        return {
+            'exact': find_duplicates(self.exact),
+            'near': find_near_duplicates(self.near, self.max_distance),
+            'max_distance': self.max_distance,
+        }
@@ -0,0 +1,325 @@
+import os
+import struct
+import time
+
+# Сколько байт читаем за один раз при разборе заголовка.
+# Для большинства форматов этого хватает с первого чтения.
+HEADER_CHUNK = 512
+
+# Коды сжатия TIFF -> названия, совпадающие с img.info['compression'] в PIL
+TIFF_COMPRESSION = {
+    1: 'raw',
+    2: 'tiff_ccitt',
+    3: 'group3',
+    4: 'group4',
+    5: 'tiff_lzw',
+    6: 'tiff_jpeg',
+    7: 'jpeg',
+    8: 'tiff_adobe_deflate',
+    32771: 'tiff_raw_16',
+    32773: 'packbits',
+    32809: 'tiff_thunderscan',
+    32946: 'tiff_deflate',
+    34676: 'tiff_sgilog',
+    34677: 'tiff_sgilog24',
+    34925: 'lzma',
+    50000: 'zstd',
+    50001: 'webp',
+}
+
+BMP_COMPRESSION = {0: 'None', 1: 'RLE8', 2: 'RLE4', 3: 'Bitfields', 6: 'Bitfields'}
+# Сжатие форматов, у которых оно одно на весь формат; те же названия отдают разборщики заголовков
+FORMAT_COMPRESSION = {'JPEG': 'Lossy', 'PNG': 'Deflate', 'GIF': 'LZW', 'PCX': 'RLE'}
+
+# Маркеры SOF, в которых лежат размеры кадра JPEG (кроме DHT, JPG и DAC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _read_exact(fp, size):
+    data = fp.read(size)
+    if len(data) != size:
+        raise EOFError("unexpected end of header")
+    return data
+
+
+def _is_grayscale_palette(palette, entry_size, colors):
+    """Палитра вида (0,0,0), (1,1,1), ... — PIL открывает такие файлы как 'L'"""
+    if colors == 2:
+        indices = (0, 255)
+    else:
+        indices = range(colors)
+    for i, value in enumerate(indices):
+        start = i * entry_size
+        if palette[start:start + 3] != bytes((value, value, value)):
+            return False
+    return True
+
+
+def _parse_png(fp, head):
+    if len(head) < 33 or head[12:16] != b'IHDR':
+        return None
+    width, height, bit_depth, color_type = struct.unpack(">IIBB", head[16:26])
+    if color_type == 0:
+        mode = {1: '1', 2: 'L', 4: 'L', 8: 'L', 16: 'I;16'}.get(bit_depth)
+    elif color_type == 2:
+        mode = 'RGB'
+    elif color_type == 3:
+        mode = 'P'
+    elif color_type == 4:
+        mode = 'LA'
+    elif color_type == 6:
+        mode = 'RGBA'
+    else:
+        mode = None
+    if mode is None:
+        return None
+    return 'PNG', width, height, mode, 'Deflate'
+
+
+def _parse_gif(fp, head):
+    if len(head) < 13:
+        return None
+    width, height, flags = struct.unpack("<HHB", head[6:11])
+    mode = 'L'
+    if flags & 0x80:
+        colors = 2 << (flags & 7)
+        palette = head[13:13 + 3 * colors]
+        if len(palette) < 3 * colors:
+            fp.seek(13)
+            palette = _read_exact(fp, 3 * colors)
+        # PIL оставляет 'L' только для линейной серой палитры
+        for i in range(colors):
+            if palette[3 * i:3 * i + 3] != bytes((i, i, i)):
+                mode = 'P'
+                break
+    return 'GIF', width, height, mode, 'LZW'
+
+
+def _parse_bmp(fp, head):
+    if len(head) < 26:
+        return None
+    header_size = struct.unpack("<I", head[14:18])[0]
+    if header_size == 12:
+        width, height, _planes, bits = struct.unpack("<HHHH", head[18:26])
+        compression = 0
+        colors = 0
+        palette_entry = 3
+    elif header_size >= 40:
+        if len(head) < 54:
+            return None
+        width, height, _planes, bits, compression = struct.unpack("<iiHHI", head[18:34])
+        colors = struct.unpack("<I", head[46:50])[0]
+        palette_entry = 4
+    else:
+        return None
+    if compression not in BMP_COMPRESSION:
+        return None
+    height = abs(height)
+
+    if bits <= 8:
+        colors = colors or (1 << bits)
+        # Палитра идет сразу за DIB-заголовком, этого достаточно, чтобы отличить 1/L/P
+        fp.seek(14 + header_size)
+        palette = _read_exact(fp, colors * palette_entry)
+        if _is_grayscale_palette(palette, palette_entry, colors) and colors in (2, 256):
+            mode = '1' if colors == 2 else 'L'
+        else:
+            mode = 'P'
+    elif bits in (16, 24):
+        mode = 'RGB'
+    elif bits == 32:
+        mode = 'RGB'
+        if compression in (3, 6) and header_size >= 56:
+            fp.seek(14 + 40)
+            alpha_mask = struct.unpack("<4I", _read_exact(fp, 16))[3]
+            if alpha_mask:
+                mode = 'RGBA'
+    else:
+        return None
+    return 'BMP', width, height, mode, BMP_COMPRESSION[compression]
+
+
+def _parse_jpeg(fp, head):
+    fp.seek(2)
+    while True:
+        byte = _read_exact(fp, 1)
+        if byte != b'\xff':
+            return None
+        marker = _read_exact(fp, 1)[0]
+        # Пропускаем заполняющие 0xFF
+        while marker == 0xFF:
+            marker = _read_exact(fp, 1)[0]
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            continue
+        if marker in (0xD9, 0xDA):
+            # Дошли до данных, а SOF так и не встретился
+            return None
+        length = struct.unpack(">H", _read_exact(fp, 2))[0]
+        if marker in JPEG_SOF_MARKERS:
+            _precision, height, width, components = struct.unpack(">BHHB", _read_exact(fp, 6))
+            mode = {1: 'L', 3: 'RGB', 4: 'CMYK'}.get(components)
+            if mode is None:
+                return None
+            return 'JPEG', width, height, mode, 'Lossy'
+        fp.seek(length - 2, os.SEEK_CUR)
+
+
+def _parse_tiff(fp, head):
+    endian = '<' if head[:2] == b'II' else '>'
+    if struct.unpack(endian + "H", head[2:4])[0] != 42:
+        # BigTIFF и прочие варианты отдаем PIL
+        return None
+    ifd_offset = struct.unpack(endian + "I", head[4:8])[0]
+    fp.seek(ifd_offset)
+    count = struct.unpack(endian + "H", _read_exact(fp, 2))[0]
+    entries = _read_exact(fp, count * 12)
+
+    tags = {}
+    for i in range(count):
+        tag, type_, n = struct.unpack(endian + "HHI", entries[i * 12:i * 12 + 8])
+        value = entries[i * 12 + 8:i * 12 + 12]
+        if type_ == 3 and n <= 2:
+            values = struct.unpack(endian + "%dH" % n, value[:2 * n])
+        elif type_ == 4 and n == 1:
+            values = struct.unpack(endian + "I", value)
+        elif type_ == 3 and tag == 258:
+            # BitsPerSample для нескольких каналов лежит по смещению
+            offset = struct.unpack(endian + "I", value)[0]
+            pos = fp.tell()
+            fp.seek(offset)
+            values = struct.unpack(endian + "%dH" % n, _read_exact(fp, 2 * n))
+            fp.seek(pos)
+        else:
+            continue
+        tags[tag] = values
+
+    if 256 not in tags or 257 not in tags:
+        return None
+    width = tags[256][0]
+    height = tags[257][0]
+    bits = tags.get(258, (1,))
+    compression = tags.get(259, (1,))[0]
+    photometric = tags.get(262, (None,))[0]
+    samples = tags.get(277, (1,))[0]
+    extra = tags.get(338, (0,))[0] if samples in (2, 4) else 0
+
+    if len(set(bits)) != 1:
+        return None
+    bits = bits[0]
+    if photometric in (0, 1) and samples == 1:
+        if bits == 16:
+            mode = 'I;16' if endian == '<' else 'I;16B'
+        else:
+            mode = {1: '1', 8: 'L'}.get(bits)
+    elif photometric == 2 and bits == 8:
+        if samples == 3:
+            mode = 'RGB'
+        elif samples == 4 and extra in (1, 2):
+            mode = 'RGBA'
+        else:
+            mode = None
+    elif photometric == 3 and samples == 1 and bits in (1, 2, 4, 8):
+        mode = 'P'
+    elif photometric == 5 and samples == 4 and bits == 8:
+        mode = 'CMYK'
+    else:
+        mode = None
+    if mode is None or compression not in TIFF_COMPRESSION:
+        return None
+    return 'TIFF', width, height, mode, TIFF_COMPRESSION[compression]
+
+
+def _parse_pcx(fp, head):
+    if len(head) < 128 or head[2] != 1:
+        return None
+    version, _encoding, bits = head[1], head[2], head[3]
+    xmin, ymin, xmax, ymax = struct.unpack("<HHHH", head[4:12])
+    planes = head[65]
+    width = xmax - xmin + 1
+    height = ymax - ymin + 1
+
+    if bits == 1 and planes == 1:
+        mode = '1'
+    elif bits == 1 and planes in (2, 4):
+        mode = 'P'
+    elif version == 5 and bits == 8 and planes == 1:
+        # 256-цветная палитра лежит в последних 769 байтах файла
+        mode = 'L'
+        fp.seek(-769, os.SEEK_END)
+        tail = fp.read(769)
+        if len(tail) == 769 and tail[0] == 12:
+            if not _is_grayscale_palette(tail[1:], 3, 256):
+                mode = 'P'
+    elif version == 5 and bits == 8 and planes == 3:
+        mode = 'RGB'
+    else:
+        return None
+    return 'PCX', width, height, mode, 'RLE'
+
+
+def parse_header(fp):
+    """Разбирает заголовок открытого файла. Возвращает (format, width, height, mode, compression) или None"""
+    head = fp.read(HEADER_CHUNK)
+    if head[:8] == b'\x89PNG\r\n\x1a\n':
+        parser = _parse_png
+    elif head[:3] == b'\xff\xd8\xff':
+        parser = _parse_jpeg
+    elif head[:6] in (b'GIF87a', b'GIF89a'):
+        parser = _parse_gif
+    elif head[:2] == b'BM':
+        parser = _parse_bmp
+    elif head[:4] in (b'II*\x00', b'MM\x00*'):
+        parser = _parse_tiff
+    elif head[:1] == b'\x0a':
+        parser = _parse_pcx
+    else:
+        return None
+    try:
+        return parser(fp, head)
+    except (EOFError, struct.error, OSError):
+        # Поврежденный или нестандартный заголовок — пусть разбирается PIL
+        return None
+
+
+def _info_from_pil(fp):
+    # Импортируем лениво: для распознанных форматов PIL не нужен вовсе
+    from PIL import Image
+
+    fp.seek(0)
+    with Image.open(fp) as img:
+        # Названия совпадают с теми, что дает разбор заголовка, — иначе фильтр по сжатию делил бы один тип надвое
+        if img.format == 'TIFF':
+            compression = img.info.get('compression', 'N/A')
+        elif img.format == 'BMP':
+            compression = BMP_COMPRESSION.get(img.info.get('compression'), 'N/A')
+        else:
+            compression = FORMAT_COMPRESSION.get(img.format, 'N/A')
+        return img.format, img.width, img.height, img.mode, compression
+
+
+def read_image_info(image_path, timings=None):
+    """Открывает файл один раз и читает только заголовок. PIL используется лишь для неизвестных форматов.
+
+    Если передан словарь timings, в него записывается время стадий (в секундах): open, parse, total.
+    """
+    start = time.perf_counter()
+    with open(image_path, 'rb') as fp:
+        opened = time.perf_counter()
+        header = parse_header(fp)
+        if header is None:
+            header = _info_from_pil(fp)
+        parsed = time.perf_counter()
+    if timings is not None:
+        timings['open'] = opened - start
+        timings['parse'] = parsed - opened
+        timings['total'] = time.perf_counter() - start
+    image_format, width, height, mode, compression = header
+    return {
+        'filename': os.path.basename(image_path),
+        'size': f"{width} x {height} px",
+        'color_depth': mode,
+        'compression': compression,
+        'width': width,
+        'height': height,
+        'format': image_format,
+    }
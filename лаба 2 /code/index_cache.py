@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+
+# Сколько изменений накапливается перед записью в базу одной транзакцией
+FLUSH_EVERY = 1000
+
+
+class MetadataIndex:
+    """Индекс метаданных на диске (SQLite), ключ — (путь, st_mtime_ns, st_size).
+
+    Хранит словарь, который возвращает get_image_info, поэтому повторное
+    сканирование читает заново только новые и измененные файлы.
+    Все обращения должны идти из одного потока — того, в котором идет обход папки.
+    """
+
+    def __init__(self, db_path, max_entries=1_000_000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Номер сканирования: им помечаются все записи, встреченные в этом проходе
+        self.generation = time.time_ns()
+        self._pending_store = []
+        self._pending_touch = []
+
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " info TEXT NOT NULL,"
+            " generation INTEGER NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_generation ON entries(generation)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def lookup(self, path, mtime_ns, size):
+        """Возвращает сохраненный словарь или None, если файла нет в индексе или он изменился"""
+        row = self.connection.execute(
+            "SELECT mtime_ns, size, info FROM entries WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None or row[0] != mtime_ns or row[1] != size:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._pending_touch.append((self.generation, path))
+        if len(self._pending_touch) >= FLUSH_EVERY:
+            self.flush()
+        return json.loads(row[2])
+
+    def store(self, path, mtime_ns, size, info):
+        self._pending_store.append((path, mtime_ns, size, json.dumps(info), self.generation))
+        if len(self._pending_store) >= FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        with self.connection:
+            if self._pending_store:
+                self.connection.executemany(
+                    "INSERT OR REPLACE INTO entries (path, mtime_ns, size, info, generation) VALUES (?, ?, ?, ?, ?)",
+                    self._pending_store,
+                )
+            if self._pending_touch:
+                self.connection.executemany(
+                    "UPDATE entries SET generation = ? WHERE path = ?", self._pending_touch
+                )
+        self._pending_store = []
+        self._pending_touch = []
+
+    def prune_missing(self, folder):
+        """Удаляет записи из папки folder, не встреченные в текущем (завершенном) сканировании"""
+        self.flush()
+        prefix = os.path.join(folder, '')
+        with self.connection:
+            cursor = self.connection.execute(
+                "DELETE FROM entries WHERE substr(path, 1, ?) = ? AND generation != ?",
+                (len(prefix), prefix, self.generation),
+            )
+        if cursor.rowcount:
+            logging.info(f"Index: removed {cursor.rowcount} deleted files under {folder}")
+
+    def evict(self):
+        """Оставляет не больше max_entries записей, выбрасывая давно не встречавшиеся"""
+        self.flush()
+        count = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        extra = count - self.max_entries
+        if extra > 0:
+            with self.connection:
+                self.connection.execute(
+                    "DELETE FROM entries WHERE path IN "
+                    "(SELECT path FROM entries ORDER BY generation LIMIT ?)",
+                    (extra,),
+                )
+            logging.info(f"Index: evicted {extra} entries (limit {self.max_entries})")
+
+    def close(self):
+        self.evict()
+        total = self.hits + self.misses
+        ratio = self.hits / total * 100 if total else 0.0
+        logging.info(f"Index: {self.hits} hits, {self.misses} misses ({ratio:.1f}% hit rate)")
+        self.connection.close()
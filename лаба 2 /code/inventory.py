@@ -0,0 +1,232 @@
+"""Опись изображений без графического интерфейса.
+
+Запуск из папки code:
+    python -m inventory ПАПКА [-f jsonl|csv|npz] [-o файл] [--backend auto] [--index image_index.sqlite]
+    python -m inventory ПАПКА --inflight 256   # сетевые папки: много одновременных open()
+    python -m inventory ПАПКА --hashes --duplicates duplicates.json
+
+Результаты пишутся потоком по мере сканирования. Формат npz — колоночный:
+строки хранятся одним UTF-8 буфером со смещениями (как в Arrow/Parquet),
+повторяющиеся значения (режим, сжатие, формат) — словарем и массивом кодов.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+from array import array
+
+from async_scanner import scan_directory_async
+from backends import BACKENDS
+from dedup import DuplicateFinder
+from index_cache import MetadataIndex
+from scan_stats import ScanStats
+from scanner import ScanProgress, scan_directory
+
+FIELDS = ('path', 'filename', 'width', 'height', 'size', 'color_depth', 'compression', 'format', 'error', 'error_type',
+          'content_hash', 'phash')
+STRING_COLUMNS = ('path', 'filename', 'error', 'content_hash')
+CATEGORY_COLUMNS = ('color_depth', 'compression', 'format', 'error_type')
+
+
+def iter_inventory(folder, index_path=None, **scan_options):
+    """Отдает по одной записи на файл; scan_options передаются в scan_directory"""
+    if index_path is None:
+        for path, result in scan_directory(folder, **scan_options):
+            yield dict(result, path=path)
+        return
+    with MetadataIndex(index_path) as index:
+        for path, result in scan_directory(folder, index=index, **scan_options):
+            yield dict(result, path=path)
+
+
+async def write_inventory_async(folder, writer, limit, progress=None, stats=None):
+    """Асинхронный вариант для сетевых папок: до limit файлов читаются одновременно"""
+    async for path, result in scan_directory_async(folder, limit=limit, progress=progress):
+        if stats is not None:
+            stats.add(path, result)
+        writer.write(dict(result, path=path))
+
+
+class JsonLinesWriter:
+    binary = False
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, record):
+        # Время обработки относится к этому проходу (см. --stats) и в опись не пишется
+        record = {key: value for key, value in record.items() if key != 'timings'}
+        self.stream.write(json.dumps(record, ensure_ascii=False))
+        self.stream.write('\n')
+
+    def close(self):
+        pass
+
+
+class CsvWriter:
+    binary = False
+
+    def __init__(self, stream):
+        self.writer = csv.DictWriter(stream, fieldnames=FIELDS, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+
+    def close(self):
+        pass
+
+
+class ColumnarWriter:
+    """Копит колонки в компактных массивах и сохраняет их в .npz при закрытии"""
+    binary = True
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.width = array('I')
+        self.height = array('I')
+        self.phash = array('Q')
+        self.strings = {name: (bytearray(), array('Q', [0])) for name in STRING_COLUMNS}
+        self.categories = {name: ({}, array('H')) for name in CATEGORY_COLUMNS}
+
+    def write(self, record):
+        self.width.append(record.get('width', 0))
+        self.height.append(record.get('height', 0))
+        self.phash.append(record.get('phash', 0))
+        for name, (data, offsets) in self.strings.items():
+            data += (record.get(name) or '').encode('utf-8')
+            offsets.append(len(data))
+        for name, (codes, values) in self.categories.items():
+            values.append(codes.setdefault(record.get(name) or '', len(codes)))
+
+    def close(self):
+        import numpy as np
+
+        columns = {
+            'width': np.frombuffer(self.width, dtype=np.uint32),
+            'height': np.frombuffer(self.height, dtype=np.uint32),
+            'phash': np.frombuffer(self.phash, dtype=np.uint64),
+        }
+        for name, (data, offsets) in self.strings.items():
+            columns[name + '.data'] = np.frombuffer(bytes(data), dtype=np.uint8)
+            columns[name + '.offsets'] = np.frombuffer(offsets, dtype=np.uint64)
+        for name, (codes, values) in self.categories.items():
+            columns[name + '.codes'] = np.frombuffer(values, dtype=np.uint16)
+            columns[name + '.categories'] = np.array(list(codes), dtype=str)
+        np.savez(self.stream, **columns)
+
+
+WRITERS = {'jsonl': JsonLinesWriter, 'csv': CsvWriter, 'npz': ColumnarWriter}
+
+
+def load_columnar(path):
+    """Читает .npz обратно: числа — массивами, строки — списками, категории — (коды, словарь)"""
+    import numpy as np
+
+    with np.load(path) as data:
+        table = {'width': data['width'], 'height': data['height'], 'phash': data['phash']}
+        for name in STRING_COLUMNS:
+            raw = data[name + '.data'].tobytes()
+            offsets = data[name + '.offsets']
+            table[name] = [raw[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)]
+        for name in CATEGORY_COLUMNS:
+            table[name] = (data[name + '.codes'], [str(value) for value in data[name + '.categories']])
+    return table
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='inventory', description="Опись изображений в папке")
+    parser.add_argument('folder')
+    parser.add_argument('-f', '--format', choices=sorted(WRITERS), default='jsonl')
+    parser.add_argument('-o', '--output', default='-', help="файл результата, '-' — stdout")
+    # Без значения по умолчанию: так видно, задан ли --backend явно (по умолчанию 'auto')
+    parser.add_argument('--backend', choices=BACKENDS)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--chunk-size', type=int)
+    parser.add_argument('--index', help="путь к индексу метаданных (SQLite)")
+    parser.add_argument('--inflight', type=int,
+                        help="асинхронный режим для сетевых папок: сколько файлов читать одновременно")
+    parser.add_argument('--hashes', action='store_true',
+                        help="считать хеш содержимого и перцептивный хеш (кэшируются в --index)")
+    parser.add_argument('--duplicates', help="сохранить группы дубликатов и похожих изображений в JSON (включает --hashes)")
+    parser.add_argument('--stats', help="сохранить сводку времени обработки (p50/p95/p99, ошибки) в JSON")
+    parser.add_argument('--log', help="писать журнал в файл (по умолчанию только предупреждения в stderr)")
+    args = parser.parse_args(argv)
+    if args.inflight is not None and args.index is not None:
+        parser.error("--inflight cannot be combined with --index")
+    if args.inflight is not None and (args.hashes or args.duplicates):
+        parser.error("--inflight cannot be combined with --hashes")
+    if args.inflight is not None and args.backend is not None:
+        parser.error("--inflight cannot be combined with --backend")
+    if args.inflight is not None and (args.workers is not None or args.chunk_size is not None):
+        parser.error("--inflight cannot be combined with --workers or --chunk-size")
+    if args.backend is None:
+        args.backend = 'auto'
+    if args.duplicates:
+        args.hashes = True
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.log:
+        logging.basicConfig(filename=args.log, level=logging.INFO,
+                            format="%(asctime)s - %(levelname)s - %(message)s")
+    else:
+        logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    writer_class = WRITERS[args.format]
+    if args.output == '-':
+        stream = sys.stdout.buffer if writer_class.binary else sys.stdout
+        close_stream = False
+    else:
+        if writer_class.binary:
+            stream = open(args.output, 'wb')
+        else:
+            stream = open(args.output, 'w', newline='', encoding='utf-8')
+        close_stream = True
+
+    progress = ScanProgress()
+    stats = ScanStats()
+    finder = DuplicateFinder() if args.duplicates else None
+    try:
+        writer = writer_class(stream)
+        if args.inflight is not None:
+            asyncio.run(write_inventory_async(args.folder, writer, args.inflight, progress, stats))
+        else:
+            for record in iter_inventory(args.folder, index_path=args.index, backend=args.backend,
+                                         workers=args.workers, chunk_size=args.chunk_size, progress=progress,
+                                         hashes=args.hashes):
+                stats.add(record['path'], record)
+                if finder is not None:
+                    finder.add(record['path'], record)
+                writer.write(record)
+        writer.close()
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # Вывод обрезан (например, через head): молча завершаемся, как обычные утилиты
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    finally:
+        if close_stream:
+            stream.close()
+
+    logging.info(f"Inventory of {args.folder}: {progress.done} files, {progress.errors} errors, "
+                 f"{progress.elapsed:.2f} s ({progress.files_per_sec:.0f} files/s, backend {progress.backend})")
+    stats.log_summary()
+    if args.stats:
+        stats.export_json(args.stats)
+    if finder is not None:
+        report = finder.report()
+        with open(args.duplicates, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logging.info(f"Duplicates: {len(report['exact'])} exact groups, {len(report['near'])} near groups")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
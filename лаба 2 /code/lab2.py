@@ -1,61 +1,186 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk  # Используем ttk для Treeview
-from PIL import Image
-from PIL.PngImagePlugin import PngImageFile
-from PIL.JpegImagePlugin import JpegImageFile
-from PIL.BmpImagePlugin import BmpImageFile
-from PIL.GifImagePlugin import GifImageFile
-from PIL.TiffImagePlugin import TiffImageFile
 import os
-import concurrent.futures
+import json
+import queue
+import threading
 import logging
+from imageinfo import read_image_info
+from scanner import ScanProgress, scan_directory
+from index_cache import MetadataIndex
+from scan_stats import ScanStats, setup_queue_logging
+from result_store import ResultStore
+from dedup import DuplicateFinder
+from virtual_table import VirtualTable
+
+# Окно и виджеты создаются в create_gui(), чтобы модуль можно было импортировать без дисплея
+root = None
+table = None
+status_label = None
+btn_cancel = None
+filter_mode = None
+filter_compression = None
+filter_min_mp = None
+filter_max_mp = None
+find_duplicates_var = None
+
+# Результаты хранятся в колоночном виде, таблица показывает только видимые строки
+store = ResultStore()
+
+
+def setup_logging():
+    # Настройка логирования: запись в файл идет в отдельном потоке, пачками
+    setup_queue_logging("image_processing.log")
 
-# Настройка логирования
-logging.basicConfig(
-    filename="image_processing.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
-)
 
 # Функция для получения информации о изображении
 def get_image_info(image_path):
     try:
-        info = {}
-        data = Image.open(image_path)
-        with Image.open(image_path) as img:
-            info['filename'] = os.path.basename(image_path)
-            info['size'] = f"{img.width} x {img.height} px"
-            info['color_depth'] = img.mode
-            if isinstance(img, JpegImageFile):
-                info['compression'] = 'Lossy'
-            elif isinstance(img, PngImageFile):
-                info['compression'] = 'Deflate'
-            elif isinstance(img, GifImageFile):
-                info['compression'] = 'LZW'
-            elif isinstance(img, BmpImageFile):
-                info['compression'] = 'RLE or None'
-            elif isinstance(img, TiffImageFile):
-                info['compression'] = img.info.get('compression', 'N/A')
-            else:
-                info['compression'] = 'N/A'
-
-        logging.info(f"Processed file: {image_path}")
+        # Файл открывается один раз, читается только заголовок
+        timings = {}
+        info = read_image_info(image_path, timings)
+        info['timings'] = timings
+        logging.info(f"Processed file: {image_path} ({timings['total'] * 1000:.3f} ms)")
         return info
 
     except Exception as e:
         logging.error(f"Error processing file {image_path}: {e}")
-        return {'error': str(e)}
+        return {'filename': os.path.basename(image_path), 'error': str(e), 'error_type': type(e).__name__}
 
-# Асинхронная обработка файлов
+# Обработка одного файла (вызывается из пула потоков сканера)
 def process_file(file_path):
     try:
         return get_image_info(file_path)
     except Exception as e:
         logging.error(f"Error in process_file for {file_path}: {e}")
-        return {'filename': os.path.basename(file_path), 'error': str(e)}
+        return {'filename': os.path.basename(file_path), 'error': str(e), 'error_type': type(e).__name__}
+
+# Сколько результатов переносится в хранилище за один вызов root.after
+ROWS_PER_BATCH = 5000
+POLL_INTERVAL_MS = 30
+
+# Индекс метаданных лежит рядом с логом, чтобы повторные сканирования были быстрыми
+INDEX_PATH = "image_index.sqlite"
+# Сводка по времени обработки (p50/p95/p99 по форматам, медленные файлы, ошибки) для дашбордов
+SUMMARY_PATH = "scan_summary.json"
+# Группы одинаковых и похожих изображений (если включен поиск дубликатов)
+DUPLICATES_PATH = "duplicates.json"
+
+# Параметры исполнителя (см. backends.py): 'thread', 'process', 'serial' или 'auto'.
+# None — значения по умолчанию для выбранного режима.
+SCAN_BACKEND = "auto"
+SCAN_WORKERS = None
+SCAN_CHUNK_SIZE = None
+
+# Состояние текущего сканирования: флаг отмены и очередь результатов, которую показывает таблица
+scan_cancel = None
+scan_results = None
+
+
+def write_duplicates(finder, results):
+    report = finder.report()
+    with open(DUPLICATES_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    logging.info(f"Duplicates: {len(report['exact'])} exact groups, {len(report['near'])} near groups")
+    results.put({'duplicates': (len(report['exact']), len(report['near']))})
+
+
+def scan_worker(folder, cancel_event, progress, results, hashes=False):
+    """Фоновый поток: обходит папку и складывает результаты в очередь для UI"""
+    stats = ScanStats()
+    finder = DuplicateFinder() if hashes else None
+    try:
+        with MetadataIndex(INDEX_PATH) as index:
+            for path, result in scan_directory(folder, process=process_file, backend=SCAN_BACKEND,
+                                                workers=SCAN_WORKERS, chunk_size=SCAN_CHUNK_SIZE,
+                                                cancel_event=cancel_event, progress=progress, index=index,
+                                                hashes=hashes):
+                stats.add(path, result)
+                if finder is not None:
+                    finder.add(path, result)
+                results.put(result)
+        if finder is not None and not cancel_event.is_set():
+            write_duplicates(finder, results)
+    except Exception as e:
+        logging.error(f"Error processing directory {folder}: {e}")
+        results.put({'fatal': True, 'error': str(e)})
+    finally:
+        stats.log_summary()
+        try:
+            stats.export_json(SUMMARY_PATH)
+        except OSError as e:
+            logging.error(f"Could not write scan summary {SUMMARY_PATH}: {e}")
+        results.put(None)
+
+
+def format_progress(progress, finished=False):
+    text = f"Обработано: {progress.done} из {progress.total}" + ("" if progress.total_known else "+")
+    text += f"   {progress.files_per_sec:.0f} файлов/с"
+    if finished:
+        text += f"   готово за {progress.elapsed:.1f} с"
+    elif progress.eta is not None:
+        text += f"   осталось ~{progress.eta:.0f} с"
+    return text
+
+
+def finish_scan(progress, cancelled):
+    state = "Остановлено. " if cancelled else ""
+    status_label.config(text=state + format_progress(progress, finished=True))
+    btn_cancel.state(["disabled"])
+    if store.sort_column is not None:
+        # Во время сканирования новые строки шли в конец, теперь восстанавливаем порядок
+        table.refresh()
+    logging.info(f"Scan finished: {progress.done} files, {progress.errors} errors, {progress.elapsed:.2f} s")
+
+
+def drain_results(results, progress, cancel_event):
+    """Переносит накопившиеся результаты в таблицу порциями, не блокируя окно.
+
+    results — очередь своего сканирования. Если ее сменило новое сканирование, цикл
+    молча завершается, не трогая таблицу и статус; после отмены оставшиеся строки
+    отбрасываются, а статус показывает остановку сразу.
+    """
+    if results is not scan_results:
+        return
+    if cancel_event.is_set():
+        finish_scan(progress, cancelled=True)
+        return
+    for _ in range(ROWS_PER_BATCH):
+        try:
+            result = results.get_nowait()
+        except queue.Empty:
+            break
+
+        if result is None:
+            finish_scan(progress, cancelled=False)
+            return
+        if result.get('fatal'):
+            messagebox.showerror("Ошибка", f"Не удалось обработать папку: {result['error']}")
+        elif 'duplicates' in result:
+            exact, near = result['duplicates']
+            messagebox.showinfo("Дубликаты", f"Групп одинаковых файлов: {exact}\n"
+                                             f"Групп похожих изображений: {near}\n"
+                                             f"Подробности в {DUPLICATES_PATH}")
+        elif 'error' in result:
+            logging.warning(f"Failed to process file: {result['filename']} - {result['error']}")
+        else:
+            store.append(result)
+
+    table.render()
+    status_label.config(text=format_progress(progress))
+    root.after(POLL_INTERVAL_MS, drain_results, results, progress, cancel_event)
+
+
+def cancel_scan():
+    if scan_cancel is not None:
+        scan_cancel.set()
+        logging.info("Scan cancelled by user.")
+
 
 def process_directory():
+    global scan_cancel, scan_results
+
     folder = filedialog.askdirectory(title="Выберите папку с изображениями")
     if not folder:
         logging.warning("No folder selected.")
@@ -63,68 +188,120 @@ def process_directory():
 
     logging.info(f"Selected folder: {folder}")
 
+    # Предыдущее сканирование больше не нужно
+    cancel_scan()
+
+    table.clear()
+
+    scan_cancel = threading.Event()
+    progress = ScanProgress()
+    # Очередь своя у каждого сканирования и служит его меткой: цикл drain_results старого
+    # сканирования видит, что его очередь больше не текущая, и завершается без изменений таблицы
+    scan_results = queue.Queue()
+    threading.Thread(target=scan_worker, args=(folder, scan_cancel, progress, scan_results,
+                                               find_duplicates_var.get()),
+                     daemon=True).start()
+
+    btn_cancel.state(["!disabled"])
+    root.after(POLL_INTERVAL_MS, drain_results, scan_results, progress, scan_cancel)
+
+
+def parse_megapixels(entry):
+    text = entry.get().strip().replace(",", ".")
+    return int(float(text) * 1_000_000) if text else None
+
+
+def apply_filter():
     try:
-        all_files = os.scandir(folder)
-        files = [entry.path for entry in all_files if entry.is_file() and entry.name.lower().endswith(('jpg', 'jpeg', 'gif', 'tif', 'bmp', 'png', 'pcx'))]
-        
-        logging.info(f"Total files found: {len(files)}")
-
-        for row in tree.get_children():
-            tree.delete(row)
-
-        # Асинхронная обработка файлов
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            results = executor.map(process_file, files)
-
-        for result in results:
-            if 'error' in result:
-                logging.warning(f"Failed to process file: {result['filename']} - {result['error']}")
-            else:
-                tree.insert("", "end", values=(
-                    result['filename'], result.get('size', 'N/A'), result.get('color_depth', 'N/A'), result.get('compression', 'N/A')
-                ))
+        min_pixels = parse_megapixels(filter_min_mp)
+        max_pixels = parse_megapixels(filter_max_mp)
+    except ValueError:
+        messagebox.showerror("Ошибка", "Размер нужно указать числом (мегапиксели).")
+        return
+    store.set_filter(color_depth=filter_mode.get() or None, compression=filter_compression.get() or None,
+                     min_pixels=min_pixels, max_pixels=max_pixels)
+    table.first = 0
+    table.render()
 
-    except Exception as e:
-        logging.error(f"Error processing directory {folder}: {e}")
-        messagebox.showerror("Ошибка", f"Не удалось обработать папку: {e}")
-
-# Создаем окно приложения
-root = tk.Tk()
-root.title("Информация об изображениях")
-root.geometry("800x500")  # Задаем фиксированный размер окна
-root.resizable(False, False)
-
-# Стилизация
-style = ttk.Style()
-style.theme_use("clam")
-style.configure("Treeview", rowheight=25, font=("Arial", 10))
-style.configure("Treeview.Heading", font=("Arial", 11, "bold"))
-style.configure("TButton", font=("Arial", 10), padding=5)
-
-# Верхняя панель с кнопкой
-frame_top = tk.Frame(root, bg="#f0f0f0")
-frame_top.pack(side="top", fill="x", padx=10, pady=10)
-
-btn_load_folder = ttk.Button(frame_top, text="Загрузить папку с изображениями", command=process_directory)
-btn_load_folder.pack(pady=5)
-
-# Центр с таблицей и прокруткой
-frame_center = tk.Frame(root, bg="#ffffff")
-frame_center.pack(fill="both", expand=True, padx=10, pady=10)
-
-columns = ("Имя файла", "Размер (px)", "Глубина цвета", "Сжатие")
-tree = ttk.Treeview(frame_center, columns=columns, show="headings")
-tree.pack(side="left", fill="both", expand=True)
-
-# Прокрутка для таблицы
-scroll_y = ttk.Scrollbar(frame_center, orient="vertical", command=tree.yview)
-scroll_y.pack(side="right", fill="y")
-tree.configure(yscrollcommand=scroll_y.set)
-
-# Заголовки и ширина колонок
-for col in columns:
-    tree.heading(col, text=col, anchor="center")
-    tree.column(col, anchor="center", width=150)
-
-# Запуск приложения
-root.mainloop()
+
+def reset_filter():
+    for widget in (filter_mode, filter_compression, filter_min_mp, filter_max_mp):
+        widget.delete(0, "end")
+    apply_filter()
+
+
+def create_gui():
+    global root, table, status_label, btn_cancel
+    global filter_mode, filter_compression, filter_min_mp, filter_max_mp, find_duplicates_var
+
+    setup_logging()
+
+    # Создаем окно приложения
+    root = tk.Tk()
+    root.title("Информация об изображениях")
+    root.geometry("800x500")  # Задаем фиксированный размер окна
+    root.resizable(False, False)
+
+    # Стилизация
+    style = ttk.Style()
+    style.theme_use("clam")
+    style.configure("Treeview", rowheight=25, font=("Arial", 10))
+    style.configure("Treeview.Heading", font=("Arial", 11, "bold"))
+    style.configure("TButton", font=("Arial", 10), padding=5)
+
+    # Верхняя панель с кнопкой
+    frame_top = tk.Frame(root, bg="#f0f0f0")
+    frame_top.pack(side="top", fill="x", padx=10, pady=10)
+
+    btn_load_folder = ttk.Button(frame_top, text="Загрузить папку с изображениями", command=process_directory)
+    btn_load_folder.pack(side="left", padx=5, pady=5)
+
+    btn_cancel = ttk.Button(frame_top, text="Остановить", command=cancel_scan)
+    btn_cancel.pack(side="left", padx=5, pady=5)
+    btn_cancel.state(["disabled"])
+
+    # Хеширование читает файлы целиком, поэтому включается отдельно
+    find_duplicates_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(frame_top, text="Искать дубликаты", variable=find_duplicates_var).pack(side="left", padx=5)
+
+    status_label = tk.Label(frame_top, text="", bg="#f0f0f0", anchor="w")
+    status_label.pack(side="left", fill="x", expand=True, padx=5)
+
+    # Панель фильтров: отбор идет по хранилищу, а не по элементам Tk
+    frame_filter = tk.Frame(root, bg="#f0f0f0")
+    frame_filter.pack(side="top", fill="x", padx=10)
+
+    tk.Label(frame_filter, text="Глубина цвета:", bg="#f0f0f0").pack(side="left")
+    filter_mode = ttk.Combobox(frame_filter, width=8,
+                               postcommand=lambda: filter_mode.configure(values=[""] + store.modes.values))
+    filter_mode.pack(side="left", padx=5)
+
+    tk.Label(frame_filter, text="Сжатие:", bg="#f0f0f0").pack(side="left")
+    filter_compression = ttk.Combobox(frame_filter, width=12,
+                                      postcommand=lambda: filter_compression.configure(values=[""] + store.compressions.values))
+    filter_compression.pack(side="left", padx=5)
+
+    tk.Label(frame_filter, text="Мпикс от:", bg="#f0f0f0").pack(side="left")
+    filter_min_mp = ttk.Entry(frame_filter, width=6)
+    filter_min_mp.pack(side="left", padx=5)
+    tk.Label(frame_filter, text="до:", bg="#f0f0f0").pack(side="left")
+    filter_max_mp = ttk.Entry(frame_filter, width=6)
+    filter_max_mp.pack(side="left", padx=5)
+
+    ttk.Button(frame_filter, text="Фильтр", command=apply_filter).pack(side="left", padx=5)
+    ttk.Button(frame_filter, text="Сбросить", command=reset_filter).pack(side="left")
+
+    # Центр с таблицей и прокруткой
+    frame_center = tk.Frame(root, bg="#ffffff")
+    frame_center.pack(fill="both", expand=True, padx=10, pady=10)
+
+    columns = ("Имя файла", "Размер (px)", "Глубина цвета", "Сжатие")
+    table = VirtualTable(frame_center, store, columns, rowheight=25, bg="#ffffff")
+    table.pack(fill="both", expand=True)
+
+    # Запуск приложения
+    root.mainloop()
+
+
+if __name__ == "__main__":
+    create_gui()
@@ -0,0 +1,140 @@
+from array import array
+
+
+class StringPool:
+    """Интернированные строки: каждое значение хранится один раз, в строках — только код"""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def ranks(self):
+        """code -> позиция значения в алфавитном порядке (для сортировки по кодам)"""
+        order = sorted(range(len(self.values)), key=lambda code: self.values[code])
+        ranks = [0] * len(order)
+        for rank, code in enumerate(order):
+            ranks[code] = rank
+        return ranks
+
+
+class ResultStore:
+    """Колоночное хранилище результатов сканирования для виртуальной таблицы.
+
+    Имена файлов лежат одним UTF-8 буфером со смещениями, размеры — массивами
+    чисел, режим и сжатие — кодами StringPool. view — индексы строк после
+    фильтрации и сортировки; таблица показывает только видимое окно этого списка.
+    """
+
+    COLUMNS = ('filename', 'size', 'color_depth', 'compression')
+
+    def __init__(self):
+        self.filters = {}
+        self.clear()
+
+    def clear(self):
+        """Удаляет все строки и сбрасывает сортировку.
+
+        Фильтр сохраняется: его задают поля фильтра в окне, которые при новом
+        сканировании не очищаются, и новые строки должны проходить тот же фильтр.
+        """
+        self._names = bytearray()
+        self._offsets = array('Q', [0])
+        self.width = array('I')
+        self.height = array('I')
+        self.modes = StringPool()
+        self.mode_codes = array('H')
+        self.compressions = StringPool()
+        self.compression_codes = array('H')
+        self.view = array('I')
+        self.sort_column = None
+        self.sort_reverse = False
+
+    def __len__(self):
+        return len(self.width)
+
+    def append(self, info):
+        """Добавляет результат; возвращает True, если строка прошла фильтр и попала в view"""
+        index = len(self.width)
+        self._names += info['filename'].encode('utf-8')
+        self._offsets.append(len(self._names))
+        self.width.append(info.get('width', 0))
+        self.height.append(info.get('height', 0))
+        self.mode_codes.append(self.modes.code(info.get('color_depth', 'N/A')))
+        self.compression_codes.append(self.compressions.code(info.get('compression', 'N/A')))
+        # Новые строки добавляются в конец view; порядок сортировки восстанавливает refresh()
+        if self._matches(index):
+            self.view.append(index)
+            return True
+        return False
+
+    def filename(self, index):
+        return self._names[self._offsets[index]:self._offsets[index + 1]].decode('utf-8')
+
+    def row(self, index):
+        """Значения для отображения строки index"""
+        return (
+            self.filename(index),
+            f"{self.width[index]} x {self.height[index]} px",
+            self.modes.values[self.mode_codes[index]],
+            self.compressions.values[self.compression_codes[index]],
+        )
+
+    def set_filter(self, color_depth=None, compression=None, min_pixels=None, max_pixels=None):
+        """Фильтр по режиму, сжатию и площади изображения; None — без ограничения"""
+        self.filters = {
+            'color_depth': color_depth,
+            'compression': compression,
+            'min_pixels': min_pixels,
+            'max_pixels': max_pixels,
+        }
+        self.refresh()
+
+    def sort(self, column, reverse=False):
+        self.sort_column = column
+        self.sort_reverse = reverse
+        self.refresh()
+
+    def refresh(self):
+        """Пересобирает view по текущему фильтру и сортировке"""
+        view = [index for index in range(len(self.width)) if self._matches(index)]
+        if self.sort_column is not None:
+            view.sort(key=self._sort_key(self.sort_column), reverse=self.sort_reverse)
+        self.view = array('I', view)
+
+    def _matches(self, index):
+        filters = self.filters
+        if not filters:
+            return True
+        mode = filters['color_depth']
+        if mode is not None and self.modes.values[self.mode_codes[index]] != mode:
+            return False
+        compression = filters['compression']
+        if compression is not None and self.compressions.values[self.compression_codes[index]] != compression:
+            return False
+        pixels = self.width[index] * self.height[index]
+        if filters['min_pixels'] is not None and pixels < filters['min_pixels']:
+            return False
+        if filters['max_pixels'] is not None and pixels > filters['max_pixels']:
+            return False
+        return True
+
+    def _sort_key(self, column):
+        if column == 'filename':
+            return lambda index: self.filename(index).lower()
+        if column == 'size':
+            width, height = self.width, self.height
+            return lambda index: width[index] * height[index]
+        if column == 'color_depth':
+            ranks, codes = self.modes.ranks(), self.mode_codes
+        elif column == 'compression':
+            ranks, codes = self.compressions.ranks(), self.compression_codes
+        else:
+            raise ValueError(f"Unknown column: {column}")
+        return lambda index: ranks[codes[index]]
@@ -0,0 +1,159 @@
+import atexit
+import heapq
+import json
+import logging
+import logging.handlers
+import math
+import multiprocessing
+import queue
+from array import array
+from collections import Counter, defaultdict
+
+# Сколько записей журнала копится перед записью в файл одной пачкой
+LOG_BATCH = 1000
+# Сколько самых медленных файлов попадает в сводку
+SLOWEST_FILES = 20
+PERCENTILES = (50, 95, 99)
+STAGES = ('open', 'parse', 'total')
+
+# Обработчик, пишущий пачками в файл журнала (задает setup_queue_logging), и очередь для процессов пула
+_batch_handler = None
+_process_queue = None
+
+
+def setup_queue_logging(filename, level=logging.INFO,
+                        fmt="%(asctime)s - %(levelname)s - %(message)s"):
+    """Неблокирующее логирование: потоки кладут записи в очередь, а в файл пишет отдельный поток.
+
+    Записи сбрасываются на диск пачками по LOG_BATCH (ошибки — сразу).
+    Возвращает QueueListener; он останавливается автоматически при выходе.
+    Процессы пула пишут в тот же файл через worker_log_queue().
+    """
+    global _batch_handler
+    log_queue = queue.SimpleQueue()
+    file_handler = logging.FileHandler(filename, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(fmt))
+    batch_handler = logging.handlers.MemoryHandler(LOG_BATCH, flushLevel=logging.ERROR, target=file_handler)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(log_queue, batch_handler)
+    listener.start()
+    _batch_handler = batch_handler
+
+    def shutdown():
+        listener.stop()
+        batch_handler.close()
+        file_handler.close()
+
+    atexit.register(shutdown)
+    return listener
+
+
+def worker_log_queue():
+    """Очередь журнала для процессов пула или None, если setup_queue_logging не вызывался.
+
+    SimpleQueue из setup_queue_logging в другой процесс не передать, поэтому для процессов
+    заводится multiprocessing.Queue со своим QueueListener — один на все пулы.
+    """
+    global _process_queue
+    if _batch_handler is None:
+        return None
+    if _process_queue is None:
+        _process_queue = multiprocessing.Queue()
+        listener = logging.handlers.QueueListener(_process_queue, _batch_handler)
+        listener.start()
+        # atexit вызывает функции в обратном порядке: этот слушатель остановится раньше, чем закроется файл
+        atexit.register(listener.stop)
+    return _process_queue
+
+
+def init_worker_logging(log_queue, level):
+    """initializer процесса пула: записи журнала уходят в очередь родителя"""
+    root = logging.getLogger()
+    # После fork остаются копии обработчиков родителя, а QueueHandler на его SimpleQueue отсюда никуда не ведет
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
+def percentile(sorted_values, p):
+    # Метод ближайшего ранга
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class ScanStats:
+    """Собирает время обработки каждого файла и строит итоговую сводку сканирования.
+
+    Результаты с ключом 'timings' (его добавляют обработчики файлов) учитываются
+    в задержках. Сами результаты не меняются: их дальше читают таблица и запись описи.
+    """
+
+    def __init__(self, slowest=SLOWEST_FILES):
+        self.slowest_limit = slowest
+        self.files = 0
+        self.cached = 0
+        self.errors = Counter()
+        # Задержки в секундах по формату и стадии; array('d') вместо списков float экономит память
+        self.samples = defaultdict(lambda: {stage: array('d') for stage in STAGES})
+        self._slowest = []
+
+    def add(self, path, result):
+        self.files += 1
+        timings = result.get('timings')
+        if 'error' in result:
+            self.errors[result.get('error_type', 'Error')] += 1
+            return
+        if timings is None:
+            # Результат взят из индекса, файл не открывался
+            self.cached += 1
+            return
+        samples = self.samples[result.get('format', 'N/A')]
+        for stage in STAGES:
+            samples[stage].append(timings.get(stage, 0.0))
+
+        item = (timings.get('total', 0.0), path)
+        if len(self._slowest) < self.slowest_limit:
+            heapq.heappush(self._slowest, item)
+        else:
+            heapq.heappushpop(self._slowest, item)
+
+    def summary(self):
+        """Сводка в виде словаря; задержки в миллисекундах"""
+        formats = {}
+        for image_format, samples in sorted(self.samples.items()):
+            entry = {'count': len(samples['total'])}
+            for stage in STAGES:
+                values = sorted(samples[stage])
+                entry[stage] = {f"p{p}": percentile(values, p) * 1000 for p in PERCENTILES}
+                entry[stage]['max'] = values[-1] * 1000
+            formats[image_format] = entry
+        return {
+            'files': self.files,
+            'cached': self.cached,
+            'errors': dict(self.errors.most_common()),
+            'formats': formats,
+            'slowest': [{'path': path, 'total_ms': total * 1000}
+                        for total, path in sorted(self._slowest, reverse=True)],
+        }
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+    def log_summary(self):
+        summary = self.summary()
+        logging.info(f"Scan summary: {summary['files']} files, {summary['cached']} from index, "
+                     f"errors: {summary['errors'] or 'none'}")
+        for image_format, entry in summary['formats'].items():
+            total = entry['total']
+            logging.info(f"  {image_format}: {entry['count']} files, p50 {total['p50']:.3f} ms, "
+                         f"p95 {total['p95']:.3f} ms, p99 {total['p99']:.3f} ms")
+        for item in summary['slowest'][:5]:
+            logging.info(f"  slow: {item['path']} ({item['total_ms']:.3f} ms)")
@@ -0,0 +1,248 @@
+import concurrent.futures
+import functools
+import logging
+import os
+import threading
+import time
+
+from backends import (CALIBRATION_FILES, choose_backend, default_chunk_size, default_workers,
+                      make_executor, process_chunk)
+from dedup import add_hashes
+from imageinfo import read_image_info
+
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'gif', 'tif', 'bmp', 'png', 'pcx')
+
+
+def iter_image_files(folder, extensions=IMAGE_EXTENSIONS):
+    """Рекурсивно обходит папку и по одному отдает os.DirEntry подходящих файлов"""
+    stack = [folder]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file() and entry.name.lower().endswith(extensions):
+                            yield entry
+                    except OSError:
+                        # Файл мог исчезнуть между listdir и stat
+                        continue
+        except OSError:
+            # Нет прав на подкаталог — пропускаем его, а не весь обход
+            continue
+
+
+class ScanProgress:
+    """Счетчики хода сканирования: скорость и оценка оставшегося времени"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.found = 0
+        self.done = 0
+        self.errors = 0
+        self.walk_finished = False
+        # Необязательный отдельный подсчет файлов впереди ленивого обхода (см. start_counting)
+        self.counted = 0
+        self.count_finished = False
+        self.backend = None
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def files_per_sec(self):
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def total(self):
+        """Сколько файлов известно на сейчас: по подсчету или по обходу, если он ушел дальше"""
+        return max(self.found, self.counted)
+
+    @property
+    def total_known(self):
+        return self.walk_finished or self.count_finished
+
+    @property
+    def eta(self):
+        """Секунды до конца; пока подсчет не закончен — оценка снизу по уже найденным файлам.
+
+        None, пока не обработан ни один файл и скорость неизвестна.
+        """
+        rate = self.files_per_sec
+        if rate == 0:
+            return None
+        return max(0, self.total - self.done) / rate
+
+
+def count_image_files(folder, progress, stop):
+    """Считает файлы папки в progress.counted, пока не выставлен stop"""
+    for _ in iter_image_files(folder):
+        if stop.is_set():
+            return
+        progress.counted += 1
+    progress.count_finished = True
+
+
+def start_counting(folder, progress):
+    """Запускает подсчет файлов в отдельном потоке и возвращает событие для его остановки.
+
+    Обход для обработки ленивый и ограничен max_pending, поэтому сам он узнает общее
+    число файлов только в конце; подсчет читает одни каталоги и уходит далеко вперед.
+    Но это второй обход тех же каталогов: на холодном сетевом диске или HDD он удваивает
+    чтение каталогов и спорит с обработкой за диск, поэтому включается только по запросу.
+    """
+    stop = threading.Event()
+    threading.Thread(target=count_image_files, args=(folder, progress, stop), daemon=True).start()
+    return stop
+
+
+def _safe_info(path):
+    timings = {}
+    try:
+        info = read_image_info(path, timings)
+    except Exception as e:
+        return {'filename': os.path.basename(path), 'error': str(e), 'error_type': type(e).__name__}
+    info['timings'] = timings
+    return info
+
+
+def _lookup(entry, index, hashes):
+    """(stat, запись индекса) для файла; запись None, если файл нужно обработать заново"""
+    if index is None:
+        return None, None
+    try:
+        stat = entry.stat()
+    except OSError:
+        return None, None
+    cached = index.lookup(entry.path, stat.st_mtime_ns, stat.st_size)
+    # Запись без хешей не подходит, если они нужны в этом проходе
+    if cached is not None and hashes and 'content_hash' not in cached:
+        cached = None
+    return stat, cached
+
+
+def _record(progress, index, path, stat, result):
+    """Учитывает обработанный файл в progress и сохраняет результат в index"""
+    progress.done += 1
+    if 'error' in result:
+        progress.errors += 1
+    elif stat is not None:
+        # Время обработки относится к этому проходу и в индекс не пишется
+        info = {key: value for key, value in result.items() if key != 'timings'}
+        index.store(path, stat.st_mtime_ns, stat.st_size, info)
+
+
+def scan_directory(folder, process=_safe_info, backend='thread', workers=None, chunk_size=None,
+                   max_pending=None, cancel_event=None, progress=None, index=None, hashes=False, count_ahead=False):
+    """Генератор: отдает (path, result) по мере готовности, а не после обработки всей папки.
+
+    В пул одновременно отправлено не больше max_pending задач по chunk_size файлов,
+    поэтому обход огромных архивов не держит в памяти список всех файлов. Если передан
+    index (MetadataIndex), неизмененные файлы берутся из него без открытия.
+    backend — 'thread', 'process', 'serial' или 'auto' (см. backends.py); для 'process'
+    функция process должна быть доступна на уровне модуля. hashes=True добавляет
+    стадию хеширования (content_hash и phash, см. dedup.py); хеши кэшируются в index вместе с метаданными.
+    Общее число файлов для оценки времени считает сам обход (progress.found); count_ahead=True
+    добавляет отдельный подсчет впереди обхода (start_counting) — точнее, но каталоги читаются дважды.
+    """
+    if progress is None:
+        progress = ScanProgress()
+    if hashes:
+        # partial от функций модуля остается сериализуемым для пула процессов
+        process = functools.partial(add_hashes, process)
+
+    files = iter_image_files(folder)
+    stop_counting = start_counting(folder, progress) if count_ahead else None
+    try:
+        if backend == 'auto':
+            # Калибруемся на первых файлах, которых нет в индексе: найденные в индексе отдаются
+            # сразу и не мешают замеру, а результаты калибровки отдаются, а не считаются повторно
+            sample = []
+            while len(sample) < CALIBRATION_FILES:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                entry = next(files, None)
+                if entry is None:
+                    progress.walk_finished = True
+                    break
+                progress.found += 1
+                stat, cached = _lookup(entry, index, hashes)
+                if cached is not None:
+                    progress.done += 1
+                    yield entry.path, cached
+                else:
+                    sample.append((entry.path, stat))
+            backend, sample_results = choose_backend([path for path, _ in sample], process)
+            logging.info(f"Auto backend selected: {backend}")
+            for (path, stat), result in zip(sample, sample_results):
+                _record(progress, index, path, stat, result)
+                yield path, result
+        progress.backend = backend
+        yield from _scan_files(folder, files, process, backend, workers, chunk_size, max_pending,
+                               cancel_event, progress, index, hashes)
+    finally:
+        if stop_counting is not None:
+            stop_counting.set()
+
+
+def _scan_files(folder, files, process, backend, workers, chunk_size, max_pending, cancel_event, progress,
+                index, hashes):
+    """Основной проход scan_directory: обработка оставшихся файлов выбранным пулом"""
+    if workers is None:
+        workers = default_workers(backend)
+    if chunk_size is None:
+        chunk_size = default_chunk_size(backend)
+    if max_pending is None:
+        max_pending = workers * 4
+
+    pending = {}
+    chunk = []
+    with make_executor(backend, workers) as executor:
+        try:
+            while True:
+                # Дозаполняем очередь до max_pending
+                while not progress.walk_finished and len(pending) < max_pending:
+                    if cancel_event is not None and cancel_event.is_set():
+                        break
+                    entry = next(files, None)
+                    if entry is None:
+                        progress.walk_finished = True
+                    else:
+                        progress.found += 1
+                        stat, cached = _lookup(entry, index, hashes)
+                        if cached is not None:
+                            progress.done += 1
+                            yield entry.path, cached
+                            continue
+                        chunk.append((entry.path, stat))
+                        if len(chunk) < chunk_size:
+                            continue
+                    if chunk:
+                        future = executor.submit(process_chunk, process, [path for path, _ in chunk])
+                        pending[future] = chunk
+                        chunk = []
+
+                if not pending and progress.walk_finished and index is not None:
+                    # Папка обойдена целиком: можно забыть удаленные файлы
+                    index.prune_missing(folder)
+
+                if not pending:
+                    return
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+
+                done, _ = concurrent.futures.wait(pending, timeout=0.1,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    items = pending.pop(future)
+                    for (path, stat), result in zip(items, future.result()):
+                        _record(progress, index, path, stat, result)
+                        yield path, result
+        finally:
+            # При отмене или закрытии генератора не ждем оставшиеся файлы
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,98 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTable(tk.Frame):
+    """Таблица, которая показывает только видимое окно строк ResultStore.
+
+    В Treeview всегда столько элементов, сколько строк помещается на экране;
+    при прокрутке у них меняются значения, а не создаются новые элементы,
+    поэтому миллион результатов не нагружает Tk.
+    """
+
+    def __init__(self, master, store, headings, rowheight=25, **kwargs):
+        super().__init__(master, **kwargs)
+        self.store = store
+        self.headings = dict(zip(store.COLUMNS, headings))
+        self.rowheight = rowheight
+        self.first = 0
+        self.rows = 1
+        self.items = []
+
+        self.tree = ttk.Treeview(self, columns=store.COLUMNS, show="headings", height=1, selectmode="browse")
+        for column in store.COLUMNS:
+            self.tree.heading(column, text=self.headings[column], anchor="center",
+                              command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, anchor="center", width=150)
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self.scroll_y = ttk.Scrollbar(self, orient="vertical", command=self.on_scroll)
+        self.scroll_y.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_rows(-1 if e.delta > 0 else 1) or "break")
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-1) or "break")
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(1) or "break")
+        self.tree.bind("<Prior>", lambda e: self.scroll_rows(-self.rows) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll_rows(self.rows) or "break")
+
+    def on_resize(self, event):
+        # Одна строка уходит на заголовки колонок
+        rows = max(1, event.height // self.rowheight - 1)
+        if rows != self.rows:
+            self.rows = rows
+            self.render()
+
+    def on_scroll(self, action, *args):
+        if action == "moveto":
+            self.first = int(float(args[0]) * len(self.store.view))
+        elif action == "scroll":
+            step = int(args[0])
+            self.first += step * self.rows if args[1] == "pages" else step
+        self.render()
+
+    def scroll_rows(self, count):
+        self.first += count
+        self.render()
+
+    def sort_by(self, column):
+        reverse = self.store.sort_column == column and not self.store.sort_reverse
+        self.store.sort(column, reverse)
+        for name, text in self.headings.items():
+            arrow = (" ▼" if reverse else " ▲") if name == column else ""
+            self.tree.heading(name, text=text + arrow)
+        self.first = 0
+        self.render()
+
+    def refresh(self):
+        """Пересчитать фильтр и сортировку в хранилище и перерисовать"""
+        self.store.refresh()
+        self.render()
+
+    def clear(self):
+        self.store.clear()
+        for name, text in self.headings.items():
+            self.tree.heading(name, text=text)
+        self.first = 0
+        self.render()
+
+    def render(self):
+        view = self.store.view
+        total = len(view)
+        self.first = max(0, min(self.first, total - self.rows))
+        count = min(self.rows, total - self.first)
+
+        # Подгоняем число элементов Treeview под окно, остальные переиспользуем
+        while len(self.items) < count:
+            self.items.append(self.tree.insert("", "end"))
+        if len(self.items) > count:
+            self.tree.delete(*self.items[count:])
+            del self.items[count:]
+
+        for offset, item in enumerate(self.items):
+            self.tree.item(item, values=self.store.row(view[self.first + offset]))
+
+        if total:
+            self.scroll_y.set(self.first / total, (self.first + count) / total)
+        else:
+            self.scroll_y.set(0.0, 1.0)
@@ -0,0 +1,85 @@
+"""Бенчмарк свертки: filter2D против сепарабельных проходов и FFT в зависимости от размера ядра.
+
+Для каждого размера проверяются три вида ядер: гауссиан (ранг 1), LoG (ранг 2)
+и случайное (полный ранг). Кроме времени печатается наибольшее отличие от filter2D.
+
+Запуск: python bench_convolution.py [--width 2000] [--height 1500] [--sizes 3 7 15 31 63]
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from convolution import METHODS, choose_method, convolve, separable_terms
+
+
+def gaussian_kernel(size):
+    column = cv2.getGaussianKernel(size, size / 6)
+    return column @ column.T
+
+
+def log_kernel(size):
+    # Лапласиан гауссиана: сумма двух сепарабельных слагаемых (d²/dx² и d²/dy²)
+    sigma = size / 6
+    coords = np.arange(size) - size // 2
+    gauss = np.exp(-coords ** 2 / (2 * sigma ** 2))
+    second = (coords ** 2 / sigma ** 4 - 1 / sigma ** 2) * gauss
+    kernel = np.outer(second, gauss) + np.outer(gauss, second)
+    kernel -= kernel.mean()
+    return kernel / np.abs(kernel).sum() * 8
+
+
+def random_kernel(size):
+    kernel = np.random.default_rng(size).normal(size=(size, size))
+    return kernel / np.abs(kernel).sum()
+
+
+KERNELS = {'gauss': gaussian_kernel, 'log': log_kernel, 'random': random_kernel}
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--width', type=int, default=2000)
+    parser.add_argument('--height', type=int, default=1500)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 7, 15, 31, 63])
+    parser.add_argument('--kernels', nargs='+', choices=sorted(KERNELS), default=list(KERNELS))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    image = cv2.GaussianBlur(rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8), (5, 5), 0)
+    print(f"Изображение {args.width}x{args.height}x3, лучшее из {args.repeat}, мс (наибольшее отличие от filter2D)")
+    header = " ".join(f"{method:>14}" for method in METHODS)
+    print(f"{'ядро':<8} {'размер':>6} {'ранг':>5} {header} {'auto':>16}")
+    for name in args.kernels:
+        for size in args.sizes:
+            kernel = KERNELS[name](size).astype(np.float32)
+            rank = len(separable_terms(kernel))
+            reference = None
+            cells = []
+            for method in METHODS:
+                if method == 'separable' and rank * 2 * size >= size * size:
+                    cells.append(f"{'-':>14}")
+                    continue
+                seconds, result = best_time(lambda: convolve(image, kernel, method), args.repeat)
+                if reference is None:
+                    reference = result
+                difference = int(np.abs(result.astype(np.int16) - reference).max())
+                cells.append(f"{seconds * 1000:>9.0f} ({difference})")
+            chosen = choose_method(image, kernel)
+            seconds, _ = best_time(lambda: convolve(image, kernel), args.repeat)
+            print(f"{name:<8} {size:>6} {rank:>5} {' '.join(cells)} {seconds * 1000:>6.0f} {chosen:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Бенчмарк локальных порогов: время в зависимости от размера окна.
+
+mean и gaussian — текущий apply_local_threshold на cv2.adaptiveThreshold,
+sauvola и niblack — движок на таблицах сумм (local_threshold.py).
+
+Запуск: python bench_local_threshold.py [--width 4000] [--height 3000] [--windows 11 51 101 201 401]
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from filters import apply_local_threshold
+
+METHODS = ('mean', 'gaussian', 'sauvola', 'niblack')
+
+
+def make_scan(width, height):
+    # Текст-подобный шум на неравномерно освещенном фоне
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    background = 180 + 60 * np.sin(x / width * np.pi) * np.cos(y / height * np.pi)
+    strokes = (rng.random((height, width)) < 0.02) * 120
+    image = np.clip(background - cv2.GaussianBlur(strokes.astype(np.float32), (5, 5), 0) * 4, 0, 255)
+    return image.astype(np.uint8)
+
+
+def best_time(func, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--width', type=int, default=4000)
+    parser.add_argument('--height', type=int, default=3000)
+    parser.add_argument('--windows', type=int, nargs='+', default=[11, 51, 101, 201, 401])
+    parser.add_argument('--methods', nargs='+', choices=METHODS, default=list(METHODS))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    gray = make_scan(args.width, args.height)
+    megapixels = gray.size / 1e6
+    print(f"Изображение {args.width}x{args.height} ({megapixels:.1f} Мп), лучшее из {args.repeat}, мс")
+    print(f"{'окно':>6} " + " ".join(f"{method:>10}" for method in args.methods))
+    for window in args.windows:
+        window |= 1
+        times = [best_time(lambda: apply_local_threshold(gray, method, window), args.repeat) for method in args.methods]
+        print(f"{window:>6} " + " ".join(f"{seconds * 1000:>10.0f}" for seconds in times))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Бенчмарк плиточной обработки: время и пиковая память против обработки целиком.
+
+Каждый вариант запускается в отдельном процессе, чтобы пиковый RSS
+(ru_maxrss) относился только к нему. Исходное изображение — синтетический .npy;
+он тоже создается в отдельном процессе: ru_maxrss в Linux наследуется через fork/exec.
+
+Запуск: python bench_tiled.py [--size 8000] [--tile 1024] [--ops highpass adaptive] [--window 11] [--k 0.2]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from filters import (apply_adaptive_threshold, apply_global_threshold, apply_highpass_filter,
+                     apply_local_threshold)
+from tiled import DEFAULT_TILE, OPERATIONS, operation_params, run_tiled_file, window_size
+
+WHOLE = {
+    'highpass': apply_highpass_filter,
+    'local_mean': lambda image, **params: apply_local_threshold(image, "mean", **params),
+    'local_gaussian': lambda image, **params: apply_local_threshold(image, "gaussian", **params),
+    'local_sauvola': lambda image, **params: apply_local_threshold(image, "sauvola", **params),
+    'local_niblack': lambda image, **params: apply_local_threshold(image, "niblack", **params),
+    'global': apply_global_threshold,
+    'adaptive': apply_adaptive_threshold,
+}
+
+
+def make_image(path, size, rows_per_step=512):
+    # Пишем по полосам, чтобы сам генератор не занимал память размером с изображение
+    rng = np.random.default_rng(0)
+    image = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(size, size, 3))
+    for y in range(0, size, rows_per_step):
+        rows = min(rows_per_step, size - y)
+        image[y:y + rows] = rng.integers(0, 256, (rows, size, 3), dtype=np.uint8)
+    image.flush()
+    del image
+
+
+def peak_rss_mb():
+    # В Linux ru_maxrss в килобайтах, в macOS — в байтах
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20
+
+
+def run_whole(source, output, operations, op_params):
+    image = np.load(source)
+    for name in operations:
+        image = WHOLE[name](image, **op_params.get(name, {}))
+    np.save(output, image)
+
+
+def worker(args):
+    if args.mode == 'make':
+        make_image(args.output, args.size)
+        return
+    op_params = operation_params(args.ops, args.window, args.k)
+    start = time.perf_counter()
+    if args.mode == 'whole':
+        run_whole(args.source, args.output, args.ops, op_params)
+    else:
+        run_tiled_file(args.source, args.output, args.ops, args.tile, args.workers, op_params)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'seconds': elapsed, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def measure(mode, source, output, args):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', mode, '--output', output,
+               '--size', str(args.size), '--tile', str(args.tile), '--ops', *args.ops]
+    if source:
+        command += ['--source', source]
+    if args.workers:
+        command += ['--workers', str(args.workers)]
+    if args.window:
+        command += ['--window', str(args.window)]
+    if args.k is not None:
+        command += ['--k', str(args.k)]
+    completed = subprocess.run(command, check=True, capture_output=True, text=True)
+    return json.loads(completed.stdout.splitlines()[-1]) if completed.stdout else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=8000, help="сторона квадратного изображения")
+    parser.add_argument('--tile', type=int, default=DEFAULT_TILE)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--ops', nargs='+', default=['highpass', 'adaptive'], choices=sorted(OPERATIONS))
+    parser.add_argument('--window', type=window_size, help="окно локальных порогов, нечетное")
+    parser.add_argument('--k', type=float, help="k для local_sauvola и local_niblack")
+    parser.add_argument('--worker', dest='mode', choices=['make', 'whole', 'tiled'], help=argparse.SUPPRESS)
+    parser.add_argument('--source', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        worker(args)
+        return
+
+    with tempfile.TemporaryDirectory(prefix='bench_tiled_') as folder:
+        source = os.path.join(folder, 'source.npy')
+        print(f"Создание изображения {args.size}x{args.size}x3 ({args.size * args.size * 3 / 2 ** 20:.0f} МБ)...")
+        measure('make', None, source, args)
+
+        results = {}
+        for mode in ('whole', 'tiled'):
+            results[mode] = measure(mode, source, os.path.join(folder, f'{mode}.npy'), args)
+        same = np.array_equal(np.load(os.path.join(folder, 'whole.npy'), mmap_mode='r'),
+                              np.load(os.path.join(folder, 'tiled.npy'), mmap_mode='r'))
+
+    print(f"Операции: {' -> '.join(args.ops)}, плитка {args.tile}")
+    print(f"{'режим':<8} {'время, с':>9} {'пик RSS, МБ':>12}")
+    for mode, result in results.items():
+        print(f"{mode:<8} {result['seconds']:>9.2f} {result['peak_rss_mb']:>12.0f}")
+    print(f"Результаты совпадают: {'да' if same else 'НЕТ'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Бенчмарк потоковой обработки видео: кадров в секунду в зависимости от числа потоков.
+
+Тестовое видео (и при --sequence — последовательность PNG) синтезируется через
+cv2.VideoWriter. Для сравнения замеряется простой цикл «прочитать — применить
+фильтры — записать» в одном потоке, с новыми массивами на каждом кадре.
+
+Запуск: python bench_video.py [--width 1280] [--height 720] [--frames 300] [--workers 1 2 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from tiled import OPERATIONS
+from video import DEFAULT_FOURCC, FrameWriter, open_capture, run_stream
+
+
+def make_video(path, width, height, frames, fourcc=DEFAULT_FOURCC):
+    # Сдвигающаяся текстура: у кодека есть движение, у фильтров — детали
+    rng = np.random.default_rng(0)
+    base = cv2.GaussianBlur(rng.integers(0, 256, (height, width, 3), dtype=np.uint8), (7, 7), 0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), 30, (width, height))
+    for index in range(frames):
+        writer.write(np.roll(base, index * 4, axis=1))
+    writer.release()
+
+
+def make_sequence(video_path, pattern):
+    capture = open_capture(video_path)
+    index = 0
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        cv2.imwrite(pattern % index, frame)
+        index += 1
+    capture.release()
+
+
+def naive_loop(source, output, operations):
+    capture = open_capture(source)
+    writer = None
+    frames = 0
+    start = time.perf_counter()
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        for name in operations:
+            if name != 'highpass' and frame.ndim == 3:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            frame = OPERATIONS[name][0](frame)
+        if writer is None:
+            writer = FrameWriter(output, 30, frame.shape)
+        writer.write(frames, frame)
+        frames += 1
+    capture.release()
+    writer.close()
+    return frames / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--ops', nargs='+', choices=sorted(OPERATIONS), default=['highpass', 'local_gaussian'])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--sequence', action='store_true', help="также замерить последовательность PNG")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        video = os.path.join(folder, 'input.mp4')
+        make_video(video, args.width, args.height, args.frames)
+        sources = [('mp4', video, os.path.join(folder, 'output.mp4'))]
+        if args.sequence:
+            os.makedirs(os.path.join(folder, 'frames'))
+            make_sequence(video, os.path.join(folder, 'frames', '%04d.png'))
+            sources.append(('png', os.path.join(folder, 'frames', '%04d.png'),
+                            os.path.join(folder, 'out', '%04d.png')))
+
+        print(f"{args.frames} кадров {args.width}x{args.height}, операции: {' -> '.join(args.ops)}, "
+              f"ядер: {os.cpu_count()}")
+        print(f"{'вход':<6} {'режим':<12} {'кадр/с':>8} {'пропущено':>10}")
+        for kind, source, output in sources:
+            print(f"{kind:<6} {'цикл':<12} {naive_loop(source, output, args.ops):>8.1f} {'-':>10}")
+            for workers in args.workers:
+                stats = run_stream(source, output, args.ops, workers)
+                print(f"{kind:<6} {f'потоков: {workers}':<12} {stats.fps:>8.1f} {stats.dropped:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+import cv2
+import numpy as np
+
+from convolution import convolve
+from local_threshold import niblack_threshold, sauvola_threshold
+
+# Ядро high-pass фильтра (повышение резкости)
+HIGHPASS_KERNEL = np.array([[-1, -1, -1], [-1,  9, -1], [-1, -1, -1]])
+# Параметры локальных порогов: размер окна и константа C
+BLOCK_SIZE = 11
+C = 2
+
+
+def to_gray(image):
+    """Серое изображение; одноканальные массивы (результаты порогов) возвращаются как есть"""
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+# Функции обработки изображений
+# dst — необязательный готовый массив для результата (нужного размера и типа):
+# так потоковая обработка видео переиспользует буферы кадров, а не выделяет новые
+def apply_highpass_filter(image, kernel=None, dst=None):
+    if kernel is None:
+        return cv2.filter2D(image, -1, HIGHPASS_KERNEL, dst=dst)
+    # Свое ядро (например, 63x63): сепарабельные проходы, FFT или filter2D — что быстрее
+    sharpened = convolve(image, np.asarray(kernel, dtype=np.float32))
+    if dst is not None:
+        dst[...] = sharpened
+        return dst
+    return sharpened
+
+
+def apply_local_threshold(image, method="mean", block_size=BLOCK_SIZE, c=C, k=None, dst=None):
+    gray = to_gray(image)
+    # k — коэффициент Sauvola и Niblack; None — значение по умолчанию из local_threshold.py
+    k_param = {} if k is None else {'k': k}
+    if method == "mean":
+        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block_size, c,
+                                       dst=dst)
+    elif method == "gaussian":
+        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, block_size, c,
+                                       dst=dst)
+    elif method == "sauvola":
+        # Для Sauvola и Niblack константа C не используется: порог задается средним и отклонением
+        thresh = sauvola_threshold(gray, block_size, dst=dst, **k_param)
+    elif method == "niblack":
+        thresh = niblack_threshold(gray, block_size, dst=dst, **k_param)
+    else:
+        raise ValueError(f"Unknown method: {method}")
+    return thresh
+
+
+def apply_global_threshold(image, threshold_value=128, dst=None):
+    gray = to_gray(image)
+    _, thresh = cv2.threshold(gray, threshold_value, 255, cv2.THRESH_BINARY, dst=dst)
+    return thresh
+
+
+def apply_adaptive_threshold(image, block_size=BLOCK_SIZE, c=C, dst=None):
+    gray = to_gray(image)
+    adaptive_thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block_size, c,
+                                            dst=dst)
+    return adaptive_thresh
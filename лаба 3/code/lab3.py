@@ -1,110 +1,235 @@
+import concurrent.futures
 import cv2
 import numpy as np
 from tkinter import *
-from tkinter import filedialog
-from PIL import Image, ImageTk
-
-# Функции обработки изображений
-def apply_highpass_filter(image):
-    kernel = np.array([[-1, -1, -1], [-1,  9, -1], [-1, -1, -1]])
-    sharpened = cv2.filter2D(image, -1, kernel)
-    return sharpened
-
-def apply_local_threshold(image, method="mean"):
-    if method == "mean":
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, 2)
-    elif method == "gaussian":
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-    return thresh
-
-def apply_global_threshold(image, threshold_value=128):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, threshold_value, 255, cv2.THRESH_BINARY)
-    return thresh
-
-def apply_adaptive_threshold(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    adaptive_thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, 11, 2)
-    return adaptive_thresh
+from tkinter import filedialog, messagebox
+from filters import BLOCK_SIZE, C
+from op_graph import OperationGraph
+from preview import fit_to
+from viewer import ImageViewer
+
+# История операций: каждый шаг хранится узлом, результаты — в кэше
+graph = OperationGraph()
+# Полноразмерный результат считается в фоне, по одному за раз
+renderer = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+render_job = None
+render_generation = 0
+
+# Через сколько мс после последнего движения ползунка считать полное разрешение
+FULL_RENDER_DELAY_MS = 300
+POLL_INTERVAL_MS = 30
+# Доля экрана под изображение и превью (справа остается панель с кнопками и ползунками)
+PREVIEW_SCREEN_SHARE = (0.7, 0.8)
+# Какие ползунки относятся к каким операциям
+OPERATION_PARAMS = {
+    'global': ('threshold_value',),
+    'local_mean': ('block_size', 'c'),
+    'local_gaussian': ('block_size', 'c'),
+    'local_sauvola': ('block_size',),
+    'local_niblack': ('block_size',),
+    'adaptive': ('block_size', 'c'),
+}
+
 
 def open_image():
-    global img
     file_path = filedialog.askopenfilename(title="Открыть изображение", filetypes=[("Image files", "*.jpg *.jpeg *.png *.bmp")])
     if file_path:
-        img = cv2.imread(file_path)
-        display_image(img)
-
-def display_image(image):
-    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    image_pil = Image.fromarray(image_rgb)
-    image_tk = ImageTk.PhotoImage(image_pil)
-    
-    label.config(image=image_tk)
-    label.image = image_tk
+        image = cv2.imread(file_path)
+        if image is None:
+            return
+        proxy_size = (int(root.winfo_screenwidth() * PREVIEW_SCREEN_SHARE[0]),
+                      int(root.winfo_screenheight() * PREVIEW_SCREEN_SHARE[1]))
+        graph.load(image, proxy_size)
+        show_current()
+
+def display_image(*levels):
+    # levels — одно изображение в нескольких разрешениях; область просмотра
+    # пересэмплирует только видимую часть подходящего уровня
+    viewer.show(*levels)
+
+def show_current():
+    """Мгновенно показывает превью на уменьшенной копии и откладывает расчет в полном разрешении"""
+    display_image(graph.preview())
+    schedule_full_render()
+
+def schedule_full_render():
+    global render_job
+    if render_job is not None:
+        root.after_cancel(render_job)
+    render_job = root.after(FULL_RENDER_DELAY_MS, start_full_render)
+
+def start_full_render():
+    global render_job, render_generation
+    render_job = None
+    render_generation += 1
+    plan = graph.plan()
+    shape = graph.proxy.shape
+    future = renderer.submit(render_levels, plan, shape)
+    poll_full_render(future, render_generation)
+
+def render_levels(plan, shape):
+    # Полный результат для увеличения и его копия размером с превью для обзора целиком
+    image = graph.run(plan)
+    return image, fit_to(image, shape)
+
+def poll_full_render(future, generation):
+    if not future.done():
+        root.after(POLL_INTERVAL_MS, poll_full_render, future, generation)
+        return
+    # Пока считали, параметры могли снова измениться — устаревший результат не показываем
+    if generation == render_generation and future.exception() is None:
+        display_image(*future.result())
+
+def current_params(op):
+    values = {
+        'threshold_value': threshold_scale.get(),
+        'block_size': block_size_scale.get() | 1,
+        'c': c_scale.get(),
+    }
+    return {name: values[name] for name in OPERATION_PARAMS.get(op, ())}
+
+def sync_scales():
+    """Ставит ползунки в значения параметров текущего шага (после отмены или повтора)"""
+    scales = {'threshold_value': threshold_scale, 'block_size': block_size_scale, 'c': c_scale}
+    # Ползунок вызовет on_param_change, но параметры уже совпадут с узлом — пересчета не будет
+    for name, value in graph.current.params.items():
+        if name in scales:
+            scales[name].set(value)
+
+def on_param_change(_value):
+    node = graph.current
+    if node is None or node.op not in OPERATION_PARAMS:
+        return
+    params = current_params(node.op)
+    if params != node.params:
+        graph.set_params(node, **params)
+        show_current()
+
+def apply_operation(op, **params):
+    if graph.root is None:
+        return
+    graph.apply(op, **current_params(op), **params)
+    show_current()
 
 def process_highpass():
-    global img
-    img = apply_highpass_filter(img)
-    display_image(img)
+    apply_operation('highpass')
+
+def process_custom_kernel():
+    if graph.root is None:
+        return
+    file_path = filedialog.askopenfilename(title="Открыть ядро свертки", filetypes=[("Text files", "*.txt *.csv")])
+    if not file_path:
+        return
+    try:
+        kernel = np.loadtxt(file_path, delimiter="," if file_path.lower().endswith(".csv") else None, ndmin=2)
+    except ValueError as e:
+        messagebox.showerror("Ошибка", f"Не удалось прочитать ядро: {e}")
+        return
+    # Ядро хранится в параметрах узла, поэтому должно быть хешируемым
+    apply_operation('highpass', kernel=tuple(map(tuple, kernel.tolist())))
 
 def process_local_threshold_mean():
-    global img
-    img = apply_local_threshold(img, method="mean")
-    display_image(img)
+    apply_operation('local_mean')
 
 def process_local_threshold_gaussian():
-    global img
-    img = apply_local_threshold(img, method="gaussian")
-    display_image(img)
+    apply_operation('local_gaussian')
+
+def process_local_threshold_sauvola():
+    apply_operation('local_sauvola')
+
+def process_local_threshold_niblack():
+    apply_operation('local_niblack')
 
 def process_global_threshold():
-    global img
-    img = apply_global_threshold(img)
-    display_image(img)
+    apply_operation('global')
 
 def process_adaptive_threshold():
-    global img
-    img = apply_adaptive_threshold(img)
-    display_image(img)
+    apply_operation('adaptive')
+
+def undo():
+    # Результат родителя обычно в кэше — пересчета нет
+    if graph.undo():
+        sync_scales()
+        show_current()
+
+def redo():
+    if graph.redo():
+        sync_scales()
+        show_current()
 
 def save_image():
-    global img
+    if graph.root is None:
+        return
     file_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG files", "*.png")])
     if file_path:
-        cv2.imwrite(file_path, img)
+        cv2.imwrite(file_path, graph.result())
 
 # Настройка графического интерфейса с использованием Tkinter
 root = Tk()
 root.title("Image Processing App")
 
-# Главное окно
-label = Label(root)
-label.pack(padx=10, pady=10)
+# Панель управления справа от изображения (упаковывается первой, чтобы не сжиматься)
+controls = Frame(root)
+controls.pack(side=RIGHT, fill=Y, padx=5, pady=10)
+
+# Область просмотра: колесо мыши — масштаб, перетаскивание — прокрутка, двойной щелчок — вписать
+viewer = ImageViewer(root, width=int(root.winfo_screenwidth() * PREVIEW_SCREEN_SHARE[0]),
+                     height=int(root.winfo_screenheight() * PREVIEW_SCREEN_SHARE[1]))
+viewer.pack(side=LEFT, padx=10, pady=10, fill=BOTH, expand=True)
 
 # Кнопки
-open_button = Button(root, text="Открыть изображение", command=open_image)
+open_button = Button(controls, text="Открыть изображение", command=open_image)
 open_button.pack(padx=10, pady=5)
 
 # Кнопки для обработки изображений
-highpass_button = Button(root, text="High-pass Filter", command=process_highpass)
+highpass_button = Button(controls, text="High-pass Filter", command=process_highpass)
 highpass_button.pack(padx=10, pady=5)
 
-local_mean_button = Button(root, text="Local Threshold (Mean)", command=process_local_threshold_mean)
+kernel_button = Button(controls, text="Свое ядро свертки...", command=process_custom_kernel)
+kernel_button.pack(padx=10, pady=5)
+
+local_mean_button = Button(controls, text="Local Threshold (Mean)", command=process_local_threshold_mean)
 local_mean_button.pack(padx=10, pady=5)
 
-local_gaussian_button = Button(root, text="Local Threshold (Gaussian)", command=process_local_threshold_gaussian)
+local_gaussian_button = Button(controls, text="Local Threshold (Gaussian)", command=process_local_threshold_gaussian)
 local_gaussian_button.pack(padx=10, pady=5)
 
-global_button = Button(root, text="Global Threshold", command=process_global_threshold)
+sauvola_button = Button(controls, text="Local Threshold (Sauvola)", command=process_local_threshold_sauvola)
+sauvola_button.pack(padx=10, pady=5)
+
+niblack_button = Button(controls, text="Local Threshold (Niblack)", command=process_local_threshold_niblack)
+niblack_button.pack(padx=10, pady=5)
+
+global_button = Button(controls, text="Global Threshold", command=process_global_threshold)
 global_button.pack(padx=10, pady=5)
 
-adaptive_button = Button(root, text="Adaptive Threshold", command=process_adaptive_threshold)
+adaptive_button = Button(controls, text="Adaptive Threshold", command=process_adaptive_threshold)
 adaptive_button.pack(padx=10, pady=5)
 
+# Параметры порогов: меняют текущий шаг, превью обновляется сразу
+threshold_scale = Scale(controls, from_=0, to=255, orient=HORIZONTAL, length=300, label="Глобальный порог",
+                        command=on_param_change)
+threshold_scale.set(128)
+threshold_scale.pack(padx=10, pady=2)
+
+block_size_scale = Scale(controls, from_=3, to=401, resolution=2, orient=HORIZONTAL, length=300, label="Размер окна",
+                         command=on_param_change)
+block_size_scale.set(BLOCK_SIZE)
+block_size_scale.pack(padx=10, pady=2)
+
+c_scale = Scale(controls, from_=-20, to=20, orient=HORIZONTAL, length=300, label="Константа C", command=on_param_change)
+c_scale.set(C)
+c_scale.pack(padx=10, pady=2)
+
+# Отмена и повтор шагов
+undo_button = Button(controls, text="Отменить", command=undo)
+undo_button.pack(padx=10, pady=5)
+
+redo_button = Button(controls, text="Повторить", command=redo)
+redo_button.pack(padx=10, pady=5)
+
 # Кнопка сохранения изображения
-save_button = Button(root, text="Сохранить изображение", command=save_image)
+save_button = Button(controls, text="Сохранить изображение", command=save_image)
 save_button.pack(padx=10, pady=5)
 
 # Главный цикл приложения
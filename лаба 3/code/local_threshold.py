@@ -0,0 +1,88 @@
+import cv2
+import numpy as np
+
+# Параметры Sauvola: T = m * (1 + k * (s / R - 1)); R — максимальное стандартное отклонение для 8 бит
+SAUVOLA_K = 0.2
+SAUVOLA_R = 128
+# Параметр Niblack: T = m + k * s
+NIBLACK_K = -0.2
+# Высота полосы строк, которой считаются локальные пороги
+STRIP_ROWS = 256
+
+
+def _box_sum(table, block_size, height, width, out):
+    """Сумма по окну block_size x block_size для каждого пикселя из таблицы сумм (4 обращения)"""
+    k = block_size
+    np.subtract(table[k:k + height, k:k + width], table[0:height, k:k + width], out=out)
+    out -= table[k:k + height, 0:width]
+    out += table[0:height, 0:width]
+    return out
+
+
+def local_stats(padded, block_size):
+    """Среднее и стандартное отклонение по окну block_size для каждого полного окна в padded.
+
+    padded — изображение, уже дополненное на block_size // 2 со всех сторон; результат
+    на 2 * (block_size // 2) меньше по каждой оси. Строятся таблицы сумм (integral image)
+    яркости и ее квадрата, после чего сумма по любому окну — четыре обращения к таблице,
+    поэтому время не зависит от размера окна.
+    """
+    radius = block_size // 2
+    block_size = 2 * radius + 1
+    height, width = padded.shape[0] - 2 * radius, padded.shape[1] - 2 * radius
+    # float64: сумма квадратов по окну 401x401 не помещается в int32 и теряет точность во float32
+    sums, squares = cv2.integral2(padded, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+    area = float(block_size * block_size)
+    mean = _box_sum(sums, block_size, height, width, np.empty((height, width)))
+    mean /= area
+    deviation = _box_sum(squares, block_size, height, width, np.empty((height, width)))
+    deviation /= area
+    deviation -= np.square(mean, out=np.empty_like(mean))
+    # Из-за округления дисперсия однородных областей может получиться чуть меньше нуля
+    np.maximum(deviation, 0, out=deviation)
+    np.sqrt(deviation, out=deviation)
+    return mean, deviation
+
+
+def _local_threshold(gray, block_size, threshold, dst=None):
+    """Бинаризация по порогу threshold(mean, deviation), посчитанному полосами строк.
+
+    Края дополняются повтором крайних пикселей, как в cv2.adaptiveThreshold.
+    Полосы держат промежуточные массивы float64 небольшими: они помещаются в кэш
+    процессора, а память не растет с размером изображения.
+    """
+    radius = block_size // 2
+    height = gray.shape[0]
+    padded = cv2.copyMakeBorder(gray, radius, radius, radius, radius, cv2.BORDER_REPLICATE)
+    # Полоса не уже окна, иначе пересчет таблиц сумм на перекрытиях дороже выигрыша
+    rows = max(STRIP_ROWS, 2 * radius + 1)
+    result = np.empty_like(gray) if dst is None else dst
+    for y0 in range(0, height, rows):
+        y1 = min(height, y0 + rows)
+        mean, deviation = local_stats(padded[y0:y1 + 2 * radius], block_size)
+        limit = threshold(mean, deviation)
+        result[y0:y1] = cv2.compare(gray[y0:y1].astype(np.float64), limit, cv2.CMP_GT)
+    return result
+
+
+def sauvola_threshold(gray, block_size, k=SAUVOLA_K, r=SAUVOLA_R, dst=None):
+    """Бинаризация Sauvola: порог ниже среднего там, где мало контраста (фон, тени)"""
+    def threshold(mean, deviation):
+        # mean * (1 + k * (deviation / r - 1)), на месте в deviation
+        deviation *= k / r
+        deviation += 1 - k
+        deviation *= mean
+        return deviation
+
+    return _local_threshold(gray, block_size, threshold, dst)
+
+
+def niblack_threshold(gray, block_size, k=NIBLACK_K, dst=None):
+    """Бинаризация Niblack: порог — локальное среднее плюс k стандартных отклонений"""
+    def threshold(mean, deviation):
+        deviation *= k
+        deviation += mean
+        return deviation
+
+    return _local_threshold(gray, block_size, threshold, dst)
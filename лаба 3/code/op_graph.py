@@ -0,0 +1,190 @@
+import threading
+from collections import OrderedDict
+
+from preview import build_proxy, scale_params
+from tiled import OPERATIONS
+
+# Сколько байт промежуточных результатов держать в памяти по умолчанию
+DEFAULT_CACHE_BYTES = 512 * 2 ** 20
+
+
+class ArrayCache:
+    """LRU-кэш массивов, ограниченный суммарным размером в байтах.
+
+    Потокобезопасный: полноразмерный результат считается в фоне, пока GUI
+    обращается к кэшу за превью.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            array = self.items.get(key)
+            if array is None:
+                self.misses += 1
+                return None
+            self.items.move_to_end(key)
+            self.hits += 1
+            return array
+
+    def put(self, key, array):
+        with self.lock:
+            if key in self.items:
+                self.bytes -= self.items.pop(key).nbytes
+            self.items[key] = array
+            self.bytes += array.nbytes
+            # Последний добавленный не вытесняем, даже если он один больше лимита
+            while self.bytes > self.max_bytes and len(self.items) > 1:
+                _, old = self.items.popitem(last=False)
+                self.bytes -= old.nbytes
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.bytes = 0
+
+
+class Node:
+    """Шаг истории: операция с параметрами над результатом родителя"""
+
+    def __init__(self, op, params, parent):
+        self.op = op
+        self.params = dict(params)
+        self.parent = parent
+        self.children = []
+        self.key = None
+
+    def update_key(self):
+        # Ключ описывает всю цепочку от исходника, поэтому одинаковые цепочки делят кэш,
+        # а изменение параметров меняет ключи только у узла и его потомков
+        parent_key = self.parent.key if self.parent is not None else None
+        self.key = (parent_key, self.op, tuple(sorted(self.params.items())))
+        for child in self.children:
+            child.update_key()
+
+
+class OperationGraph:
+    """Неразрушающая история обработки в виде дерева операций.
+
+    Каждый узел хранит операцию и параметры, а не результат; результаты
+    вычисляются по требованию и кэшируются в ArrayCache. Исходник и все
+    результаты — массивы только для чтения, поэтому кэш отдает их без копирования,
+    а операции OpenCV всегда пишут результат в новый массив.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.cache = ArrayCache(max_bytes)
+        self.root = None
+        self.current = None
+        self.redo_stack = []
+        self.source = None
+        self.proxy = None
+        self.proxy_scale = 1.0
+        self.generation = 0
+
+    def load(self, image, proxy_size=None):
+        """Новый исходник: история и кэш начинаются заново.
+
+        proxy_size — (ширина, высота) уменьшенной копии для быстрого превью (см. preview()).
+        """
+        self.cache.clear()
+        image.flags.writeable = False
+        self.source = image
+        if proxy_size is None:
+            self.proxy, self.proxy_scale = image, 1.0
+        else:
+            self.proxy, self.proxy_scale = build_proxy(image, *proxy_size)
+        # Номер исходника в ключе: фоновый расчет по старому изображению не попадет в кэш нового
+        self.generation += 1
+        self.root = Node('source', {'generation': self.generation}, None)
+        self.root.update_key()
+        self.current = self.root
+        self.redo_stack = []
+
+    def apply(self, op, parent=None, **params):
+        """Добавляет операцию к parent (по умолчанию к текущему узлу) и делает ее текущей"""
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {op}")
+        if self.root is None:
+            raise RuntimeError("No image loaded")
+        parent = parent or self.current
+        # Повтор той же операции с теми же параметрами — переходим в существующий узел
+        for child in parent.children:
+            if child.op == op and child.params == params:
+                self.current = child
+                self.redo_stack = []
+                return child
+        node = Node(op, params, parent)
+        parent.children.append(node)
+        node.update_key()
+        self.current = node
+        self.redo_stack = []
+        return node
+
+    def set_params(self, node, **params):
+        """Меняет параметры узла; пересчитаются только он и его потомки"""
+        node.params.update(params)
+        node.update_key()
+
+    def undo(self):
+        if self.current is None or self.current.parent is None:
+            return False
+        self.redo_stack.append(self.current)
+        self.current = self.current.parent
+        return True
+
+    def redo(self):
+        if not self.redo_stack:
+            return False
+        self.current = self.redo_stack.pop()
+        return True
+
+    def plan(self, node=None, proxy=False):
+        """Снимок цепочки от исходника до node: (исходный массив, [(ключ, операция, параметры)]).
+
+        Снимок берется в потоке GUI, а выполнять его через run() можно в фоне:
+        последующие изменения параметров на него не влияют.
+        """
+        node = node or self.current
+        if node is None:
+            return None
+        steps = []
+        while node is not self.root:
+            if proxy:
+                steps.append((('proxy', node.key), node.op, scale_params(node.op, node.params, self.proxy_scale)))
+            else:
+                steps.append((node.key, node.op, dict(node.params)))
+            node = node.parent
+        steps.reverse()
+        return (self.proxy if proxy else self.source), steps
+
+    def run(self, plan):
+        """Выполняет снимок: берет ближайший кэшированный шаг и досчитывает остальные"""
+        if plan is None:
+            return None
+        image, steps = plan
+        start = 0
+        for number in range(len(steps) - 1, -1, -1):
+            cached = self.cache.get(steps[number][0])
+            if cached is not None:
+                image, start = cached, number + 1
+                break
+        for key, op, params in steps[start:]:
+            image = OPERATIONS[op][0](image, **params)
+            image.flags.writeable = False
+            self.cache.put(key, image)
+        return image
+
+    def result(self, node=None):
+        """Полноразмерный результат узла (по умолчанию текущего)"""
+        return self.run(self.plan(node))
+
+    def preview(self, node=None):
+        """Результат узла на уменьшенной копии; параметры в пикселях масштабируются"""
+        return self.run(self.plan(node, proxy=True))
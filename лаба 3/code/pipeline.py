@@ -0,0 +1,268 @@
+"""Пакетная обработка изображений без графического интерфейса.
+
+Запуск из папки code:
+    python -m pipeline ПАПКА -o РЕЗУЛЬТАТ --ops highpass local_gaussian
+    python -m pipeline "scans/**/*.jpg" -o out --ops adaptive --png-compression 1 --workers 8
+    python -m pipeline scans -o out --ops local_sauvola --window 25 --k 0.3
+
+Конвейер — список операций из tiled.OPERATIONS, применяемых по порядку.
+Чтение файлов, обработка и запись идут одновременно: поток чтения кладет байты
+в ограниченную очередь, пул процессов декодирует, фильтрует и кодирует в PNG,
+поток записи сохраняет готовые байты. Между процессами передаются только
+сжатые байты, а не массивы пикселей.
+"""
+import argparse
+import concurrent.futures
+import glob
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from tiled import OPERATIONS, operation, operation_params, window_size
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+# Уровень сжатия PNG по умолчанию (как у OpenCV); 0 — без сжатия, 9 — максимальное
+DEFAULT_PNG_COMPRESSION = 3
+# Сколько секунд ждать места в очереди, прежде чем снова проверить отмену
+QUEUE_POLL = 0.1
+
+
+def _is_pattern(path):
+    return any(char in path for char in '*?[')
+
+
+def _walk_images(folder):
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def iter_jobs(source, output_dir, ext='.png'):
+    """Пары (входной файл, выходной файл); source — папка (обходится рекурсивно) или glob-шаблон.
+
+    Относительные пути сохраняются: scans/a/1.jpg -> РЕЗУЛЬТАТ/a/1.png. Если имя результата
+    уже занято файлом с тем же именем и другим расширением (1.jpg и 1.png), следующий
+    файл сохраняет свое расширение: scans/a/1.png -> РЕЗУЛЬТАТ/a/1.png.png.
+    """
+    if _is_pattern(source):
+        # База — часть пути до первого шаблонного компонента
+        parts = []
+        for part in source.replace('\\', '/').split('/'):
+            if _is_pattern(part):
+                break
+            parts.append(part)
+        base = '/'.join(parts) or '.'
+        paths = (path for path in sorted(glob.iglob(source, recursive=True)) if os.path.isfile(path))
+    else:
+        base = source
+        paths = _walk_images(source)
+    used = set()
+    for path in paths:
+        relative = os.path.relpath(path, base)
+        dst = os.path.join(output_dir, os.path.splitext(relative)[0] + ext)
+        if os.path.normcase(dst) in used:
+            dst = os.path.join(output_dir, relative + ext)
+        used.add(os.path.normcase(dst))
+        yield path, dst
+
+
+def _init_worker():
+    # Параллельность дают процессы; внутренние потоки OpenCV в каждом только мешали бы
+    cv2.setNumThreads(1)
+
+
+def process_image(data, operations, ext, params, op_params=None):
+    """Задача пула: сжатые байты -> операции -> сжатые байты результата"""
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("Cannot decode image")
+    for name in operations:
+        image = operation(name, op_params)[0](image)
+    ok, encoded = cv2.imencode(ext, image, params)
+    if not ok:
+        raise ValueError(f"Cannot encode image as {ext}")
+    return encoded.tobytes()
+
+
+def _put(q, item, stop):
+    """put в ограниченную очередь, который не зависает навсегда после остановки конвейера"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=QUEUE_POLL)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q, stop):
+    """get, который возвращает None (как конец потока), если конвейер остановлен"""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=QUEUE_POLL)
+        except queue.Empty:
+            pass
+    return None
+
+
+def _read_files(jobs, read_queue, stop, cancel_event):
+    outputs = set()
+    try:
+        for src, dst in jobs:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            # Два входа с одним выходом: второй не обрабатываем, а сообщаем об ошибке, иначе он затер бы первый
+            output = os.path.normcase(os.path.abspath(dst))
+            if output in outputs:
+                data = FileExistsError(f"Output file is already used by another input: {dst}")
+            else:
+                outputs.add(output)
+                try:
+                    with open(src, 'rb') as f:
+                        data = f.read()
+                except OSError as e:
+                    data = e
+            if not _put(read_queue, (src, dst, data), stop):
+                return
+    finally:
+        _put(read_queue, None, stop)
+
+
+def _submit(pool, read_queue, encoded_queue, stop, operations, ext, params, op_params):
+    try:
+        while True:
+            item = _get(read_queue, stop)
+            if item is None:
+                break
+            src, dst, data = item
+            if isinstance(data, Exception):
+                future = concurrent.futures.Future()
+                future.set_exception(data)
+            else:
+                future = pool.submit(process_image, data, operations, ext, params, op_params)
+            if not _put(encoded_queue, (src, dst, future), stop):
+                return
+    finally:
+        _put(encoded_queue, None, stop)
+
+
+def _write_files(encoded_queue, done_queue, stop):
+    try:
+        while True:
+            item = _get(encoded_queue, stop)
+            if item is None:
+                break
+            src, dst, future = item
+            try:
+                data = future.result()
+                os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+                with open(dst, 'wb') as f:
+                    f.write(data)
+                error = None
+            except Exception as e:
+                error = e
+            if not _put(done_queue, (src, dst, error), stop):
+                return
+    finally:
+        _put(done_queue, None, stop)
+
+
+def run_pipeline(jobs, operations, workers=None, png_compression=DEFAULT_PNG_COMPRESSION, ext='.png',
+                 queue_size=None, cancel_event=None, op_params=None):
+    """Генератор (src, dst, error) по мере записи результатов; error — None или исключение.
+
+    jobs — пары (src, dst), например из iter_jobs. Каждая очередь между стадиями
+    ограничена queue_size (по умолчанию 2 * workers), поэтому в памяти одновременно
+    находится ограниченное число файлов, сколько бы их ни было на входе.
+    op_params — параметры операций по имени (см. tiled.operation_params).
+    """
+    for name in operations:
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {name}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if queue_size is None:
+        queue_size = 2 * workers
+    params = [cv2.IMWRITE_PNG_COMPRESSION, png_compression] if ext == '.png' else []
+
+    read_queue = queue.Queue(queue_size)
+    encoded_queue = queue.Queue(queue_size)
+    done_queue = queue.Queue(queue_size)
+    stop = threading.Event()
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        threads = [
+            threading.Thread(target=_read_files, args=(iter(jobs), read_queue, stop, cancel_event), daemon=True),
+            threading.Thread(target=_submit, args=(pool, read_queue, encoded_queue, stop, list(operations), ext,
+                                                   params, op_params), daemon=True),
+            threading.Thread(target=_write_files, args=(encoded_queue, done_queue, stop), daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                item = done_queue.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            # Потребитель остановился раньше (или ошибка) — разблокируем стадии
+            stop.set()
+            for thread in threads:
+                thread.join()
+            pool.shutdown(cancel_futures=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная обработка изображений фильтрами лабораторной 3")
+    parser.add_argument('source', help="папка (обходится рекурсивно) или glob-шаблон, например 'scans/**/*.jpg'")
+    parser.add_argument('-o', '--output', required=True, help="папка для результатов")
+    parser.add_argument('--ops', nargs='+', required=True, choices=sorted(OPERATIONS),
+                        help="операции в порядке применения")
+    parser.add_argument('--window', type=window_size, help="окно локальных порогов, нечетное (по умолчанию 11)")
+    parser.add_argument('--k', type=float, help="k для local_sauvola и local_niblack (по умолчанию 0.2 и -0.2)")
+    parser.add_argument('--workers', type=int, help="число процессов (по умолчанию — число ядер)")
+    parser.add_argument('--png-compression', type=int, choices=range(10), default=DEFAULT_PNG_COMPRESSION,
+                        metavar='0-9', help="уровень сжатия PNG: 0 — быстрее, 9 — меньше файлы")
+    parser.add_argument('--queue-size', type=int, help="размер очередей между стадиями")
+    parser.add_argument('--log', help="писать журнал в файл (по умолчанию только предупреждения в stderr)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.log:
+        logging.basicConfig(filename=args.log, level=logging.INFO,
+                            format="%(asctime)s - %(levelname)s - %(message)s")
+    else:
+        logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    start = time.perf_counter()
+    done = errors = 0
+    try:
+        for src, dst, error in run_pipeline(iter_jobs(args.source, args.output), args.ops, args.workers,
+                                            args.png_compression, queue_size=args.queue_size,
+                                            op_params=operation_params(args.ops, args.window, args.k)):
+            done += 1
+            if error is not None:
+                errors += 1
+                logging.error(f"Error processing {src}: {error}")
+    except KeyboardInterrupt:
+        return 130
+
+    elapsed = time.perf_counter() - start
+    logging.info(f"Pipeline {' -> '.join(args.ops)} over {args.source}: {done} files, {errors} errors, "
+                 f"{elapsed:.2f} s ({done / elapsed if elapsed else 0:.1f} files/s)")
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
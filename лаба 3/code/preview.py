@@ -0,0 +1,46 @@
+import cv2
+
+from filters import BLOCK_SIZE
+
+# Параметры, которые задаются в пикселях и должны масштабироваться вместе с прокси
+BLOCK_SIZE_OPERATIONS = ('local_mean', 'local_gaussian', 'local_sauvola', 'local_niblack', 'adaptive')
+
+
+def build_proxy(image, max_width, max_height):
+    """Уменьшенная копия изображения, помещающаяся в max_width x max_height, и ее масштаб.
+
+    Сначала изображение уменьшается пирамидой (cv2.pyrDown — вдвое за шаг, с
+    предварительным сглаживанием), пока оно больше экрана хотя бы вдвое, затем
+    последний шаг делается INTER_AREA до точного размера. Это быстрее, чем
+    INTER_AREA от полного разрешения, и без алиасинга, в отличие от INTER_NEAREST.
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, max_width / width, max_height / height)
+    if scale == 1.0:
+        return image, 1.0
+    target = (max(1, round(width * scale)), max(1, round(height * scale)))
+    proxy = image
+    while proxy.shape[1] >= 2 * target[0] and proxy.shape[0] >= 2 * target[1]:
+        proxy = cv2.pyrDown(proxy)
+    if (proxy.shape[1], proxy.shape[0]) != target:
+        proxy = cv2.resize(proxy, target, interpolation=cv2.INTER_AREA)
+    proxy.flags.writeable = False
+    return proxy, scale
+
+
+def scale_params(op, params, scale):
+    """Параметры операции для прокси: размер окна уменьшается вместе с изображением"""
+    if op not in BLOCK_SIZE_OPERATIONS or scale == 1.0:
+        return params
+    block_size = params.get('block_size', BLOCK_SIZE)
+    # adaptiveThreshold принимает только нечетные окна от 3
+    scaled = max(3, round(block_size * scale) | 1)
+    return dict(params, block_size=scaled)
+
+
+def fit_to(image, shape):
+    """Уменьшает полноразмерный результат до размера прокси для показа"""
+    height, width = shape[:2]
+    if image.shape[:2] == (height, width):
+        return image
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
@@ -0,0 +1,248 @@
+import argparse
+import concurrent.futures
+import functools
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from filters import (BLOCK_SIZE, apply_adaptive_threshold, apply_global_threshold, apply_highpass_filter,
+                     apply_local_threshold)
+
+# Операция: (функция, радиус окна, каким краем OpenCV дополняет изображение на границах)
+# filter2D по умолчанию использует BORDER_REFLECT_101, adaptiveThreshold — BORDER_REPLICATE.
+OPERATIONS = {
+    'highpass': (apply_highpass_filter, 1, cv2.BORDER_REFLECT_101),
+    'local_mean': (functools.partial(apply_local_threshold, method="mean"), BLOCK_SIZE // 2, cv2.BORDER_REPLICATE),
+    'local_gaussian': (functools.partial(apply_local_threshold, method="gaussian"), BLOCK_SIZE // 2,
+                       cv2.BORDER_REPLICATE),
+    'local_sauvola': (functools.partial(apply_local_threshold, method="sauvola"), BLOCK_SIZE // 2,
+                      cv2.BORDER_REPLICATE),
+    'local_niblack': (functools.partial(apply_local_threshold, method="niblack"), BLOCK_SIZE // 2,
+                      cv2.BORDER_REPLICATE),
+    'global': (apply_global_threshold, 0, cv2.BORDER_REPLICATE),
+    'adaptive': (apply_adaptive_threshold, BLOCK_SIZE // 2, cv2.BORDER_REPLICATE),
+}
+# Операции с окном block_size и операции с коэффициентом k
+WINDOW_OPERATIONS = ('local_mean', 'local_gaussian', 'local_sauvola', 'local_niblack', 'adaptive')
+K_OPERATIONS = ('local_sauvola', 'local_niblack')
+
+DEFAULT_TILE = 1024
+
+
+class NpyFile:
+    """Изображение в файле .npy, которое читается и пишется прямоугольниками.
+
+    file[y0:y1, x0:x1] читает прямоугольник построчно через seek и readinto прямо
+    в результат, присваивание пишет его через seek и write. В отличие от memmap,
+    прочитанные страницы не остаются в памяти процесса, поэтому RSS не растет
+    вместе с размером файла. Плитки читаются и пишутся из нескольких потоков,
+    а позиция в файле общая, поэтому каждый прямоугольник обрабатывается под
+    блокировкой (os.pread/os.pwrite без нее обошлись бы, но их нет в Windows).
+    """
+
+    def __init__(self, path, mode='r', shape=None, dtype=np.uint8):
+        if mode == 'r':
+            with open(path, 'rb') as f:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+                offset = f.tell()
+            if fortran_order:
+                raise ValueError(f"Fortran-ordered arrays are not supported: {path}")
+            self.file = open(path, 'rb', buffering=0)
+        else:
+            # Заголовок пишем сразу, данные — по мере готовности плиток
+            header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False,
+                      'shape': tuple(shape)}
+            with open(path, 'wb') as f:
+                np.lib.format.write_array_header_1_0(f, header)
+                offset = f.tell()
+                f.truncate(offset + int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize)
+            self.file = open(path, 'r+b', buffering=0)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.offset = offset
+        self.pixel = int(np.prod(self.shape[2:], dtype=np.int64)) * self.dtype.itemsize
+        self.row = self.shape[1] * self.pixel
+        self.lock = threading.Lock()
+
+    def _bounds(self, key):
+        rows, cols = key
+        y0, y1, _ = rows.indices(self.shape[0])
+        x0, x1, _ = cols.indices(self.shape[1])
+        return y0, y1, x0, x1
+
+    def __getitem__(self, key):
+        y0, y1, x0, x1 = self._bounds(key)
+        out = np.empty((y1 - y0, x1 - x0) + self.shape[2:], dtype=self.dtype)
+        buffer = out.reshape(y1 - y0, -1).view(np.uint8)
+        size = (x1 - x0) * self.pixel
+        with self.lock:
+            for y in range(y0, y1):
+                self.file.seek(self.offset + y * self.row + x0 * self.pixel)
+                if self.file.readinto(buffer[y - y0]) != size:
+                    raise EOFError(f"Unexpected end of file: {self.file.name}")
+        return out
+
+    def __setitem__(self, key, value):
+        y0, y1, x0, x1 = self._bounds(key)
+        buffer = np.ascontiguousarray(value, dtype=self.dtype).reshape(y1 - y0, -1)
+        with self.lock:
+            for y in range(y0, y1):
+                self.file.seek(self.offset + y * self.row + x0 * self.pixel)
+                if self.file.write(buffer[y - y0].data) != buffer[y - y0].nbytes:
+                    raise OSError(f"Short write: {self.file.name}")
+
+    def close(self):
+        self.file.close()
+
+
+def window_size(text):
+    """Тип argparse для окна локальных порогов: нечетное число не меньше 3, как требует adaptiveThreshold"""
+    value = int(text)
+    if value < 3 or value % 2 == 0:
+        raise argparse.ArgumentTypeError(f"window must be an odd number >= 3, got {value}")
+    return value
+
+
+def operation_params(operations, window=None, k=None):
+    """Параметры операций для op_params: окно — всем локальным порогам, k — Sauvola и Niblack"""
+    params = {}
+    for name in operations:
+        values = {}
+        if window is not None and name in WINDOW_OPERATIONS:
+            values['block_size'] = window
+        if k is not None and name in K_OPERATIONS:
+            values['k'] = k
+        if values:
+            params[name] = values
+    return params
+
+
+def operation(name, op_params=None):
+    """(функция, радиус окна, край) операции name с параметрами op_params[name], если они заданы.
+
+    Радиус запаса плитки зависит от окна: у операции с block_size он block_size // 2.
+    """
+    func, radius, border = OPERATIONS[name]
+    params = (op_params or {}).get(name)
+    if params:
+        func = functools.partial(func, **params)
+        if 'block_size' in params:
+            radius = params['block_size'] // 2
+    return func, radius, border
+
+
+def open_source(path):
+    """Источник для плиточной обработки.
+
+    .npy читается с диска по плиткам (NpyFile) — так обрабатываются изображения
+    больше оперативной памяти. Остальные форматы cv2 умеет читать только целиком.
+    """
+    if path.lower().endswith('.npy'):
+        return NpyFile(path)
+    image = cv2.imread(path)
+    if image is None:
+        raise OSError(f"Cannot read image: {path}")
+    return image
+
+
+def output_shape(shape, operations):
+    # Пороговые операции дают одноканальный результат
+    if any(name != 'highpass' for name in operations):
+        return tuple(shape[:2])
+    return tuple(shape)
+
+
+def process_tile(source, operations, y0, y1, x0, x1, op_params=None):
+    """Обрабатывает прямоугольник [y0:y1, x0:x1] с запасом (halo) под окна всех операций.
+
+    На внутренних сторонах запас берется из соседних пикселей изображения, на внешних —
+    дополняется тем же краем, что у OpenCV при обработке всего изображения, поэтому
+    результат совпадает с обработкой целиком.
+    """
+    height, width = source.shape[:2]
+    steps = [operation(name, op_params) for name in operations]
+    halo = sum(radius for _, radius, _ in steps)
+    top, left = max(0, y0 - halo), max(0, x0 - halo)
+    bottom, right = min(height, y1 + halo), min(width, x1 + halo)
+    tile = np.ascontiguousarray(source[top:bottom, left:right])
+
+    at_top, at_left = top == 0, left == 0
+    at_bottom, at_right = bottom == height, right == width
+    for func, radius, border in steps:
+        if radius:
+            # Край изображения дополняем сами, внутренний запас срезается на радиус операции
+            tile = cv2.copyMakeBorder(tile, radius * at_top, radius * at_bottom,
+                                      radius * at_left, radius * at_right, border)
+            tile = func(tile)[radius:-radius, radius:-radius]
+            top += radius * (not at_top)
+            left += radius * (not at_left)
+        else:
+            tile = func(tile)
+    # У края изображения запас был меньше полного — лишнее срезаем по координатам
+    return tile[y0 - top:y1 - top, x0 - left:x1 - left]
+
+
+def iter_tiles(height, width, tile_size):
+    for y0 in range(0, height, tile_size):
+        for x0 in range(0, width, tile_size):
+            yield y0, min(y0 + tile_size, height), x0, min(x0 + tile_size, width)
+
+
+def run_tiled(source, operations, output=None, tile_size=DEFAULT_TILE, workers=None, op_params=None):
+    """Применяет цепочку операций к source по плиткам в пуле потоков.
+
+    source — массив или NpyFile, output — массив или NpyFile для результата, или None. Одновременно в памяти не больше
+    2 * workers плиток, так что пиковая память зависит от размера плитки, а не изображения.
+    op_params — параметры операций по имени, например {'local_sauvola': {'block_size': 25, 'k': 0.3}}.
+    """
+    for name in operations:
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {name}")
+    height, width = source.shape[:2]
+    if output is None:
+        output = np.empty(output_shape(source.shape, operations), dtype=source.dtype)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    def work(y0, y1, x0, x1):
+        output[y0:y1, x0:x1] = process_tile(source, operations, y0, y1, x0, x1, op_params)
+
+    # OpenCV отпускает GIL, поэтому потоков достаточно
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for bounds in iter_tiles(height, width, tile_size):
+            if len(pending) >= 2 * workers:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+            pending.add(executor.submit(work, *bounds))
+        for future in concurrent.futures.as_completed(pending):
+            future.result()
+    return output
+
+
+def run_tiled_file(input_path, output_path, operations, tile_size=DEFAULT_TILE, workers=None, op_params=None):
+    """Файл -> файл. Для .npy результат пишется на диск по мере готовности плиток"""
+    source = open_source(input_path)
+    try:
+        shape = output_shape(source.shape, operations)
+        if output_path.lower().endswith('.npy'):
+            output = NpyFile(output_path, 'w', shape, source.dtype)
+            try:
+                run_tiled(source, operations, output, tile_size, workers, op_params)
+            finally:
+                output.close()
+            return output_path
+        output = run_tiled(source, operations, None, tile_size, workers, op_params)
+    finally:
+        if isinstance(source, NpyFile):
+            source.close()
+    if not cv2.imwrite(output_path, output):
+        raise OSError(f"Cannot write image: {output_path}")
+    return output_path
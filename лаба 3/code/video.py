@@ -0,0 +1,327 @@
+"""Потоковая обработка видео и последовательностей кадров фильтрами лабораторной 3.
+
+Запуск из папки code:
+    python -m video input.mp4 output.mp4 --ops highpass local_gaussian
+    python -m video "frames/%04d.png" "out/%04d.png" --ops adaptive --workers 4
+    python -m video 0 out.avi --ops global --fourcc MJPG --drop-when-busy   # камера
+    python -m video input.mp4 output.mp4 --ops local_niblack --window 31 --k -0.3
+
+Поток декодирования читает кадры в заранее выделенные буферы, пул потоков
+применяет операции (OpenCV отпускает GIL), поток кодирования пишет результаты
+строго по порядку. Буферы кадров и промежуточные массивы выделяются один раз
+и переиспользуются, поэтому на кадр не приходится ни одного выделения памяти.
+"""
+import argparse
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from tiled import OPERATIONS, operation, operation_params, output_shape, window_size
+
+DEFAULT_FOURCC = 'mp4v'
+# Частота для последовательностей кадров, у которых ее нет в метаданных
+DEFAULT_FPS = 25.0
+# Сколько секунд ждать буфер или кадр, прежде чем снова проверить отмену
+QUEUE_POLL = 0.1
+
+
+class StreamStats:
+    """Счетчики потока; обновляются на ходу, их можно читать из другого потока"""
+
+    def __init__(self):
+        self.decoded = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.start = time.perf_counter()
+        self.finish = None
+
+    @property
+    def elapsed(self):
+        return (self.finish or time.perf_counter()) - self.start
+
+    @property
+    def fps(self):
+        elapsed = self.elapsed
+        return self.written / elapsed if elapsed > 0 else 0.0
+
+
+class BufferPool:
+    """Кадры одного размера, выделенные заранее; get ждет, пока какой-нибудь не освободится"""
+
+    def __init__(self, count, shape, dtype=np.uint8):
+        self.free = queue.SimpleQueue()
+        for _ in range(count):
+            self.free.put(np.empty(shape, dtype=dtype))
+
+    def get(self, stop, block=True):
+        """Свободный буфер; None — если конвейер остановлен или (при block=False) свободных нет"""
+        while not stop.is_set():
+            try:
+                return self.free.get(timeout=QUEUE_POLL) if block else self.free.get_nowait()
+            except queue.Empty:
+                if not block:
+                    return None
+        return None
+
+    def put(self, buffer):
+        self.free.put(buffer)
+
+
+class FrameProcessor:
+    """Цепочка операций над кадром; у каждого потока свой экземпляр с своими промежуточными буферами"""
+
+    def __init__(self, operations, op_params=None):
+        self.operations = list(operations)
+        self.funcs = [operation(name, op_params)[0] for name in self.operations]
+        self.buffers = {}
+
+    def _buffer(self, key, shape):
+        buffer = self.buffers.get(key)
+        if buffer is None or buffer.shape != shape:
+            buffer = self.buffers[key] = np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def process(self, frame, out):
+        current = frame
+        last = len(self.operations) - 1
+        for step, name in enumerate(self.operations):
+            if name != 'highpass' and current.ndim == 3:
+                # Пороги работают с серым; переводим сами, в свой буфер, чтобы фильтр не выделял память
+                gray = self._buffer(('gray', step), current.shape[:2])
+                cv2.cvtColor(current, cv2.COLOR_BGR2GRAY, dst=gray)
+                current = gray
+            target = out if step == last else self._buffer(step, current.shape)
+            current = self.funcs[step](current, dst=target)
+        if current is not out:
+            out[...] = current
+        return out
+
+
+class FrameWriter:
+    """Запись в видеофайл (cv2.VideoWriter) или в последовательность файлов по шаблону с %d"""
+
+    def __init__(self, path, fps, shape, fourcc=DEFAULT_FOURCC):
+        self.pattern = path if '%' in path else None
+        self.writer = None
+        if self.pattern is None:
+            height, width = shape[:2]
+            self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height),
+                                          isColor=len(shape) == 3)
+            if not self.writer.isOpened():
+                raise OSError(f"Cannot open video writer: {path}")
+        else:
+            folder = os.path.dirname(self.pattern)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+
+    def write(self, index, frame):
+        if self.writer is not None:
+            self.writer.write(frame)
+        elif not cv2.imwrite(self.pattern % index, frame):
+            raise OSError(f"Cannot write frame: {self.pattern % index}")
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+
+
+def open_capture(source):
+    """Видеофайл, последовательность кадров по шаблону с %d или номер камеры"""
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    if not capture.isOpened():
+        raise OSError(f"Cannot open video source: {source}")
+    return capture
+
+
+def _decode(capture, index, in_pool, work_queue, stats, stop, cancel_event, drop_when_busy):
+    try:
+        while cancel_event is None or not cancel_event.is_set():
+            buffer = in_pool.get(stop, block=not drop_when_busy)
+            if buffer is None:
+                if stop.is_set():
+                    return
+                # Живой источник ждать не будет: кадр пропускаем, даже не декодируя
+                if not capture.grab():
+                    return
+                stats.dropped += 1
+                continue
+            ok, frame = capture.read(buffer)
+            if not ok:
+                in_pool.put(buffer)
+                return
+            if frame is not buffer:
+                # Размер кадра изменился посреди потока — дальше работаем с новым буфером
+                buffer = frame
+            stats.decoded += 1
+            work_queue.put((index, buffer))
+            index += 1
+    finally:
+        capture.release()
+
+
+def _filter(operations, op_params, in_pool, out_pool, work_queue, result_queue, stop):
+    processor = FrameProcessor(operations, op_params)
+    while True:
+        # Буфер результата берем до кадра: тогда у кадра, которого ждет кодировщик, он точно есть
+        out = out_pool.get(stop)
+        if out is None:
+            return
+        item = work_queue.get()
+        if item is None:
+            out_pool.put(out)
+            return
+        index, frame = item
+        try:
+            processor.process(frame, out)
+            error = None
+        except Exception as e:
+            out_pool.put(out)
+            out, error = None, e
+        in_pool.put(frame)
+        result_queue.put((index, out, error))
+
+
+def _encode(writer, out_pool, result_queue, stats):
+    pending = {}
+    next_index = 0
+    while True:
+        item = result_queue.get()
+        if item is None:
+            break
+        index, buffer, error = item
+        pending[index] = (buffer, error)
+        # Кадры приходят в порядке готовности, а пишутся в порядке номеров
+        while next_index in pending:
+            buffer, error = pending.pop(next_index)
+            if error is None:
+                try:
+                    writer.write(next_index, buffer)
+                    stats.written += 1
+                except Exception as e:
+                    error = e
+            if error is not None:
+                stats.dropped += 1
+                stats.errors += 1
+                logging.error(f"Frame {next_index} dropped: {error}")
+            if buffer is not None:
+                out_pool.put(buffer)
+            next_index += 1
+
+
+def run_stream(source, output, operations, workers=None, fps=None, fourcc=DEFAULT_FOURCC, pool_size=None,
+               drop_when_busy=False, cancel_event=None, stats=None, op_params=None):
+    """Обрабатывает source кадр за кадром и пишет в output; возвращает StreamStats.
+
+    pool_size — число буферов кадров на входе и на выходе (по умолчанию 2 * workers + 2).
+    drop_when_busy — для живых источников: если все буферы заняты, кадр пропускается
+    и учитывается в stats.dropped, а не тормозит чтение.
+    op_params — параметры операций по имени (см. tiled.operation_params).
+    """
+    for name in operations:
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {name}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if pool_size is None:
+        pool_size = 2 * workers + 2
+    if stats is None:
+        stats = StreamStats()
+
+    capture = open_capture(source)
+    ok, first = capture.read()
+    if not ok:
+        capture.release()
+        raise OSError(f"No frames in video source: {source}")
+    if fps is None:
+        fps = capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+
+    in_pool = BufferPool(pool_size, first.shape)
+    out_pool = BufferPool(pool_size, output_shape(first.shape, operations))
+    writer = FrameWriter(output, fps, output_shape(first.shape, operations), fourcc)
+    work_queue = queue.SimpleQueue()
+    result_queue = queue.SimpleQueue()
+    stop = threading.Event()
+
+    # Первый кадр уже прочитан ради размера — кладем его в буфер пула
+    buffer = in_pool.get(stop)
+    buffer[...] = first
+    stats.decoded += 1
+    work_queue.put((0, buffer))
+
+    decoder = threading.Thread(target=_decode, daemon=True,
+                               args=(capture, 1, in_pool, work_queue, stats, stop, cancel_event, drop_when_busy))
+    filters = [threading.Thread(target=_filter, daemon=True,
+                                args=(operations, op_params, in_pool, out_pool, work_queue, result_queue, stop))
+               for _ in range(workers)]
+    encoder = threading.Thread(target=_encode, args=(writer, out_pool, result_queue, stats), daemon=True)
+    for thread in (decoder, *filters, encoder):
+        thread.start()
+    try:
+        decoder.join()
+        for _ in filters:
+            work_queue.put(None)
+        for thread in filters:
+            thread.join()
+        result_queue.put(None)
+        encoder.join()
+    finally:
+        # При исключении (Ctrl+C) отпускаем потоки, которые ждут буферы
+        stop.set()
+        writer.close()
+        stats.finish = time.perf_counter()
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Потоковая обработка видео фильтрами лабораторной 3")
+    parser.add_argument('source', help="видеофайл, шаблон кадров вроде 'frames/%%04d.png' или номер камеры")
+    parser.add_argument('output', help="видеофайл или шаблон кадров вроде 'out/%%04d.png'")
+    parser.add_argument('--ops', nargs='+', required=True, choices=sorted(OPERATIONS),
+                        help="операции в порядке применения")
+    parser.add_argument('--window', type=window_size, help="окно локальных порогов, нечетное (по умолчанию 11)")
+    parser.add_argument('--k', type=float, help="k для local_sauvola и local_niblack (по умолчанию 0.2 и -0.2)")
+    parser.add_argument('--workers', type=int, help="число потоков фильтров (по умолчанию — число ядер)")
+    parser.add_argument('--fps', type=float, help="частота кадров результата (по умолчанию — как у источника)")
+    parser.add_argument('--fourcc', default=DEFAULT_FOURCC, help="кодек видео: mp4v, MJPG, XVID, ...")
+    parser.add_argument('--pool-size', type=int, help="число буферов кадров на входе и на выходе")
+    parser.add_argument('--drop-when-busy', action='store_true',
+                        help="пропускать кадры, а не ждать, когда все буферы заняты (для камеры)")
+    parser.add_argument('--log', help="писать журнал в файл (по умолчанию только предупреждения в stderr)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.log:
+        logging.basicConfig(filename=args.log, level=logging.INFO,
+                            format="%(asctime)s - %(levelname)s - %(message)s")
+    else:
+        logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    stats = StreamStats()
+    try:
+        run_stream(args.source, args.output, args.ops, args.workers, args.fps, args.fourcc, args.pool_size,
+                   args.drop_when_busy, stats=stats, op_params=operation_params(args.ops, args.window, args.k))
+    except KeyboardInterrupt:
+        # Записанное до прерывания остается в файле: writer закрыт в run_stream
+        pass
+    except (OSError, ValueError) as e:
+        logging.error(e)
+        return 1
+
+    summary = (f"{args.source}: {stats.decoded} decoded, {stats.written} written, {stats.dropped} dropped, "
+               f"{stats.elapsed:.2f} s ({stats.fps:.1f} fps)")
+    logging.info(summary)
+    print(summary)
+    return 1 if stats.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import math
+import tkinter as tk
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+# Цвет поля вокруг изображения (серый уровень)
+BACKGROUND = 64
+# Насколько можно растянуть уменьшенный уровень, прежде чем брать больший
+LEVEL_SLACK = 0.9
+ZOOM_STEP = 1.25
+MAX_ZOOM = 64.0
+
+
+class ImageViewer(tk.Canvas):
+    """Область просмотра с масштабом и прокруткой.
+
+    Держит один буфер и один PhotoImage размером с окно и при каждом обновлении
+    пересэмплирует только видимую часть изображения прямо в этот буфер.
+    Одноканальные массивы показываются как 'L', трехканальные BGR — через
+    распаковщик PIL 'BGR', без cvtColor. Можно передать несколько уровней одного
+    изображения (от большего к меньшему): берется наименьший, которого хватает
+    для текущего масштаба.
+    """
+
+    def __init__(self, master, width=800, height=600, **kwargs):
+        super().__init__(master, width=width, height=height, highlightthickness=0,
+                         background=f"#{BACKGROUND:02x}{BACKGROUND:02x}{BACKGROUND:02x}", **kwargs)
+        self.levels = ()
+        # zoom = 1 — изображение целиком вписано в окно; center — доли ширины и высоты
+        self.zoom = 1.0
+        self.center = (0.5, 0.5)
+        self.buffer = None
+        self.photo = None
+        self.item = self.create_image(0, 0, anchor="nw")
+        self.drag_from = None
+
+        self.bind("<Configure>", lambda e: self.render())
+        self.bind("<MouseWheel>", lambda e: self.zoom_at(e.x, e.y, ZOOM_STEP if e.delta > 0 else 1 / ZOOM_STEP))
+        self.bind("<Button-4>", lambda e: self.zoom_at(e.x, e.y, ZOOM_STEP))
+        self.bind("<Button-5>", lambda e: self.zoom_at(e.x, e.y, 1 / ZOOM_STEP))
+        self.bind("<ButtonPress-1>", self.on_press)
+        self.bind("<B1-Motion>", self.on_drag)
+        self.bind("<Double-Button-1>", lambda e: self.reset_view())
+
+    def show(self, *levels):
+        """Показывает изображение; масштаб и центр сохраняются, если пропорции изображения не изменились"""
+        if self.levels:
+            old_height, old_width = self.levels[0].shape[:2]
+            height, width = levels[0].shape[:2]
+            if abs(old_width / old_height - width / height) > 0.01:
+                self.zoom, self.center = 1.0, (0.5, 0.5)
+        self.levels = levels
+        self.render()
+
+    def reset_view(self):
+        self.zoom, self.center = 1.0, (0.5, 0.5)
+        self.render()
+
+    def display_scale(self):
+        """Сколько пикселей окна приходится на пиксель самого большого уровня"""
+        height, width = self.levels[0].shape[:2]
+        return min(self.winfo_width() / width, self.winfo_height() / height) * self.zoom
+
+    def zoom_at(self, x, y, factor):
+        if not self.levels:
+            return
+        zoom = min(MAX_ZOOM, max(1.0, self.zoom * factor))
+        height, width = self.levels[0].shape[:2]
+        scale = self.display_scale()
+        new_scale = scale * zoom / self.zoom
+        # Точка под курсором остается на месте
+        dx, dy = x - self.winfo_width() / 2, y - self.winfo_height() / 2
+        u = self.center[0] + dx / (scale * width) - dx / (new_scale * width)
+        v = self.center[1] + dy / (scale * height) - dy / (new_scale * height)
+        self.zoom = zoom
+        self.center = (u, v)
+        self.render()
+
+    def on_press(self, event):
+        self.drag_from = (event.x, event.y)
+
+    def on_drag(self, event):
+        if not self.levels or self.drag_from is None:
+            return
+        height, width = self.levels[0].shape[:2]
+        scale = self.display_scale()
+        dx, dy = event.x - self.drag_from[0], event.y - self.drag_from[1]
+        self.drag_from = (event.x, event.y)
+        self.center = (self.center[0] - dx / (scale * width), self.center[1] - dy / (scale * height))
+        self.render()
+
+    def _ensure_buffer(self, width, height, channels):
+        shape = (height, width) if channels == 1 else (height, width, channels)
+        if self.buffer is None or self.buffer.shape != shape:
+            self.buffer = np.empty(shape, dtype=np.uint8)
+            self.photo = ImageTk.PhotoImage('L' if channels == 1 else 'RGB', (width, height))
+            self.itemconfig(self.item, image=self.photo)
+
+    def render(self):
+        view_width, view_height = self.winfo_width(), self.winfo_height()
+        if not self.levels or view_width < 2 or view_height < 2:
+            return
+        full_width = self.levels[0].shape[1]
+        scale = self.display_scale()
+
+        # Самый маленький уровень, у которого пикселей почти не меньше, чем пикселей окна на изображение
+        level = self.levels[0]
+        for candidate in self.levels[1:]:
+            if candidate.shape[1] >= full_width * scale * LEVEL_SLACK:
+                level = candidate
+        level_height, level_width = level.shape[:2]
+        level_scale = scale * full_width / level_width
+
+        # Центр не уводим за края изображения
+        half_u = min(0.5, view_width / (2 * level_scale * level_width))
+        half_v = min(0.5, view_height / (2 * level_scale * level_height))
+        self.center = (min(max(self.center[0], half_u), 1 - half_u), min(max(self.center[1], half_v), 1 - half_v))
+        center_x, center_y = self.center[0] * level_width, self.center[1] * level_height
+
+        channels = 1 if level.ndim == 2 else level.shape[2]
+        self._ensure_buffer(view_width, view_height, channels)
+        buffer = self.buffer
+        if level_scale >= 1:
+            # Увеличение: точная аффинная карта с дробным сдвигом. Крайние пиксели уровня, видные
+            # частично, обрезаются окном, а не сжимаются в него, поэтому пиксель всегда level_scale
+            # пикселей окна и при прокрутке изображение не дрожит. Центры пикселей: i + 0.5 -> j + 0.5.
+            offset_x = view_width / 2 - 0.5 + (0.5 - center_x) * level_scale
+            offset_y = view_height / 2 - 0.5 + (0.5 - center_y) * level_scale
+            matrix = np.array([[level_scale, 0, offset_x], [0, level_scale, offset_y]])
+            cv2.warpAffine(level, matrix, (view_width, view_height), dst=buffer, flags=cv2.INTER_NEAREST,
+                           borderMode=cv2.BORDER_CONSTANT, borderValue=(BACKGROUND,) * 4)
+        else:
+            # Уменьшение (только у самого маленького уровня): INTER_AREA есть лишь у resize;
+            # растяжение крайних пикселей здесь меньше пикселя окна
+            x0 = max(0, math.floor(center_x - view_width / (2 * level_scale)))
+            x1 = min(level_width, math.ceil(center_x + view_width / (2 * level_scale)))
+            y0 = max(0, math.floor(center_y - view_height / (2 * level_scale)))
+            y1 = min(level_height, math.ceil(center_y + view_height / (2 * level_scale)))
+            left = max(0, round(view_width / 2 + (x0 - center_x) * level_scale))
+            top = max(0, round(view_height / 2 + (y0 - center_y) * level_scale))
+            right = min(view_width, round(view_width / 2 + (x1 - center_x) * level_scale))
+            bottom = min(view_height, round(view_height / 2 + (y1 - center_y) * level_scale))
+            if left > 0 or top > 0 or right < view_width or bottom < view_height:
+                buffer[...] = BACKGROUND
+            if right > left and bottom > top:
+                # Результат пишется прямо в окно буфера, без промежуточного массива
+                cv2.resize(level[y0:y1, x0:x1], (right - left, bottom - top), dst=buffer[top:bottom, left:right],
+                           interpolation=cv2.INTER_AREA)
+
+        if channels == 1:
+            image = Image.frombuffer('L', (view_width, view_height), buffer, 'raw', 'L', 0, 1)
+        else:
+            image = Image.frombuffer('RGB', (view_width, view_height), buffer, 'raw', 'BGR', 0, 1)
+        self.photo.paste(image)
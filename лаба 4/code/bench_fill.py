@@ -0,0 +1,108 @@
+"""Бенчмарк заливки многоугольников: построчное сканирование против проверки каждого пикселя.
+
+Многоугольники — звезды со случайными лучами (простые) и звездчатые
+многоугольники {n/k} (самопересекающиеся, на них различаются правила заливки)
+с числом вершин из --vertices. Для каждого измеряется построение спанов и
+заливка растра; проверка каждого пикселя (точка в многоугольнике для всех
+центров пикселей сразу) выполняется только до --naive-limit вершин, иначе она
+слишком долгая. Отдельно — пакет из --batch небольших многоугольников за один вызов.
+
+Запуск: python bench_fill.py [--vertices 10 100 1000 10000 100000] [--size 1000]
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+import fill
+
+
+def random_star(count, size, rng):
+    """Простой многоугольник: вершины по возрастанию угла на случайном расстоянии от центра"""
+    angles = np.sort(rng.random(count)) * 2 * math.pi
+    radii = size / 2 * (0.3 + 0.65 * rng.random(count))
+    return np.stack([size / 2 + radii * np.cos(angles), size / 2 + radii * np.sin(angles)], axis=1)
+
+
+def star_polygon(count, size):
+    """Звездчатый многоугольник {count/k}: вершины правильного count-угольника через k"""
+    # Шаг взаимно прост с count, иначе обход распадается на несколько одинаковых многоугольников
+    step = max(1, count // 2 - 1)
+    while math.gcd(count, step) != 1:
+        step -= 1
+    angles = (np.arange(count) * step % count) * 2 * math.pi / count
+    return np.stack([size / 2 + size * 0.45 * np.cos(angles), size / 2 + size * 0.45 * np.sin(angles)], axis=1)
+
+
+def naive_fill(vertices, size, rule):
+    """Проверка каждого центра пикселя: число и направления пересечений лучом вправо"""
+    ys, xs = np.mgrid[0:size, 0:size] + 0.5
+    winding = np.zeros((size, size), dtype=np.int64)
+    crossings = np.zeros((size, size), dtype=np.int64)
+    for (x0, y0), (x1, y1) in zip(vertices, np.roll(vertices, -1, axis=0)):
+        if y0 == y1:
+            continue
+        lower, upper = min(y0, y1), max(y0, y1)
+        hit = (ys >= lower) & (ys < upper) & (xs < x0 + (ys - y0) * (x1 - x0) / (y1 - y0))
+        crossings += hit
+        winding += np.where(hit, 1 if y1 > y0 else -1, 0)
+    return crossings % 2 == 1 if rule == 'evenodd' else winding != 0
+
+
+def timed(func, repeat):
+    """Наименьшее время вызова из repeat, с, и результат последнего вызова"""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--vertices', type=int, nargs='+', default=[10, 100, 1000, 10000, 100000])
+    parser.add_argument('--size', type=int, default=1000, help="сторона растра, пикселей")
+    parser.add_argument('--batch', type=int, default=10000, help="многоугольников по 10 вершин в пакете")
+    parser.add_argument('--naive-limit', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    size, bounds = args.size, (args.size, args.size)
+    print(f"растр {size}x{size}")
+    print(f"{'многоугольник':<14} {'вершин':>7} {'правило':>8} {'спанов':>8} {'пикселей':>9} "
+          f"{'спаны, мс':>10} {'заливка, мс':>12} {'попиксельно, мс':>16}")
+    for count in args.vertices:
+        for name, vertices in (('звезда', random_star(count, size, rng)), ('{n/k}', star_polygon(count, size))):
+            for rule in fill.RULES:
+                spans_time, (spans, _) = timed(lambda: fill.polygon_spans(vertices, rule=rule, bounds=bounds),
+                                               args.repeat)
+                bitmap = np.zeros((size, size), dtype=np.uint8)
+                fill_time, _ = timed(lambda: fill.fill_spans(bitmap, spans), args.repeat)
+                naive = ''
+                if count <= args.naive_limit:
+                    naive_time, mask = timed(lambda: naive_fill(vertices, size, rule), 1)
+                    naive = f"{naive_time * 1000:.1f}"
+                    if not np.array_equal(mask, bitmap.astype(bool)):
+                        naive += ' (не совпало!)'
+                pixels = int((spans[:, 2] - spans[:, 1]).sum())
+                print(f"{name:<14} {count:>7} {rule:>8} {len(spans):>8} {pixels:>9} "
+                      f"{spans_time * 1000:>10.1f} {fill_time * 1000:>12.1f} {naive:>16}")
+
+    # Пакет: все многоугольники за один обход строк
+    centers = rng.random((args.batch, 2)) * size
+    vertices = np.concatenate([random_star(10, 40, rng) - 20 + center for center in centers])
+    counts = np.full(args.batch, 10)
+    values = rng.integers(1, 256, args.batch, dtype=np.uint8)
+    bitmap = np.zeros((size, size), dtype=np.uint8)
+    batch_time, _ = timed(lambda: fill.fill_polygons(bitmap, vertices, counts, values), args.repeat)
+    loop_time, _ = timed(lambda: [fill.fill_polygon(bitmap, vertices[i * 10:(i + 1) * 10], values[i])
+                                  for i in range(args.batch)], 1)
+    print(f"пакет из {args.batch} многоугольников по 10 вершин: {batch_time * 1000:.1f} мс, "
+          f"по одному: {loop_time * 1000:.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Бенчмарк алгоритмов растеризации: пикселей в секунду с доверительными интервалами.
+
+Каждый алгоритм прогоняется по сетке длин и наклонов отрезков (для окружностей
+и эллипсов — по радиусам, у эллипса полуоси r и r // 2). Толстые отрезки
+рисуются шириной --width, у отрезков Ву в пиксели входят оба пикселя пары.
+Время — perf_counter_ns; перед замером несколько прогревочных прогонов, затем
+--repeat повторов, в каждом вызов повторяется столько раз, чтобы повтор длился
+не меньше --min-time. По умолчанию растеризуется один
+примитив за вызов, с --batch N — пакет из N одинаковых примитивов.
+
+Результаты можно сохранить в CSV и JSON. JSON подходит как эталон: с --baseline
+каждый случай сравнивается с ним, и если скорость упала больше чем на
+--tolerance и доверительные интервалы не пересекаются, скрипт завершается с кодом 1.
+
+Запуск:
+    python bench_raster.py --json baseline.json
+    python bench_raster.py --baseline baseline.json [--tolerance 0.1]
+"""
+import argparse
+import csv
+import json
+import math
+import statistics
+import sys
+import time
+
+import numpy as np
+
+import raster
+
+LINE_ALGORITHMS = ('step', 'dda', 'bresenham', 'thick', 'wu')
+# Критические значения t Стьюдента для 95% интервала по числу степеней свободы; дальше — нормальное 1.96
+T_95 = {1: 12.71, 2: 4.30, 3: 3.18, 4: 2.78, 5: 2.57, 6: 2.45, 7: 2.36, 8: 2.31, 9: 2.26, 10: 2.23,
+        12: 2.18, 15: 2.13, 20: 2.09, 30: 2.04}
+FIELDS = ('algorithm', 'length', 'slope', 'radius', 'width', 'batch', 'pixels', 'repeat', 'mean_ns',
+          'pixels_per_sec', 'ci_low', 'ci_high')
+
+
+def t_critical(df):
+    for limit in sorted(T_95):
+        if df <= limit:
+            return T_95[limit]
+    return 1.96
+
+
+def measure(func, warmup=3, repeat=10, min_time=0.02):
+    """Время одного вызова func в наносекундах для каждого из repeat повторов"""
+    for _ in range(warmup):
+        func()
+    # Число вызовов в повторе подбирается так, чтобы повтор был заметно длиннее разрешения таймера
+    number = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9:
+            break
+        number *= 2
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter_ns() - start) / number)
+    return samples
+
+
+def summarize(samples, pixels):
+    """Средняя скорость в пикселях в секунду и ее 95% доверительный интервал"""
+    rates = [pixels / (ns / 1e9) for ns in samples]
+    mean = statistics.fmean(rates)
+    if len(rates) < 2:
+        return mean, mean, mean
+    half = t_critical(len(rates) - 1) * statistics.stdev(rates) / math.sqrt(len(rates))
+    return mean, mean - half, mean + half
+
+
+def line_cases(lengths, slopes, batch, width):
+    for algorithm in LINE_ALGORITHMS:
+        for length in lengths:
+            for slope in slopes:
+                angle = math.radians(slope)
+                segment = (0, 0, round(length * math.cos(angle)), round(length * math.sin(angle)))
+                segments = np.tile(segment, (batch, 1))
+                case = {'algorithm': algorithm, 'length': length, 'slope': slope, 'radius': '', 'width': '',
+                        'batch': batch}
+                if algorithm == 'thick':
+                    case['width'] = width
+                    func = (lambda segments=segments: raster.lines_thick(segments, width))
+                elif algorithm == 'wu':
+                    func = (lambda segments=segments: raster.lines_wu(segments))
+                else:
+                    func = (lambda func=raster.LINE_ALGORITHMS[algorithm], segments=segments: func(segments))
+                yield case, func
+
+
+def circle_cases(radii, batch):
+    for radius in radii:
+        circles = np.tile((0, 0, radius), (batch, 1))
+        ellipses = np.tile((0, 0, radius, radius // 2), (batch, 1))
+        case = {'length': '', 'slope': '', 'radius': radius, 'width': '', 'batch': batch}
+        yield dict(case, algorithm='circle'), (lambda circles=circles: raster.circles_bresenham(circles))
+        yield dict(case, algorithm='ellipse'), (lambda ellipses=ellipses: raster.ellipses_midpoint(ellipses))
+
+
+def run(args):
+    results = []
+    cases = list(line_cases(args.lengths, args.slopes, args.batch, args.width))
+    cases += list(circle_cases(args.radii, args.batch))
+    for case, func in cases:
+        points = func()[0]
+        samples = measure(func, args.warmup, args.repeat, args.min_time)
+        mean, low, high = summarize(samples, len(points))
+        results.append(dict(case, pixels=len(points), repeat=len(samples), mean_ns=statistics.fmean(samples),
+                            pixels_per_sec=mean, ci_low=low, ci_high=high))
+    return results
+
+
+def _key(result):
+    # Наклон 45 из значений по умолчанию и 45.0 из командной строки — один и тот же случай;
+    # у эталонов, снятых до появления толстых отрезков, поля width нет
+    return tuple(f"{value:g}" if isinstance(value, (int, float)) else value
+                 for value in (result.get(field, '') for field in ('algorithm', 'length', 'slope', 'radius', 'width',
+                                                                   'batch')))
+
+
+def compare(results, baseline, tolerance):
+    """Случаи, где скорость упала больше чем на tolerance и интервалы не пересекаются"""
+    reference = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = reference.get(_key(result))
+        if old is None:
+            continue
+        result['baseline'] = old['pixels_per_sec']
+        result['change'] = result['pixels_per_sec'] / old['pixels_per_sec'] - 1
+        if result['change'] < -tolerance and result['ci_high'] < old['ci_low']:
+            regressions.append(result)
+    return regressions
+
+
+def print_table(results):
+    print(f"{'алгоритм':<10} {'длина':>6} {'наклон':>7} {'радиус':>7} {'ширина':>6} {'пакет':>6} {'пикс.':>8} "
+          f"{'Мпикс/с':>9} {'± 95%':>8} {'к эталону':>10}")
+    for result in results:
+        change = f"{result['change'] * 100:+.1f}%" if 'change' in result else ''
+        print(f"{result['algorithm']:<10} {result['length']!s:>6} {result['slope']!s:>7} {result['radius']!s:>7} "
+              f"{result['width']!s:>6} {result['batch']:>6} {result['pixels']:>8} "
+              f"{result['pixels_per_sec'] / 1e6:>9.2f} {(result['ci_high'] - result['pixels_per_sec']) / 1e6:>8.2f} {change:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lengths', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--slopes', type=float, nargs='+', default=[0, 30, 45, 60, 90], help="наклоны в градусах")
+    parser.add_argument('--radii', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--width', type=int, default=5, help="ширина толстых отрезков, пикселей")
+    parser.add_argument('--batch', type=int, default=1, help="примитивов за один вызов")
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--min-time', type=float, default=0.02, help="наименьшая длительность повтора, с")
+    parser.add_argument('--csv', help="сохранить результаты в CSV")
+    parser.add_argument('--json', help="сохранить результаты в JSON (годится как эталон)")
+    parser.add_argument('--baseline', help="JSON прошлого запуска для поиска регрессий")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="допустимое замедление, доля")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            regressions = compare(results, json.load(file)['results'], args.tolerance)
+    print_table(results)
+
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'numpy': np.__version__, 'python': sys.version.split()[0], 'results': results}, file,
+                      indent=1)
+    if regressions:
+        print(f"Регрессии относительно {args.baseline}: {len(regressions)}")
+        for result in regressions:
+            print(f"  {' '.join(_key(result))}: {result['change'] * 100:+.1f}%")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
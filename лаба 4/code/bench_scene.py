@@ -0,0 +1,91 @@
+"""Бенчмарк сцены: полная перерисовка растра против перерисовки плиток после одной правки.
+
+С --check после каждой правки растр сравнивается с полной перерисовкой новой
+SceneRaster: перерисовка по плиткам должна давать тот же результат. С
+--fractional координаты примитивов и сдвиги дробные.
+
+Запуск: python bench_scene.py [--primitives 5000] [--scale 2] [--edits 200] [--check] [--fractional]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from scene import CIRCLE, KINDS, Scene, SceneRaster
+
+LINE_KINDS = [kind for number, kind in enumerate(KINDS) if number != CIRCLE]
+
+
+def make_scene(count, extent, fractional=False, seed=0):
+    rng = np.random.default_rng(seed)
+    kinds = rng.integers(0, len(KINDS), count)
+    coords = rng.integers(-extent, extent, (count, 4)).astype(np.float64)
+    # Короткие отрезки и небольшие окружности, как в векторной разметке
+    coords[:, 2:] = coords[:, :2] + rng.integers(-extent // 8, extent // 8, (count, 2))
+    circles = kinds == KINDS.index('circle')
+    coords[circles, 2] = rng.integers(1, extent // 10, circles.sum())
+    coords[circles, 3] = 0
+    if fractional:
+        coords += rng.random((count, 4)) * 2 - 1
+    colors = rng.integers(0, 256, (count, 4), dtype=np.uint8)
+    colors[:, 3] = 255
+    scene = Scene()
+    scene.add_many(kinds, coords, colors)
+    return scene
+
+
+def full_redraw(scene_raster):
+    """Растр той же сцены, нарисованный целиком заново"""
+    # Новая SceneRaster забирает рамки изменений сцены — вызывать только после redraw
+    reference = SceneRaster(scene_raster.scene, scene_raster.width, scene_raster.height, scene_raster.scale,
+                            scene_raster.point_size, scene_raster.tile_size)
+    reference.redraw()
+    return reference.bitmap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--primitives', type=int, default=5000)
+    parser.add_argument('--scale', type=int, default=2)
+    parser.add_argument('--width', type=int, default=800)
+    parser.add_argument('--height', type=int, default=500)
+    parser.add_argument('--edits', type=int, default=200)
+    parser.add_argument('--check', action='store_true', help="сравнивать каждую перерисовку с полной")
+    parser.add_argument('--fractional', action='store_true', help="дробные координаты и сдвиги")
+    args = parser.parse_args()
+
+    extent = min(args.width, args.height) // (2 * args.scale)
+    scene = make_scene(args.primitives, extent, args.fractional)
+    scene_raster = SceneRaster(scene, args.width, args.height, args.scale, point_size=3)
+    start = time.perf_counter()
+    scene_raster.redraw()
+    full = time.perf_counter() - start
+    print(f"{len(scene)} примитивов, холст {args.width}x{args.height}, масштаб {args.scale}")
+    print(f"полная перерисовка: {full * 1000:.1f} мс")
+
+    rng = np.random.default_rng(1)
+    for name in ('move', 'add', 'remove'):
+        times, tiles, mismatches = [], 0, 0
+        for _ in range(args.edits):
+            ids = scene.ids()
+            if name == 'move':
+                shift = rng.uniform(-5, 5, 2) if args.fractional else rng.integers(-5, 5, 2)
+                scene.move(int(rng.choice(ids)), *shift.tolist())
+            elif name == 'add':
+                x, y = rng.uniform(-extent, extent, 2).tolist() if args.fractional else \
+                    rng.integers(-extent, extent, 2).tolist()
+                scene.add(str(rng.choice(LINE_KINDS)), (x, y, x + 10, y + 5), (0, 0, 0, 255))
+            else:
+                scene.remove(int(rng.choice(ids)))
+            start = time.perf_counter()
+            tiles += len(scene_raster.redraw())
+            times.append(time.perf_counter() - start)
+            if args.check:
+                mismatches += not np.array_equal(scene_raster.bitmap, full_redraw(scene_raster))
+        checked = f", не совпало с полной перерисовкой: {mismatches}" if args.check else ''
+        print(f"{name:<7} медиана {np.median(times) * 1000:.2f} мс, в среднем плиток: {tiles / args.edits:.1f} "
+              f"из {scene_raster.tiles_x * scene_raster.tiles_y}{checked}")
+
+
+if __name__ == '__main__':
+    main()
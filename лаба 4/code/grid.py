@@ -0,0 +1,70 @@
+"""Сетка, оси и подписи для холста lab4 одним растром.
+
+Рисует то же, что прежде рисовали около сотни элементов холста: линии сетки
+через scale пикселей, оси толщиной 2 через центр и подписи -20..20 с шагом 5.
+Подписи набираются крошечным растровым шрифтом, чтобы не зависеть от Tk.
+"""
+import numpy as np
+
+BACKGROUND = (255, 255, 255)
+GRID_COLOR = (211, 211, 211)  # "lightgray" в Tk
+AXIS_COLOR = (0, 0, 0)
+LABELS = range(-20, 21, 5)
+# Смещение подписей от оси, как у прежних create_text
+LABEL_OFFSET = 15
+# Во сколько раз увеличиваются символы шрифта 3x5
+FONT_SCALE = 2
+
+_FONT = {
+    '0': ('111', '101', '101', '101', '111'),
+    '1': ('010', '110', '010', '010', '111'),
+    '2': ('111', '001', '111', '100', '111'),
+    '3': ('111', '001', '111', '001', '111'),
+    '4': ('101', '101', '111', '001', '001'),
+    '5': ('111', '100', '111', '001', '111'),
+    '6': ('111', '100', '111', '101', '111'),
+    '7': ('111', '001', '001', '001', '001'),
+    '8': ('111', '101', '111', '101', '111'),
+    '9': ('111', '101', '111', '001', '111'),
+    '-': ('000', '000', '111', '000', '000'),
+}
+GLYPHS = {char: np.kron(np.array([[c == '1' for c in row] for row in rows]), np.ones((FONT_SCALE, FONT_SCALE), bool))
+          for char, rows in _FONT.items()}
+
+
+def draw_text(bitmap, text, cx, cy, color):
+    """Пишет text (цифры и минус) с центром в (cx, cy); то, что выходит за растр, обрезается"""
+    glyph_h, glyph_w = GLYPHS['0'].shape
+    gap = FONT_SCALE
+    width = len(text) * (glyph_w + gap) - gap
+    x = cx - width // 2
+    y = cy - glyph_h // 2
+    height_limit, width_limit = bitmap.shape[:2]
+    for char in text:
+        glyph = GLYPHS[char]
+        # Часть символа внутри растра
+        top, left = max(0, -y), max(0, -x)
+        bottom, right = min(glyph_h, height_limit - y), min(glyph_w, width_limit - x)
+        if top < bottom and left < right:
+            region = bitmap[y + top:y + bottom, x + left:x + right]
+            region[glyph[top:bottom, left:right]] = color
+        x += glyph_w + gap
+    return bitmap
+
+
+def render_grid(scale, width, height):
+    """RGB-растр (height, width, 3) с сеткой через scale пикселей, осями через центр и подписями"""
+    bitmap = np.empty((height, width, 3), dtype=np.uint8)
+    bitmap[...] = BACKGROUND
+    bitmap[:, ::scale] = GRID_COLOR
+    bitmap[::scale, :] = GRID_COLOR
+
+    center_x, center_y = width // 2, height // 2
+    # Линия толщиной 2 в Tk закрывает пиксель оси и соседний перед ним
+    bitmap[:, max(0, center_x - 1):center_x + 1] = AXIS_COLOR
+    bitmap[max(0, center_y - 1):center_y + 1, :] = AXIS_COLOR
+
+    for i in LABELS:
+        draw_text(bitmap, str(i), center_x + i * scale, center_y + LABEL_OFFSET, AXIS_COLOR)
+        draw_text(bitmap, str(i), center_x + LABEL_OFFSET, center_y - i * scale, AXIS_COLOR)
+    return bitmap
@@ -1,12 +1,31 @@
 import tkinter as tk
-from tkinter import messagebox
+from collections import OrderedDict
+from tkinter import filedialog, messagebox
 import time
 
+import numpy as np
+
+import grid
+import raster
+from pixel_layer import PixelLayer, TileLayer
+from scene import Scene, SceneRaster
+
+# Сторона квадрата, которым на холсте отмечается растеризованный пиксель
+POINT_SIZE = 3
+# Цвета алгоритмов (RGBA) — те же, что у прежних отметок на холсте
+STEP_COLOR = (255, 0, 0, 255)
+CDA_COLOR = (0, 0, 255, 255)
+BRESENHAM_COLOR = (0, 128, 0, 255)
+CIRCLE_COLOR = (128, 0, 128, 255)
+SCENE_COLORS = {'step': STEP_COLOR, 'dda': CDA_COLOR, 'bresenham': BRESENHAM_COLOR, 'circle': CIRCLE_COLOR}
+# Сколько картинок сетки (по одной на масштаб и размер холста) держать готовыми
+GRID_CACHE_SIZE = 8
+
 class RasterizationApp:
     def __init__(self, master):
         self.master = master
         self.master.title("Rasterization Algorithms")
-        self.master.geometry("900x700")
+        self.master.geometry("900x740")
         self.scale = 20  # Масштаб для работы с координатами (начальный масштаб)
         
         # Coordinates inputs
@@ -43,6 +62,20 @@ class RasterizationApp:
         self.canvas = tk.Canvas(master, width=800, height=500, bg="white")
         self.canvas.grid(row=4, column=0, columnspan=3, padx=10, pady=10)
 
+        # Слои снизу вверх: сетка с осями (одна картинка), все примитивы сцены (картинки-плитки,
+        # обновляются только измененные) и последний нарисованный примитив (PixelLayer)
+        self.grid_images = OrderedDict()
+        self.grid_item = self.canvas.create_image(0, 0, anchor="nw")
+        self.scene = Scene()
+        self.scene_raster = SceneRaster(self.scene, int(self.canvas["width"]), int(self.canvas["height"]),
+                                        self.scale, POINT_SIZE)
+        self.scene_layer = TileLayer(self.canvas, self.scene_raster)
+        self.pixel_layer = PixelLayer(self.canvas, POINT_SIZE)
+        # Последний примитив; при смене масштаба перерисовывается только его слой
+        self.points = None
+        self.points_color = None
+        self.points_polyline = False
+
         # Field to show time taken for algorithms
         tk.Label(master, text="Time taken for algorithm (in seconds):").grid(row=5, column=0, columnspan=2, sticky='e', padx=5)
         self.time_display = tk.Label(master, text="")
@@ -54,28 +87,63 @@ class RasterizationApp:
         self.scale_slider.set(self.scale)
         self.scale_slider.grid(row=6, column=1, columnspan=2, padx=5, pady=5)
 
+        # Scene controls
+        scene_buttons = tk.Frame(master)
+        scene_buttons.grid(row=7, column=0, columnspan=3, pady=2)
+        tk.Button(scene_buttons, text="Load Scene", command=self.load_scene).pack(side="left", padx=5)
+        tk.Button(scene_buttons, text="Remove Last", command=self.remove_last).pack(side="left", padx=5)
+        tk.Button(scene_buttons, text="Clear", command=self.clear_canvas).pack(side="left", padx=5)
+        self.draw_grid()
+
     def clear_canvas(self):
-        self.canvas.delete("all")
+        """ Убирает все примитивы сцены; сетка остается """
+        self.scene.clear()
+        self.scene_layer.redraw()
+        self.points = None
+        self.pixel_layer.clear()
+
+    def add_to_scene(self, kind, coords, points, color, polyline=False):
+        """ Добавляет примитив в сцену (перерисуются только плитки под ним) и показывает его поверх """
+        self.scene.add(kind, coords, color)
+        self.scene_layer.redraw()
+        self.show_points(points, color, polyline)
+
+    def remove_last(self):
+        ids = self.scene.ids()
+        if len(ids):
+            self.scene.remove(ids[-1])
+            self.scene_layer.redraw()
+        self.points = None
+        self.pixel_layer.clear()
+
+    def load_scene(self):
+        """ Добавляет в сцену примитивы из файла: по строке вида "bresenham x1 y1 x2 y2" или "circle xc yc r" """
+        path = filedialog.askopenfilename(filetypes=[("Scene files", "*.txt"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            self.scene.load(path, SCENE_COLORS)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось загрузить сцену: {e}")
+            return
+        self.scene_layer.redraw()
 
     def draw_grid(self):
-        """ Drawing the grid with axes centered, so that we can see everything """
-        # Draw grid lines and axes:
-        for i in range(0, 800, self.scale):
-            self.canvas.create_line(i, 0, i, 500, fill="lightgray")
-            self.canvas.create_line(0, i, 800, i, fill="lightgray")
-
-        # Draw X and Y axes at calculated center positions
-        center_x = 400
-        center_y = 250
-        self.canvas.create_line(center_x, 0, center_x, 500, fill="black", width=2)  # Y axis
-        self.canvas.create_line(0, center_y, 800, center_y, fill="black", width=2)  # X axis
-
-        # Drawing coordinate labels
-        for i in range(-20, 21, 5):
-            # X axis labels
-            self.canvas.create_text(center_x + i * self.scale, center_y + 15, text=str(i), fill="black")
-            # Y axis labels
-            self.canvas.create_text(center_x + 15, center_y - i * self.scale, text=str(i), fill="black")
+        """ Показывает сетку с осями для текущего масштаба.
+
+        Картинка сетки строится один раз на масштаб и размер холста и берется из кэша LRU,
+        поэтому движение ползунка масштаба не создает сотню элементов холста на каждый шаг.
+        """
+        key = (self.scale, int(self.canvas["width"]), int(self.canvas["height"]))
+        image = self.grid_images.get(key)
+        if image is None:
+            image = tk.PhotoImage(data=raster.photo_data(grid.render_grid(*key)))
+            self.grid_images[key] = image
+            if len(self.grid_images) > GRID_CACHE_SIZE:
+                self.grid_images.popitem(last=False)
+        else:
+            self.grid_images.move_to_end(key)
+        self.canvas.itemconfig(self.grid_item, image=image)
 
     def scale_coordinates(self, x, y):
         """ Функция для масштабирования координат в пикселях относительно центра окна """
@@ -84,11 +152,36 @@ class RasterizationApp:
         center_y = 250
         return center_x + x * self.scale, center_y - y * self.scale
 
+    def to_screen(self, points):
+        """ Координаты пикселей (N, 2) в координаты холста — то же, что scale_coordinates, для массива """
+        screen = np.empty_like(points)
+        screen[:, 0] = 400 + points[:, 0] * self.scale
+        screen[:, 1] = 250 - points[:, 1] * self.scale
+        return screen
+
+    def show_points(self, points, color, polyline=False):
+        """ Показывает пиксели примитива вместо прежнего; polyline — соединить их ломаной по порядку """
+        self.points = points
+        self.points_color = color
+        self.points_polyline = polyline
+        self.render_points()
+
+    def render_points(self):
+        """ Рисует запомненный примитив в текущем масштабе одним вызовом слоя пикселей """
+        screen = self.to_screen(self.points)
+        if self.points_polyline:
+            self.pixel_layer.show_polyline(screen, self.points_color)
+        else:
+            self.pixel_layer.show_pixels(screen, self.points_color)
+
     def update_scale(self, value):
-        """ Обновить масштаб и перерисовать сетку """
+        """ Обновить масштаб: сетка берется из кэша, примитив перерисовывается в новом масштабе """
         self.scale = int(value)
-        self.clear_canvas()
         self.draw_grid()
+        self.scene_raster.set_scale(self.scale)
+        self.scene_layer.redraw()
+        if self.points is not None:
+            self.render_points()
 
     def draw_step_algorithm(self):
         """Draw using Step Algorithm"""
@@ -105,20 +198,12 @@ class RasterizationApp:
             messagebox.showerror("Ошибка", "Некорректные координаты.")
             return
 
-        # Start time
-        start_time = time.time()
+        # Замеряется только растеризация, без отрисовки на холсте
+        start_time = time.perf_counter()
+        points = raster.line(x1, y1, x2, y2, 'step')
+        elapsed_time = time.perf_counter() - start_time
 
-        self.clear_canvas()
-        self.draw_grid()
-
-        # Step Algorithm logic (example for drawing a line)
-        x1_scaled, y1_scaled = self.scale_coordinates(x1, y1)
-        x2_scaled, y2_scaled = self.scale_coordinates(x2, y2)
-        self.canvas.create_line(x1_scaled, y1_scaled, x2_scaled, y2_scaled, fill="red", width=2)
-
-        # End time
-        end_time = time.time()
-        elapsed_time = end_time - start_time
+        self.add_to_scene('step', (x1, y1, x2, y2), points, STEP_COLOR)
         self.time_display.config(text=f"{elapsed_time:.6f} секунд")
 
     def draw_cda_algorithm(self):
@@ -136,34 +221,12 @@ class RasterizationApp:
             messagebox.showerror("Ошибка", "Некорректные координаты.")
             return
 
-        # Start time
-        start_time = time.time()
-
-        self.clear_canvas()
-        self.draw_grid()
-
-        # CDA Algorithm logic (example for drawing a line)
-        dx = x2 - x1
-        dy = y2 - y1
-        steps = max(abs(dx), abs(dy))
-
-        Xinc = dx / steps
-        Yinc = dy / steps
+        start_time = time.perf_counter()
+        points = raster.line(x1, y1, x2, y2, 'dda')
+        elapsed_time = time.perf_counter() - start_time
 
-        x = x1
-        y = y1
-
-        # Draw lines between points
-        for i in range(int(steps)):
-            x_scaled, y_scaled = self.scale_coordinates(x, y)
-            next_x_scaled, next_y_scaled = self.scale_coordinates(x + Xinc, y + Yinc)
-            self.canvas.create_line(x_scaled, y_scaled, next_x_scaled, next_y_scaled, fill="blue")
-            x += Xinc
-            y += Yinc
-
-        # End time
-        end_time = time.time()
-        elapsed_time = end_time - start_time
+        # Как и прежде, ЦДА показывается отрезками между соседними точками
+        self.add_to_scene('dda', (x1, y1, x2, y2), points, CDA_COLOR, polyline=True)
         self.time_display.config(text=f"{elapsed_time:.6f} секунд")
 
     def draw_bresenham_algorithm(self):
@@ -181,35 +244,11 @@ class RasterizationApp:
             messagebox.showerror("Ошибка", "Некорректные координаты.")
             return
 
-        # Bresenham Line Drawing Algorithm
-        start_time = time.time()
-
-        self.clear_canvas()
-        self.draw_grid()
+        start_time = time.perf_counter()
+        points = raster.line(x1, y1, x2, y2, 'bresenham')
+        elapsed_time = time.perf_counter() - start_time
 
-        dx = abs(x2 - x1)
-        dy = abs(y2 - y1)
-        sx = 1 if x1 < x2 else -1
-        sy = 1 if y1 < y2 else -1
-        err = dx - dy
-
-        while True:
-            x_scaled, y_scaled = self.scale_coordinates(x1, y1)
-            self.canvas.create_oval(x_scaled, y_scaled, x_scaled + 2, y_scaled + 2, fill="green", width=1)
-
-            if x1 == x2 and y1 == y2:
-                break
-            e2 = 2 * err
-            if e2 > -dy:
-                err -= dy
-                x1 += sx
-            if e2 < dx:
-                err += dx
-                y1 += sy
-
-        # End time
-        end_time = time.time()
-        elapsed_time = end_time - start_time
+        self.add_to_scene('bresenham', (x1, y1, x2, y2), points, BRESENHAM_COLOR)
         self.time_display.config(text=f"{elapsed_time:.6f} секунд")
 
     def draw_bresenham_circle(self):
@@ -226,39 +265,11 @@ class RasterizationApp:
             messagebox.showerror("Ошибка", "Некорректные координаты.")
             return
 
-        # Bresenham Circle Drawing Algorithm
-        start_time = time.time()
-
-        self.clear_canvas()
-        self.draw_grid()
+        start_time = time.perf_counter()
+        points = raster.circle(xc, yc, r)
+        elapsed_time = time.perf_counter() - start_time
 
-        x = 0
-        y = r
-        p = 3 - 2 * r
-
-        def plot_circle_points(xc, yc, x, y):
-            """Plot circle points in all octants"""
-            points = [
-                (xc + x, yc + y), (xc - x, yc + y), (xc + x, yc - y), (xc - x, yc - y),
-                (xc + y, yc + x), (xc - y, yc + x), (xc + y, yc - x), (xc - y, yc - x)
-            ]
-            for px, py in points:
-                px_scaled, py_scaled = self.scale_coordinates(px, py)
-                self.canvas.create_oval(px_scaled, py_scaled, px_scaled + 2, py_scaled + 2, fill="purple", width=1)
-
-        # Initial circle drawing
-        while x <= y:
-            plot_circle_points(xc, yc, x, y)
-            x += 1
-            if p < 0:
-                p += 4 * x + 6
-            else:
-                y -= 1
-                p += 4 * (x - y) + 10
-
-        # End time
-        end_time = time.time()
-        elapsed_time = end_time - start_time
+        self.add_to_scene('circle', (xc, yc, r), points, CIRCLE_COLOR)
         self.time_display.config(text=f"{elapsed_time:.6f} секунд")
 
 
@@ -0,0 +1,67 @@
+import tkinter as tk
+
+import raster
+
+
+class PixelLayer:
+    """Слой примитива на холсте: одна картинка и одна ломаная, которые переиспользуются.
+
+    Сколько бы пикселей ни было у примитива, на холсте остаются два элемента,
+    а отрисовка — это один растр по рамке точек или одни coords у ломаной.
+    """
+
+    def __init__(self, canvas, point_size):
+        self.canvas = canvas
+        self.point_size = point_size
+        self.image = tk.PhotoImage()
+        self.image_item = canvas.create_image(0, 0, anchor="nw", image=self.image, state="hidden")
+        self.line_item = canvas.create_line(0, 0, 0, 0, state="hidden")
+
+    def clear(self):
+        self.canvas.itemconfig(self.image_item, state="hidden")
+        self.canvas.itemconfig(self.line_item, state="hidden")
+
+    def show_pixels(self, points, color):
+        """Квадраты point_size в точках холста (N, 2); повторяющиеся точки рисуются один раз"""
+        self.clear()
+        bounds = (int(self.canvas["width"]), int(self.canvas["height"]))
+        bitmap, origin = raster.points_bitmap(raster.unique_points(points), color, self.point_size, bounds)
+        if bitmap is None:
+            return
+        height, width = bitmap.shape[:2]
+        self.image.configure(width=width, height=height, data=raster.photo_data(bitmap))
+        self.canvas.coords(self.image_item, *origin)
+        self.canvas.itemconfig(self.image_item, state="normal")
+
+    def show_polyline(self, points, color):
+        """Ломаная через точки холста по порядку — один элемент холста на весь примитив"""
+        if len(points) < 2:
+            self.show_pixels(points, color)
+            return
+        self.clear()
+        self.canvas.coords(self.line_item, *points.ravel().tolist())
+        self.canvas.itemconfig(self.line_item, fill="#%02x%02x%02x" % tuple(color[:3]), state="normal")
+
+
+class TileLayer:
+    """Растр сцены на холсте плитками: у каждой плитки своя картинка, обновляются только перерисованные"""
+
+    def __init__(self, canvas, scene_raster):
+        self.canvas = canvas
+        self.scene_raster = scene_raster
+        self.images = {}
+        for tx in range(scene_raster.tiles_x):
+            for ty in range(scene_raster.tiles_y):
+                x0, y0, _, _ = scene_raster.tile_rect((tx, ty))
+                image = tk.PhotoImage()
+                canvas.create_image(x0, y0, anchor="nw", image=image)
+                self.images[(tx, ty)] = image
+
+    def redraw(self):
+        """Перерисовывает растр сцены и обновляет картинки только у изменившихся плиток"""
+        tiles = self.scene_raster.redraw()
+        for tile in tiles:
+            bitmap = self.scene_raster.tile(tile)
+            height, width = bitmap.shape[:2]
+            self.images[tile].configure(width=width, height=height, data=raster.photo_data(bitmap))
+        return tiles
@@ -0,0 +1,369 @@
+"""Алгоритмы растеризации без графического интерфейса.
+
+Каждый алгоритм возвращает массив целых координат пикселей (N, 2) — столбцы x, y —
+или рисует их в готовый массив-растр. Пакетные функции растеризуют сразу много
+примитивов одним вызовом NumPy: точки всех примитивов идут подряд, а counts
+говорит, сколько точек у каждого.
+
+Целочисленные алгоритмы (Брезенхэм, средняя точка для эллипса, Ву) посчитаны
+в замкнутой форме и дают ровно те же пиксели, что пошаговые циклы из учебника.
+"""
+import base64
+import struct
+import zlib
+
+import numpy as np
+
+COORD_DTYPE = np.int32
+
+
+def _expand(counts):
+    """Для counts = [2, 3] — номера примитивов [0, 0, 1, 1, 1] и номера шагов [0, 1, 0, 1, 2]"""
+    counts = np.asarray(counts, dtype=np.int64)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    step = np.arange(len(owner), dtype=np.int64) - starts[owner]
+    return owner, step
+
+
+def _round(values):
+    # Округление половин вверх, как floor(v + 0.5) в пошаговых алгоритмах, а не к четному, как np.rint
+    return np.floor(values + 0.5).astype(np.int64)
+
+
+def _isqrt(values):
+    """Целая часть квадратного корня из целых values >= 0 (отрицательные считаются нулем)"""
+    values = np.maximum(values, 0)
+    root = np.floor(np.sqrt(values.astype(np.float64))).astype(np.int64)
+    # float-корень может ошибаться на 1 у больших чисел
+    root -= root * root > values
+    root += (root + 1) * (root + 1) <= values
+    return root
+
+
+def _points(x, y):
+    points = np.empty((len(x), 2), dtype=COORD_DTYPE)
+    points[:, 0] = x
+    points[:, 1] = y
+    return points
+
+
+def _segments(segments, dtype):
+    segments = np.asarray(segments, dtype=dtype).reshape(-1, 4)
+    return segments[:, 0], segments[:, 1], segments[:, 2], segments[:, 3]
+
+
+def lines_step(segments):
+    """Пошаговый алгоритм: по ведущей оси шаг 1, вторая координата — округленное y = y0 + k * (x - x0).
+
+    segments — (N, 4): x0, y0, x1, y1, можно дробные. Возвращает (points, counts).
+    """
+    x0, y0, x1, y1 = _segments(segments, np.float64)
+    dx, dy = x1 - x0, y1 - y0
+    steep = np.abs(dy) > np.abs(dx)
+    # Ведущая ось u и вторая v; у крутых отрезков они меняются местами
+    u0, u1 = np.where(steep, y0, x0), np.where(steep, y1, x1)
+    v0, du, dv = np.where(steep, x0, y0), np.where(steep, dy, dx), np.where(steep, dx, dy)
+    start, end = _round(u0), _round(u1)
+    counts = np.abs(end - start) + 1
+    owner, step = _expand(counts)
+    u = start[owner] + np.sign(end - start)[owner] * step
+    slope = np.divide(dv, du, out=np.zeros_like(dv), where=du != 0)
+    v = _round(v0[owner] + (u - u0[owner]) * slope[owner])
+    steep = steep[owner]
+    return _points(np.where(steep, v, u), np.where(steep, u, v)), counts
+
+
+def lines_dda(segments):
+    """ЦДА: steps = max(|dx|, |dy|) равных шагов от начала, каждая точка округляется.
+
+    Координата точки i считается как x0 + i * dx / steps, а не накоплением
+    x += dx / steps, поэтому ошибка округления не растет вдоль отрезка.
+    """
+    x0, y0, x1, y1 = _segments(segments, np.float64)
+    dx, dy = x1 - x0, y1 - y0
+    steps = np.maximum(np.abs(dx), np.abs(dy))
+    counts = np.floor(steps).astype(np.int64) + 1
+    owner, step = _expand(counts)
+    x_inc = np.divide(dx, steps, out=np.zeros_like(dx), where=steps != 0)
+    y_inc = np.divide(dy, steps, out=np.zeros_like(dy), where=steps != 0)
+    return _points(_round(x0[owner] + step * x_inc[owner]), _round(y0[owner] + step * y_inc[owner])), counts
+
+
+def lines_bresenham(segments):
+    """Алгоритм Брезенхэма для отрезков с целыми концами.
+
+    Смещение по второй оси на шаге i — floor((2 * i * minor + major - 1) / (2 * major)):
+    ровно то, к чему приводит накопление ошибки err = dx - dy в пошаговом цикле.
+    """
+    x0, y0, x1, y1 = _segments(segments, np.int64)
+    dx, dy = np.abs(x1 - x0), np.abs(y1 - y0)
+    sx, sy = np.where(x0 < x1, 1, -1), np.where(y0 < y1, 1, -1)
+    major, minor = np.maximum(dx, dy), np.minimum(dx, dy)
+    counts = major + 1
+    owner, step = _expand(counts)
+    major = major[owner]
+    # У отрезка нулевой длины major = 0: без max смещение было бы -1
+    offset = (2 * step * minor[owner] + np.maximum(major - 1, 0)) // np.maximum(2 * major, 1)
+    x_major = (dx >= dy)[owner]
+    x = x0[owner] + sx[owner] * np.where(x_major, step, offset)
+    y = y0[owner] + sy[owner] * np.where(x_major, offset, step)
+    return _points(x, y), counts
+
+
+def circles_bresenham(circles):
+    """Окружности Брезенхэма; circles — (N, 3): xc, yc, r с целыми значениями.
+
+    Для каждого x в октанте 0 <= x <= y берется y, который выбрал бы пошаговый
+    алгоритм с p = 3 - 2r: наибольший y, для которого y * (y - 1) <= r² - x² - 1.
+    Точки каждого x отражаются в 8 октантов в том же порядке, что и в цикле,
+    поэтому на осях и диагонали они повторяются.
+    """
+    circles = np.asarray(circles, dtype=np.int64).reshape(-1, 3)
+    xc, yc, r = circles[:, 0], circles[:, 1], circles[:, 2]
+    # Кандидаты x с запасом; лишние отсекает условие x <= y
+    candidates = np.where(r >= 0, np.floor(r / np.sqrt(2)).astype(np.int64) + 2, 0)
+    owner, x = _expand(candidates)
+    radius = r[owner]
+    y = (_isqrt(4 * (radius * radius - x * x) - 3) + 1) // 2
+    keep = x <= y
+    owner, x, y = owner[keep], x[keep], y[keep]
+    counts = np.bincount(owner, minlength=len(circles)) * 8
+
+    cx, cy = xc[owner], yc[owner]
+    px = np.stack([cx + x, cx - x, cx + x, cx - x, cx + y, cx - y, cx + y, cx - y], axis=1)
+    py = np.stack([cy + y, cy + y, cy - y, cy - y, cy + x, cy + x, cy - x, cy - x], axis=1)
+    return _points(px.ravel(), py.ravel()), counts
+
+
+def ellipses_midpoint(ellipses):
+    """Эллипсы по алгоритму средней точки; ellipses — (N, 4): xc, yc, rx, ry с целыми значениями.
+
+    В первой области (наклон меньше 1) шаг по x, y — наибольший, при котором средняя
+    точка (x, y - 1/2) не снаружи эллипса; во второй — шаг по y вниз до 0 и x по той
+    же проверке для (x + 1/2, y - 1). Пошаговый цикл меняет вторую координату не
+    больше чем на 1 за шаг, поэтому закрытая форма ограничена бегущим максимумом
+    (минимумом) вдоль эллипса. Точки отражаются в 4 четверти в порядке цикла.
+    При ry = 0 эллипс — горизонтальный отрезок длиной 2 * rx + 1.
+    """
+    ellipses = np.asarray(ellipses, dtype=np.int64).reshape(-1, 4)
+    xc, yc, rx, ry = ellipses[:, 0], ellipses[:, 1], ellipses[:, 2], ellipses[:, 3]
+    a2, b2 = rx * rx, ry * ry
+    curved = (rx >= 0) & (ry > 0)
+    # Сдвиг на номер эллипса отделяет эллипсы друг от друга в накоплении по всему массиву
+    shift = int(np.max(np.abs(rx) + np.abs(ry), initial=0)) + 3
+
+    # Первая область: кандидаты x = 0..rx + 1, нужная часть — префикс с ry² * x < rx² * y
+    candidates = np.where(curved, rx + 2, 0)
+    owner, x = _expand(candidates)
+    a2_x, b2_x = a2[owner], b2[owner]
+    root = _isqrt((4 * b2_x * (a2_x - x * x) - 1) // np.maximum(a2_x, 1))
+    y = np.where(a2_x > 0, np.clip((root + 1) // 2, 0, ry[owner]), ry[owner])
+    # y(x) = max(y_формула(x), y(x - 1) - 1)
+    y = np.maximum.accumulate(y + x + owner * shift) - owner * shift - x
+    first = b2_x * x < a2_x * y
+    x_end = np.bincount(owner[first], minlength=len(ellipses))
+    starts = np.cumsum(candidates) - candidates
+    y_end = np.zeros_like(x_end)
+    y_end[curved] = y[(starts + x_end)[curved]]
+    region1 = owner[first], x[first], y[first]
+
+    # Вторая область: y = y_end..0, x(шаг) = min(x_формула(y), x(шаг - 1) + 1)
+    owner, step = _expand(np.where(curved, y_end + 1, 0))
+    a2_y, b2_y = a2[owner], b2[owner]
+    y = y_end[owner] - step
+    x = np.maximum(x_end[owner], (_isqrt(4 * a2_y * (b2_y - y * y) // np.maximum(b2_y, 1)) + 1) // 2)
+    x[step == 0] = x_end[owner][step == 0]
+    x = np.minimum.accumulate(x - step - owner * shift) + owner * shift + step
+    region2 = owner, x, y
+
+    flat_owner, flat_x = _expand(np.where((rx >= 0) & (ry == 0), rx + 1, 0))
+    owner = np.concatenate([region1[0], region2[0], flat_owner])
+    order = np.argsort(owner, kind='stable')
+    owner = owner[order]
+    x = np.concatenate([region1[1], region2[1], flat_x])[order]
+    y = np.concatenate([region1[2], region2[2], np.zeros_like(flat_x)])[order]
+    counts = np.bincount(owner, minlength=len(ellipses)) * 4
+
+    cx, cy = xc[owner], yc[owner]
+    px = np.stack([cx + x, cx - x, cx + x, cx - x], axis=1)
+    py = np.stack([cy + y, cy + y, cy - y, cy - y], axis=1)
+    return _points(px.ravel(), py.ravel()), counts
+
+
+def lines_thick(segments, widths):
+    """Толстые отрезки спанами: у каждой точки Брезенхэма — спан поперек ведущей оси.
+
+    Длина спана n = round(width * length / major) — столько пикселей по второй оси
+    дает полоса ширины width, измеренной перпендикулярно отрезку; считается в целых
+    числах через целый корень. Спан идет от -(n - 1) // 2 до n // 2 от центра.
+    widths — число или (N,). Возвращает (points, counts), точки спанов подряд.
+    """
+    x0, y0, x1, y1 = _segments(segments, np.int64)
+    widths = np.broadcast_to(np.asarray(widths, dtype=np.int64), x0.shape)
+    center, center_counts = lines_bresenham(segments)
+    dx, dy = np.abs(x1 - x0), np.abs(y1 - y0)
+    major = np.maximum(dx, dy)
+    root = _isqrt(4 * widths * widths * (dx * dx + dy * dy))
+    spans = np.maximum(1, (root + major) // np.maximum(2 * major, 1))
+
+    point_owner = np.repeat(np.arange(len(x0)), center_counts)
+    point, offset = _expand(spans[point_owner])
+    offset = offset - (spans[point_owner][point] - 1) // 2
+    # Спан вдоль y у пологих отрезков и вдоль x у крутых
+    x_major = (dx >= dy)[point_owner][point]
+    x = center[point, 0] + np.where(x_major, 0, offset)
+    y = center[point, 1] + np.where(x_major, offset, 0)
+    return _points(x, y), center_counts * spans
+
+
+def lines_wu(segments):
+    """Сглаженные отрезки Ву с целыми концами: (points, coverage, counts).
+
+    coverage — покрытие пикселя 0..255 (uint8). Как в целочисленном цикле Ву
+    с 16-битным накопителем ошибки: концы с покрытием 255, между ними пары
+    пикселей по обе стороны от отрезка, покрытие — старшие 8 бит накопителя.
+    Отрезок идет сверху вниз (концы меняются местами, если y0 > y1);
+    горизонтальные, вертикальные и диагональные отрезки рисуются без сглаживания.
+    Для накопителя важно major < 65536 * minor — иначе шаг adj обнуляется.
+    """
+    x0, y0, x1, y1 = _segments(segments, np.int64)
+    swap = y0 > y1
+    x0, y0, x1, y1 = np.where(swap, x1, x0), np.where(swap, y1, y0), np.where(swap, x0, x1), np.where(swap, y0, y1)
+    xdir = np.where(x1 >= x0, 1, -1)
+    dx, dy = np.abs(x1 - x0), y1 - y0
+    major, minor = np.maximum(dx, dy), np.minimum(dx, dy)
+    plain = (minor == 0) | (dx == dy)
+    counts = np.where(plain, major + 1, 2 * major)
+    adj = np.where(plain, 0, (minor << 16) // np.maximum(major, 1))
+
+    owner, k = _expand(counts)
+    plain, major_k, adj_k = plain[owner], major[owner], adj[owner]
+    # Точка k: у простых отрезков шаг i = k, у остальных начало, пары (i, сторона) и конец
+    end = k == counts[owner] - 1
+    i = np.where(plain | end, np.where(end & ~plain, major_k, k), (k + 1) // 2)
+    side = np.where(plain | end | (k == 0), 0, (k + 1) % 2)
+    accumulated = i * adj_k
+    minor_step = np.where(plain, i * (minor[owner] > 0), np.where(end, minor[owner], accumulated >> 16))
+    x_major = (dx >= dy)[owner]
+    x = x0[owner] + xdir[owner] * np.where(x_major, i, minor_step + side)
+    y = y0[owner] + np.where(x_major, minor_step + side, i)
+    weight = (accumulated & 0xFFFF) >> 8
+    coverage = np.where(plain | end | (k == 0), 255, np.where(side == 1, weight, 255 - weight))
+    return _points(x, y), coverage.astype(np.uint8), counts
+
+
+LINE_ALGORITHMS = {
+    'step': lines_step,
+    'dda': lines_dda,
+    'bresenham': lines_bresenham,
+}
+
+
+def line(x0, y0, x1, y1, algorithm='bresenham'):
+    """Пиксели одного отрезка, (N, 2)"""
+    return LINE_ALGORITHMS[algorithm]([(x0, y0, x1, y1)])[0]
+
+
+def circle(xc, yc, r):
+    """Пиксели одной окружности Брезенхэма, (N, 2)"""
+    return circles_bresenham([(xc, yc, r)])[0]
+
+
+def ellipse(xc, yc, rx, ry):
+    """Пиксели одного эллипса по алгоритму средней точки, (N, 2)"""
+    return ellipses_midpoint([(xc, yc, rx, ry)])[0]
+
+
+def split(points, counts):
+    """Точки пакетного результата по примитивам: список массивов (n_i, 2)"""
+    return np.split(points, np.cumsum(counts)[:-1])
+
+
+def draw_points(bitmap, points, value=1, size=1):
+    """Закрашивает в bitmap квадраты size x size с левым верхним углом в точках (x — столбец, y — строка).
+
+    Точки за краями растра отбрасываются. value — число или, для цветного растра, цвет по каналам.
+    """
+    points = np.asarray(points)
+    height, width = bitmap.shape[:2]
+    for oy in range(size):
+        for ox in range(size):
+            x, y = points[:, 0] + ox, points[:, 1] + oy
+            inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+            bitmap[y[inside], x[inside]] = value
+    return bitmap
+
+
+def draw_coverage(bitmap, points, coverage, color):
+    """Смешивает color с bitmap в точках с долей coverage / 255 (сглаженные отрезки Ву).
+
+    Смешивание целочисленное: (color * c + фон * (255 - c) + 127) // 255.
+    Точки за краями растра отбрасываются; из повторяющихся точек остается последняя.
+    """
+    points = np.asarray(points)
+    height, width = bitmap.shape[:2]
+    x, y = points[:, 0], points[:, 1]
+    inside = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+    x, y = x[inside], y[inside]
+    # Покрытие с осями под каналы растра
+    weight = np.asarray(coverage, dtype=np.int64)[inside].reshape((-1,) + (1,) * (bitmap.ndim - 2))
+    color = np.asarray(color, dtype=np.int64)
+    background = bitmap[y, x].astype(np.int64)
+    bitmap[y, x] = (color * weight + background * (255 - weight) + 127) // 255
+    return bitmap
+
+
+def unique_points(points):
+    """Точки без повторов в порядке первого появления (например, общие пиксели октантов окружности)"""
+    points = np.asarray(points)
+    # Пара (x, y) упаковывается в одно 64-битное число: np.unique по числам много быстрее, чем по строкам
+    keys = (points[:, 0].astype(np.int64) << 32) | (points[:, 1].astype(np.int64) & 0xFFFFFFFF)
+    _, first = np.unique(keys, return_index=True)
+    return points[np.sort(first)]
+
+
+def points_bitmap(points, value, size=1, bounds=None):
+    """Наименьший растр с квадратами size x size в точках: (bitmap, (x0, y0)) или (None, None).
+
+    (x0, y0) — положение левого верхнего угла растра; bounds = (width, height)
+    обрезает растр областью [0, width) x [0, height). Время зависит от числа
+    точек и размера их рамки, а не от размера всего холста.
+    """
+    points = np.asarray(points)
+    if len(points) == 0:
+        return None, None
+    x0, y0 = points.min(axis=0)
+    x1, y1 = points.max(axis=0) + size
+    if bounds is not None:
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, bounds[0]), min(y1, bounds[1])
+    if x0 >= x1 or y0 >= y1:
+        return None, None
+    value = np.asarray(value, dtype=np.uint8)
+    bitmap = np.zeros((y1 - y0, x1 - x0) + value.shape, dtype=np.uint8)
+    draw_points(bitmap, points - (x0, y0), value, size)
+    return bitmap, (int(x0), int(y0))
+
+
+def encode_png(bitmap, compression=1):
+    """PNG из растра uint8: (H, W) — серый, (H, W, 3) — RGB, (H, W, 4) — RGBA с прозрачностью"""
+    bitmap = np.ascontiguousarray(bitmap, dtype=np.uint8)
+    height, width = bitmap.shape[:2]
+    channels = 1 if bitmap.ndim == 2 else bitmap.shape[2]
+    color_type = {1: 0, 3: 2, 4: 6}[channels]
+    # Каждая строка начинается с байта фильтра 0 (без фильтра)
+    rows = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    rows[:, 1:] = bitmap.reshape(height, -1)
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(rows.tobytes(), compression))
+            + chunk(b'IEND', b''))
+
+
+def photo_data(bitmap):
+    """Строка для tk.PhotoImage(data=...): PNG в base64, который Tk понимает без Pillow"""
+    return base64.b64encode(encode_png(bitmap)).decode('ascii')
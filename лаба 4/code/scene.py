@@ -0,0 +1,337 @@
+"""Сцена из многих примитивов и ее растр с перерисовкой только измененных плиток.
+
+Scene хранит примитивы в массивах NumPy (вид, координаты, цвет, рамка) и
+индексирует их равномерной сеткой ячеек, чтобы быстро находить примитивы,
+задевающие заданную область. SceneRaster держит растр холста, разбитый на
+плитки: после добавления, удаления или сдвига примитива перерисовываются
+только плитки под его старой и новой рамкой.
+
+Файл сцены — текст, по примитиву в строке, '#' начинает комментарий:
+    bresenham 0 0 10 5
+    dda -3 2 8 -4
+    step 0 0 5 1.5
+    circle 0 0 7
+"""
+import numpy as np
+
+import raster
+
+KINDS = ('step', 'dda', 'bresenham', 'circle')
+BRESENHAM = KINDS.index('bresenham')
+CIRCLE = KINDS.index('circle')
+# Сторона ячейки пространственного индекса в единицах сцены
+INDEX_CELL = 16
+# Примитивы, рамка которых задевает больше ячеек, не раскладываются по ячейкам, а проверяются всегда
+MAX_INDEX_CELLS = 256
+# Сторона плитки растра в пикселях холста
+TILE_SIZE = 100
+INITIAL_CAPACITY = 64
+
+
+def primitive_boxes(kinds, coords):
+    """Рамки пикселей примитивов (N, 4): x0, y0, x1, y1 включительно"""
+    kinds = np.asarray(kinds)
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 4)
+    whole = np.trunc(coords)
+    # Концы отрезков округляются так же, как в алгоритмах, и промежуточные точки лежат между ними;
+    # Брезенхэм и окружность получают координаты целыми через np.int64, то есть с отбрасыванием дробной части
+    truncated = (kinds == BRESENHAM) | (kinds == CIRCLE)
+    ends = np.where(truncated[:, None], whole, np.floor(coords + 0.5))
+    boxes = np.empty((len(coords), 4), dtype=np.int64)
+    boxes[:, 0] = np.minimum(ends[:, 0], ends[:, 2])
+    boxes[:, 1] = np.minimum(ends[:, 1], ends[:, 3])
+    boxes[:, 2] = np.maximum(ends[:, 0], ends[:, 2])
+    boxes[:, 3] = np.maximum(ends[:, 1], ends[:, 3])
+    # У дробного отрезка пошаговый алгоритм и ЦДА считают точки от неокругленного начала,
+    # и точка может выйти за округленный конец на пиксель
+    fractional = ~truncated & np.any(coords != whole, axis=1)
+    boxes[fractional] += (-1, -1, 1, 1)
+    circles = kinds == CIRCLE
+    center_x, center_y, radius = whole[circles, 0], whole[circles, 1], np.abs(whole[circles, 2])
+    boxes[circles] = np.stack([center_x - radius, center_y - radius, center_x + radius, center_y + radius], axis=1)
+    return boxes
+
+
+class Scene:
+    """Примитивы в массивах с запасом емкости; номер примитива не меняется, пока он не удален.
+
+    Порядок номеров — порядок рисования: более поздний примитив рисуется поверх.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.kinds = np.empty(capacity, dtype=np.int8)
+        self.coords = np.empty((capacity, 4), dtype=np.float64)
+        self.colors = np.empty((capacity, 4), dtype=np.uint8)
+        self.boxes = np.empty((capacity, 4), dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.count = 0
+        self.cells = {}
+        self.large = set()
+        self.dirty = []
+
+    def __len__(self):
+        return int(self.alive[:self.count].sum())
+
+    def ids(self):
+        return np.flatnonzero(self.alive[:self.count])
+
+    def _reserve(self, needed):
+        capacity = len(self.kinds)
+        if self.count + needed <= capacity:
+            return
+        while capacity < self.count + needed:
+            capacity *= 2
+        for name in ('kinds', 'coords', 'colors', 'boxes', 'alive'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def _cells(self, box):
+        x0, y0, x1, y1 = (int(v) // INDEX_CELL for v in box)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > MAX_INDEX_CELLS:
+            return None
+        return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+
+    def _index(self, primitive):
+        cells = self._cells(self.boxes[primitive])
+        if cells is None:
+            self.large.add(primitive)
+            return
+        for cell in cells:
+            self.cells.setdefault(cell, set()).add(primitive)
+
+    def _unindex(self, primitive):
+        cells = self._cells(self.boxes[primitive])
+        if cells is None:
+            self.large.discard(primitive)
+            return
+        for cell in cells:
+            members = self.cells[cell]
+            members.discard(primitive)
+            if not members:
+                del self.cells[cell]
+
+    def add_many(self, kinds, coords, colors):
+        """Добавляет примитивы пачкой; kinds — номера из KINDS, coords — (N, 4), colors — (N, 4) RGBA"""
+        kinds = np.asarray(kinds, dtype=np.int8).reshape(-1)
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 4)
+        count = len(kinds)
+        self._reserve(count)
+        ids = np.arange(self.count, self.count + count)
+        self.kinds[ids] = kinds
+        self.coords[ids] = coords
+        self.colors[ids] = colors
+        self.boxes[ids] = primitive_boxes(kinds, coords)
+        self.alive[ids] = True
+        self.count += count
+        for primitive in ids.tolist():
+            self._index(primitive)
+            self.dirty.append(self.boxes[primitive].copy())
+        return ids
+
+    def add(self, kind, coords, color):
+        """Добавляет примитив: kind — имя из KINDS, coords — x0, y0, x1, y1 (у окружности xc, yc, r)"""
+        coords = tuple(coords) + (0,) * (4 - len(coords))
+        return int(self.add_many([KINDS.index(kind)], [coords], [color])[0])
+
+    def remove(self, primitive):
+        if not self.alive[primitive]:
+            raise KeyError(primitive)
+        self._unindex(primitive)
+        self.alive[primitive] = False
+        self.dirty.append(self.boxes[primitive].copy())
+
+    def move(self, primitive, dx, dy):
+        """Сдвигает примитив; перерисовать нужно и старое место, и новое"""
+        if not self.alive[primitive]:
+            raise KeyError(primitive)
+        self._unindex(primitive)
+        self.dirty.append(self.boxes[primitive].copy())
+        if self.kinds[primitive] == CIRCLE:
+            self.coords[primitive, :2] += (dx, dy)
+        else:
+            self.coords[primitive] += (dx, dy, dx, dy)
+        self.boxes[primitive] = primitive_boxes(self.kinds[primitive:primitive + 1], self.coords[primitive])[0]
+        self._index(primitive)
+        self.dirty.append(self.boxes[primitive].copy())
+
+    def clear(self):
+        for primitive in self.ids().tolist():
+            self.dirty.append(self.boxes[primitive].copy())
+        self.alive[:] = False
+        self.count = 0
+        self.cells.clear()
+        self.large.clear()
+
+    def take_dirty(self):
+        """Рамки, изменившиеся с прошлого вызова"""
+        dirty, self.dirty = self.dirty, []
+        return dirty
+
+    def query(self, box):
+        """Номера живых примитивов, рамка которых пересекается с box, по возрастанию"""
+        x0, y0, x1, y1 = box
+        candidates = set(self.large)
+        cx0, cy0, cx1, cy1 = (int(v) // INDEX_CELL for v in box)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+            # Область больше всего индекса — быстрее пройти по занятым ячейкам
+            for (cx, cy), members in self.cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    candidates.update(members)
+        else:
+            for cx in range(cx0, cx1 + 1):
+                for cy in range(cy0, cy1 + 1):
+                    members = self.cells.get((cx, cy))
+                    if members:
+                        candidates.update(members)
+        if not candidates:
+            return np.empty(0, dtype=np.int64)
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        boxes = self.boxes[ids]
+        # Ячейки грубее рамок: оставляем только действительно пересекающиеся
+        hit = (boxes[:, 0] <= x1) & (boxes[:, 2] >= x0) & (boxes[:, 1] <= y1) & (boxes[:, 3] >= y0)
+        return np.sort(ids[hit])
+
+    def rasterize(self, ids):
+        """Пиксели примитивов ids: (points, owners) — точки и номер примитива каждой точки в порядке номеров"""
+        ids = np.asarray(ids, dtype=np.int64)
+        all_points, all_owners = [], []
+        for kind, name in enumerate(KINDS):
+            selected = ids[self.kinds[ids] == kind]
+            if not len(selected):
+                continue
+            if kind == CIRCLE:
+                points, counts = raster.circles_bresenham(self.coords[selected, :3])
+            else:
+                points, counts = raster.LINE_ALGORITHMS[name](self.coords[selected])
+            all_points.append(points)
+            all_owners.append(np.repeat(selected, counts))
+        if not all_points:
+            return np.empty((0, 2), dtype=raster.COORD_DTYPE), np.empty(0, dtype=np.int64)
+        points, owners = np.concatenate(all_points), np.concatenate(all_owners)
+        order = np.argsort(owners, kind='stable')
+        return points[order], owners[order]
+
+    def load(self, path, colors):
+        """Добавляет примитивы из файла сцены; colors — цвет RGBA для каждого вида из KINDS"""
+        kinds, coords = [], []
+        with open(path, encoding='utf-8') as file:
+            for number, line in enumerate(file, 1):
+                fields = line.split('#', 1)[0].split()
+                if not fields:
+                    continue
+                name, values = fields[0].lower(), fields[1:]
+                expected = 3 if name == 'circle' else 4
+                if name not in KINDS or len(values) != expected:
+                    raise ValueError(f"{path}:{number}: expected '<{'|'.join(KINDS)}> x y ...', got {line.strip()!r}")
+                kinds.append(KINDS.index(name))
+                coords.append([float(value) for value in values] + [0.0] * (4 - expected))
+        kinds = np.array(kinds, dtype=np.int8)
+        return self.add_many(kinds, np.array(coords).reshape(-1, 4), np.array([colors[KINDS[k]] for k in kinds],
+                                                                             dtype=np.uint8).reshape(-1, 4))
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for primitive in self.ids().tolist():
+                kind = int(self.kinds[primitive])
+                values = self.coords[primitive, :3 if kind == CIRCLE else 4]
+                file.write(KINDS[kind] + ' ' + ' '.join(f"{value:g}" for value in values) + '\n')
+
+
+class SceneRaster:
+    """RGBA-растр сцены в координатах холста, разбитый на плитки tile_size x tile_size.
+
+    Пиксель сцены (x, y) рисуется квадратом point_size с левым верхним углом
+    в (center_x + x * scale, center_y - y * scale), как на холсте lab4.
+    """
+
+    def __init__(self, scene, width, height, scale, point_size, tile_size=TILE_SIZE):
+        self.scene = scene
+        self.width, self.height = width, height
+        self.point_size = point_size
+        self.tile_size = tile_size
+        self.bitmap = np.zeros((height, width, 4), dtype=np.uint8)
+        self.tiles_x = -(-width // tile_size)
+        self.tiles_y = -(-height // tile_size)
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        self.scale = scale
+        self.scene.take_dirty()
+        self.dirty_tiles = {(tx, ty) for tx in range(self.tiles_x) for ty in range(self.tiles_y)}
+
+    def to_screen(self, points):
+        screen = np.empty(points.shape, dtype=np.int64)
+        screen[:, 0] = self.width // 2 + points[:, 0].astype(np.int64) * self.scale
+        screen[:, 1] = self.height // 2 - points[:, 1].astype(np.int64) * self.scale
+        return screen
+
+    def world_box(self, x0, y0, x1, y1):
+        """Рамка сцены, пиксели которой могут попасть в прямоугольник холста [x0, x1) x [y0, y1)"""
+        center_x, center_y = self.width // 2, self.height // 2
+        return ((x0 - self.point_size + 1 - center_x) // self.scale, (center_y - y1 + 1) // self.scale,
+                -(-(x1 - 1 - center_x) // self.scale), -(-(center_y - y0 + self.point_size - 1) // self.scale))
+
+    def tile_rect(self, tile):
+        tx, ty = tile
+        return (tx * self.tile_size, ty * self.tile_size,
+                min(self.width, (tx + 1) * self.tile_size), min(self.height, (ty + 1) * self.tile_size))
+
+    def _mark(self, box):
+        """Отмечает плитки под рамкой сцены box"""
+        x0, y0, x1, y1 = box
+        screen = self.to_screen(np.array([[x0, y1], [x1, y0]]))
+        left, top = screen[0]
+        right, bottom = screen[1] + self.point_size
+        if right <= 0 or bottom <= 0 or left >= self.width or top >= self.height:
+            return
+        tx0, tx1 = max(0, left) // self.tile_size, (min(self.width, right) - 1) // self.tile_size
+        ty0, ty1 = max(0, top) // self.tile_size, (min(self.height, bottom) - 1) // self.tile_size
+        self.dirty_tiles.update((tx, ty) for tx in range(tx0, tx1 + 1) for ty in range(ty0, ty1 + 1))
+
+    def _paint(self, rect):
+        """Перерисовывает прямоугольник холста по примитивам, которые его задевают"""
+        x0, y0, x1, y1 = rect
+        region = self.bitmap[y0:y1, x0:x1]
+        region[...] = 0
+        points, owners = self.scene.rasterize(self.scene.query(self.world_box(*rect)))
+        if not len(points):
+            return
+        # Точки, квадраты которых целиком вне прямоугольника (у длинных примитивов — почти все), отбрасываем сразу
+        screen = self.to_screen(points)
+        size = self.point_size
+        near = np.flatnonzero((screen[:, 0] > x0 - size) & (screen[:, 0] < x1)
+                              & (screen[:, 1] > y0 - size) & (screen[:, 1] < y1))
+        screen, owners = screen[near], owners[near]
+        # Квадраты всех точек подряд: порядок точек по номерам примитивов сохраняется
+        offsets = np.arange(size)
+        shape = (len(screen), size, size)
+        x = np.broadcast_to(screen[:, 0, None, None] + offsets[None, None, :] - x0, shape).ravel()
+        y = np.broadcast_to(screen[:, 1, None, None] + offsets[None, :, None] - y0, shape).ravel()
+        width, height = x1 - x0, y1 - y0
+        inside = np.flatnonzero((x >= 0) & (x < width) & (y >= 0) & (y < height))
+        # Где пиксель закрашивают несколько примитивов, побеждает последний по порядку: наибольший номер точки
+        winner = np.full(width * height, -1, dtype=np.int64)
+        np.maximum.at(winner, y[inside] * width + x[inside], inside)
+        painted = np.flatnonzero(winner >= 0)
+        colors = self.scene.colors[owners[winner[painted] // (size * size)]]
+        region[painted // width, painted % width] = colors
+
+    def redraw(self):
+        """Перерисовывает плитки, задетые изменениями сцены; возвращает список перерисованных плиток"""
+        for box in self.scene.take_dirty():
+            self._mark(box)
+        tiles = sorted(self.dirty_tiles)
+        self.dirty_tiles = set()
+        if len(tiles) == self.tiles_x * self.tiles_y:
+            # Все плитки сразу: каждый примитив растеризуется один раз, а не в каждой своей плитке
+            self._paint((0, 0, self.width, self.height))
+        else:
+            for tile in tiles:
+                self._paint(self.tile_rect(tile))
+        return tiles
+
+    def tile(self, tile):
+        x0, y0, x1, y1 = self.tile_rect(tile)
+        return self.bitmap[y0:y1, x0:x1]
@@ -0,0 +1,46 @@
+"""Бенчмарк отсечения отрезков: sutherland_cohen_clip по одному против sutherland_cohen_clip_batch.
+
+Отрезки случайные в квадрате вокруг окна, так что часть целиком внутри, часть
+целиком снаружи, а остальные отсекаются. Заодно проверяется, что пакетная
+функция дает в точности те же отрезки, что и поштучная.
+
+Запуск: python bench_clip.py [--segments 10000 100000 1000000] [--scalar-limit 100000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from lab5 import sutherland_cohen_clip, sutherland_cohen_clip_batch
+
+CLIP_WINDOW = (0.0, 0.0, 20.0, 20.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--segments', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--scalar-limit', type=int, default=100000,
+                        help="наибольшее число отрезков для поштучного отсечения")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'отрезков':>9} {'видимых':>9} {'пакет, мс':>10} {'Мотр./с':>8} {'по одному, мс':>14} {'совпало':>8}")
+    for count in args.segments:
+        segments = rng.uniform(-20, 40, (count, 4))
+        start = time.perf_counter()
+        clipped, valid = sutherland_cohen_clip_batch(segments, CLIP_WINDOW)
+        batch_time = time.perf_counter() - start
+
+        scalar, same = '', ''
+        if count <= args.scalar_limit:
+            start = time.perf_counter()
+            reference = [sutherland_cohen_clip(*segment, *CLIP_WINDOW) for segment in segments.tolist()]
+            scalar = f"{(time.perf_counter() - start) * 1000:.0f}"
+            expected = [[*result[0], *result[1]] for result in reference if result]
+            same = 'да' if expected == clipped[valid].tolist() else 'НЕТ'
+        print(f"{count:>9} {int(valid.sum()):>9} {batch_time * 1000:>10.1f} {count / batch_time / 1e6:>8.2f} "
+              f"{scalar:>14} {same:>8}")
+
+
+if __name__ == '__main__':
+    main()
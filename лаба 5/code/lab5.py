@@ -59,6 +59,72 @@ def sutherland_cohen_clip(x1, y1, x2, y2, xmin, ymin, xmax, ymax):
                 code2 = compute_code(x2, y2)
 
 
+# Коды областей для массивов точек, те же, что у compute_code
+def compute_codes(x, y, xmin, ymin, xmax, ymax):
+    left, bottom = x < xmin, y < ymin
+    # Правая (верхняя) граница — только если не левая (нижняя), как elif в compute_code
+    codes = left.view(np.uint8) | ((x > xmax) > left).view(np.uint8) << 1
+    codes |= bottom.view(np.uint8) << 2 | ((y > ymax) > bottom).view(np.uint8) << 3
+    return codes
+
+
+# Алгоритм Сазерленда-Коэна сразу для массива отрезков
+def sutherland_cohen_clip_batch(segments, clip_window):
+    """Отсекает отрезки (N, 4): x1, y1, x2, y2 окном (xmin, ymin, xmax, ymax).
+
+    Возвращает (clipped, valid): clipped — (N, 4) отсеченные отрезки (у отброшенных NaN),
+    valid — маска видимых отрезков, clipped[valid] — только видимые. Коды всех концов
+    считаются сразу, целиком видимые и целиком невидимые отрезки решаются за один шаг,
+    а цикл идет только по частично видимым. На каждом шаге у отрезка отсекается один
+    конец по одной границе теми же формулами и в том же порядке, что в
+    sutherland_cohen_clip, поэтому результаты совпадают с ней до бита.
+    """
+    xmin, ymin, xmax, ymax = clip_window
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    clipped = np.full(segments.shape, np.nan)
+    valid = np.zeros(len(segments), dtype=bool)
+    # Рабочие массивы — только еще не решенные отрезки, index — их номера во входном массиве
+    index = np.arange(len(segments))
+    # Столбцы копируются подряд в памяти: с ними сжатие и арифметика заметно быстрее, чем со срезами
+    x1, y1, x2, y2 = np.ascontiguousarray(segments.T)
+    code1 = compute_codes(x1, y1, xmin, ymin, xmax, ymax)
+    code2 = compute_codes(x2, y2, xmin, ymin, xmax, ymax)
+
+    while len(index):
+        # Полностью внутри окна
+        accept = (code1 | code2) == 0
+        valid[index[accept]] = True
+        clipped[index[accept]] = np.stack([x1[accept], y1[accept], x2[accept], y2[accept]], axis=1)
+        # Частично внутри; полностью снаружи (code1 & code2 != 0) просто отбрасываются
+        partial = ~accept & ((code1 & code2) == 0)
+        index, x1, y1, x2, y2 = index[partial], x1[partial], y1[partial], x2[partial], y2[partial]
+        code1, code2 = code1[partial], code2[partial]
+        if not len(index):
+            break
+
+        # Точка за пределами окна: первая, если она снаружи, иначе вторая
+        first = code1 != 0
+        outside = np.where(first, code1, code2)
+        # Граница в том же порядке: левая, правая, нижняя, верхняя. Пересечения считаются
+        # по обеим формулам для всех отрезков, и из них берется нужная — деление на ноль
+        # бывает только в неиспользуемой формуле
+        vertical = (outside & 3) != 0
+        bound_x = np.where((outside & 1) != 0, xmin, xmax)
+        bound_y = np.where((outside & 4) != 0, ymin, ymax)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y_at_x = y1 + (bound_x - x1) * (y2 - y1) / (x2 - x1)
+            x_at_y = x1 + (bound_y - y1) * (x2 - x1) / (y2 - y1)
+        x = np.where(vertical, bound_x, x_at_y)
+        y = np.where(vertical, y_at_x, bound_y)
+        code = compute_codes(x, y, xmin, ymin, xmax, ymax)
+
+        # Обновляем точку и код
+        x1, y1, code1 = np.where(first, x, x1), np.where(first, y, y1), np.where(first, code, code1)
+        x2, y2, code2 = np.where(first, x2, x), np.where(first, y2, y), np.where(first, code2, code)
+
+    return clipped, valid
+
+
 # Алгоритм Сазерленда-Ходжмана для отсечения выпуклых многоугольников
 def sutherland_hodgman_clip(polygon, clip_window):
     xmin, ymin, xmax, ymax = clip_window
@@ -262,14 +328,10 @@ class LineClippingApp:
             messagebox.showwarning("Ошибка", "Выберите файл с отрезками!")
             return
         
-        # Применяем алгоритм отсечения
-        clipped_segments = []
-        for segment in self.segments:
-            x1, y1, x2, y2 = segment
-            clipped = sutherland_cohen_clip(x1, y1, x2, y2, *self.clip_window)
-            if clipped:
-                clipped_segments.append(clipped)
-        
+        # Применяем алгоритм отсечения сразу ко всем отрезкам
+        clipped, valid = sutherland_cohen_clip_batch(self.segments, self.clip_window)
+        clipped_segments = clipped[valid].tolist()
+
         # Рисуем отсеченные отрезки
         plot_segments(clipped_segments, self.clip_window, self.ax, "Отсеченные отрезки (Сазерленд-Коэна)")
         self.canvas.draw()